@@ -2,8 +2,10 @@
 Aplicacion web Flask para procesar itinerarios de navieras.
 Interfaz amigable en el navegador.
 """
+import atexit
 import os
 import sys
+import threading
 
 # Parche para Python 3.8 - evitar error con usedforsecurity
 # Este error ocurre porque Python 3.9+ agregó el parámetro usedforsecurity
@@ -48,6 +50,7 @@ if sys.version_info < (3, 9):
 from flask import Flask, render_template, request, send_file, jsonify, flash
 from werkzeug.utils import secure_filename
 from pathlib import Path
+import pandas as pd
 import json
 
 # Aplicar parche ANTES de importar módulos que usan reportlab
@@ -65,10 +68,17 @@ if sys.version_info < (3, 9):
         hashlib.md5 = _md5_patched
 
 from src.ocr_processor import OCRProcessor
+from src.reader_registry import default_registry
+from src.ocr_cache import OCRCache
+from src.detection_store import DetectionStore
+from src.itinerary_store import ItineraryStore
+from src.image_preprocessor import ImagePreprocessor
+from src.carrier_templates import DEFAULT_TEMPLATES
 from src.data_normalizer import DataNormalizer
-from src.excel_exporter import ExcelExporter
-from src.pdf_exporter import PDFExporter
+from src.fast_exporters import EXPORTERS, get_exporter
 from src.utils import setup_logging
+from src.vessel_registry import VesselRegistry
+from src.workbook_exporter import GROUPINGS, DailyWorkbook
 
 # Configurar logging
 setup_logging(log_level='INFO')
@@ -78,6 +88,33 @@ app.secret_key = 'itinerario-processor-secret-key-2024'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['OUTPUT_FOLDER'] = 'output'
+# Procesos OCR en paralelo (0 = OCR en el mismo proceso del servidor)
+app.config['OCR_WORKERS'] = int(os.environ.get('OCR_WORKERS', '0'))
+app.config['OCR_MAX_JOBS'] = int(os.environ.get('OCR_MAX_JOBS', '50'))
+# Caché de detecciones OCR (vacío = desactivada)
+app.config['OCR_CACHE_DIR'] = os.environ.get('OCR_CACHE_DIR', 'cache/ocr')
+app.config['OCR_CACHE_MB'] = int(os.environ.get('OCR_CACHE_MB', '256'))
+# Archivo de detecciones para reprocesar con replay.py (vacío = desactivado)
+app.config['OCR_DETECTIONS_DIR'] = os.environ.get('OCR_DETECTIONS_DIR', 'detecciones')
+# Registro de naves para unificar los nombres entre documentos (vacío = desactivado)
+app.config['VESSEL_REGISTRY'] = os.environ.get('VESSEL_REGISTRY', 'naves.json')
+# Almacén columnar de itinerarios para /api/itinerarios (vacío = desactivado)
+app.config['ITINERARY_STORE'] = os.environ.get('ITINERARY_STORE', 'itinerarios')
+# Reducir y normalizar las imágenes antes del OCR (experimental: desactivado
+# hasta validarlo con capturas reales; OCR_PREPROCESS=1 para activarlo)
+app.config['OCR_PREPROCESS'] = os.environ.get('OCR_PREPROCESS', '0') == '1'
+# Plantillas de extracción por naviera (experimental: desactivadas hasta
+# ajustarlas con capturas reales; OCR_TEMPLATES=1 para activarlas)
+app.config['OCR_TEMPLATES'] = os.environ.get('OCR_TEMPLATES', '0') == '1'
+# Libro Excel consolidado del día con todos los documentos subidos, en este
+# directorio (vacío = desactivado). Agrupado por 'naviera' o 'semana' y
+# regenerado a los DAILY_WORKBOOK_INTERVAL segundos de recibir documentos.
+app.config['DAILY_WORKBOOK'] = os.environ.get('DAILY_WORKBOOK', '')
+app.config['DAILY_WORKBOOK_GROUP_BY'] = os.environ.get('DAILY_WORKBOOK_GROUP_BY', 'naviera')
+app.config['DAILY_WORKBOOK_INTERVAL'] = float(os.environ.get('DAILY_WORKBOOK_INTERVAL', '60'))
+if app.config['DAILY_WORKBOOK_GROUP_BY'] not in GROUPINGS:
+    raise ValueError(f"DAILY_WORKBOOK_GROUP_BY no soportado: {app.config['DAILY_WORKBOOK_GROUP_BY']} "
+                     f"(opciones: {', '.join(GROUPINGS)})")
 
 # Crear carpetas necesarias
 Path(app.config['UPLOAD_FOLDER']).mkdir(exist_ok=True)
@@ -89,6 +126,153 @@ ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'tiff'}
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+_ocr_pool = None
+_ocr_cache = None
+_detection_store = None
+_vessel_registry = None
+_itinerary_store = None
+_itinerary_lock = threading.Lock()
+_daily_workbook = None
+_workbook_timer = None
+_workbook_lock = threading.RLock()
+# Creación de los recursos compartidos: el servidor atiende peticiones en varios
+# hilos y dos primeras peticiones simultáneas no deben crear dos pools
+_resources_lock = threading.RLock()
+
+def get_ocr_cache():
+    """Devuelve la caché OCR compartida por las peticiones (o None si está desactivada)."""
+    global _ocr_cache
+    if _ocr_cache is None and app.config['OCR_CACHE_DIR']:
+        with _resources_lock:
+            if _ocr_cache is None:
+                _ocr_cache = OCRCache(app.config['OCR_CACHE_DIR'], max_bytes=app.config['OCR_CACHE_MB'] * 1024 * 1024)
+    return _ocr_cache
+
+def get_detection_store():
+    """Devuelve el archivo de detecciones (o None si está desactivado)."""
+    global _detection_store
+    if _detection_store is None and app.config['OCR_DETECTIONS_DIR']:
+        with _resources_lock:
+            if _detection_store is None:
+                _detection_store = DetectionStore(app.config['OCR_DETECTIONS_DIR'])
+    return _detection_store
+
+def get_vessel_registry():
+    """Devuelve el registro de naves compartido por las peticiones (o None si está desactivado)."""
+    global _vessel_registry
+    if _vessel_registry is None and app.config['VESSEL_REGISTRY']:
+        with _resources_lock:
+            if _vessel_registry is None:
+                _vessel_registry = VesselRegistry(app.config['VESSEL_REGISTRY'])
+    return _vessel_registry
+
+def get_itinerary_store():
+    """
+    Devuelve el almacén de itinerarios (o None si está desactivado).
+    
+    Al abrirlo las columnas se mapean en memoria: no se leen hasta que una
+    consulta las usa.
+    """
+    global _itinerary_store
+    path = app.config['ITINERARY_STORE']
+    if _itinerary_store is None and path:
+        with _itinerary_lock:
+            if _itinerary_store is None:
+                if (Path(path) / 'meta.json').exists():
+                    _itinerary_store = ItineraryStore.load(path)
+                else:
+                    _itinerary_store = ItineraryStore()
+    return _itinerary_store
+
+def get_daily_workbook():
+    """
+    Devuelve el libro consolidado por día (o None si está desactivado).
+    
+    Al crearlo regenera los libros que quedaron incompletos (por ejemplo si el
+    servidor se cayó antes de regenerarlos).
+    """
+    global _daily_workbook
+    directory = app.config['DAILY_WORKBOOK']
+    if _daily_workbook is None and directory:
+        with _workbook_lock:
+            if _daily_workbook is None:
+                _daily_workbook = DailyWorkbook(directory, group_by=app.config['DAILY_WORKBOOK_GROUP_BY'])
+                schedule_daily_workbook()
+    return _daily_workbook
+
+def schedule_daily_workbook():
+    """Programa una regeneración de los libros pendientes (una sola a la vez)."""
+    global _workbook_timer
+    with _workbook_lock:
+        if _workbook_timer is None:
+            _workbook_timer = threading.Timer(app.config['DAILY_WORKBOOK_INTERVAL'], build_daily_workbooks)
+            _workbook_timer.daemon = True
+            _workbook_timer.start()
+
+def build_daily_workbooks():
+    """Regenera los libros de los días con documentos nuevos."""
+    global _workbook_timer
+    with _workbook_lock:
+        _workbook_timer = None
+        libro = _daily_workbook
+    if libro is not None:
+        for path in libro.build_pending():
+            print(f"Libro del día actualizado: {path}")
+
+def add_to_daily_workbook(datos, documento):
+    """
+    Agrega un documento al libro del día (si está activado).
+    
+    El documento queda en disco enseguida; el libro se regenera a los
+    DAILY_WORKBOOK_INTERVAL segundos, con todo lo recibido hasta entonces.
+    """
+    libro = get_daily_workbook()
+    if libro is None:
+        return
+    libro.add(datos, documento)
+    schedule_daily_workbook()
+
+@atexit.register
+def close_daily_workbook():
+    """Regenera los libros pendientes al detener el servidor."""
+    with _workbook_lock:
+        if _workbook_timer is not None:
+            _workbook_timer.cancel()
+    build_daily_workbooks()
+
+# Completa al arrancar los libros que quedaron pendientes (si el libro por día está activado)
+get_daily_workbook()
+
+def get_ocr_processor():
+    """
+    Devuelve el procesador OCR a usar en las peticiones.
+    
+    Con OCR_WORKERS > 0 es un pool de procesos compartido; si no, un
+    OCRProcessor que usa el lector compartido del proceso.
+    """
+    global _ocr_pool
+    if app.config['OCR_WORKERS'] > 0:
+        if _ocr_pool is None:
+            with _resources_lock:
+                if _ocr_pool is None:
+                    from src.worker_pool import OCRWorkerPool
+                    _ocr_pool = OCRWorkerPool(
+                        workers=app.config['OCR_WORKERS'],
+                        max_jobs_per_worker=app.config['OCR_MAX_JOBS'],
+                        cache_dir=app.config['OCR_CACHE_DIR'] or None,
+                        cache_max_bytes=app.config['OCR_CACHE_MB'] * 1024 * 1024,
+                        preprocess=app.config['OCR_PREPROCESS'],
+                        store_dir=app.config['OCR_DETECTIONS_DIR'] or None,
+                        templates=app.config['OCR_TEMPLATES'],
+                    )
+        return _ocr_pool
+    # El registro garantiza un único easyocr.Reader por (idiomas, dispositivo),
+    # así que crear el procesador por petición ya no recarga los modelos
+    preprocessor = ImagePreprocessor() if app.config['OCR_PREPROCESS'] else None
+    templates = DEFAULT_TEMPLATES if app.config['OCR_TEMPLATES'] else None
+    return OCRProcessor(registry=default_registry, cache=get_ocr_cache(), preprocessor=preprocessor,
+                        templates=templates, store=get_detection_store())
+
 @app.route('/')
 def index():
     """Pagina principal con formulario de carga."""
@@ -108,37 +292,56 @@ def upload_file():
     if not allowed_file(file.filename):
         return jsonify({'error': 'Tipo de archivo no permitido. Use: PNG, JPG, JPEG'}), 400
     
+    formatos = [f.strip().lower() for valor in request.form.getlist('formatos') for f in valor.split(',') if f.strip()]
+    formatos = list(dict.fromkeys(formatos)) or ['excel', 'pdf']
+    for formato in formatos:
+        try:
+            get_exporter(formato)
+        except (ValueError, ImportError) as e:
+            return jsonify({'error': str(e)}), 400
+    
     try:
         # Guardar archivo
         filename = secure_filename(file.filename)
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
         file.save(filepath)
         
-        # Procesar imagen con EasyOCR
-        # EasyOCR no requiere configuración de rutas, se inicializa automáticamente
-        ocr = OCRProcessor()
+        # Procesar imagen con EasyOCR (lector compartido, ya cargado)
+        ocr = get_ocr_processor()
         datos_crudos = ocr.extract_structured_data(filepath)
         
         # Normalizar datos
-        normalizador = DataNormalizer()
+        registro_naves = get_vessel_registry()
+        normalizador = DataNormalizer(vessel_registry=registro_naves)
         datos_normalizados = normalizador.normalize(datos_crudos)
+        if registro_naves is not None:
+            registro_naves.save()
         
         # Extraer campos adicionales
-        adicionales = normalizador.extract_additional_fields(datos_crudos.get('raw_text', ''))
+        adicionales = normalizador.extract_additional_fields(datos_crudos.get('documento') or datos_crudos.get('raw_text', ''))
         datos_normalizados.update(adicionales)
         
-        # Generar nombres de archivos de salida
-        base_name = Path(filename).stem
-        excel_path = os.path.join(app.config['OUTPUT_FOLDER'], f'{base_name}_datos.xlsx')
-        pdf_path = os.path.join(app.config['OUTPUT_FOLDER'], f'{base_name}_datos.pdf')
+        store = get_detection_store()
+        if store is not None:
+            store.put_result(store.make_key(filepath), datos_normalizados)
         
-        # Exportar a Excel
-        excel_exporter = ExcelExporter()
-        excel_exporter.export_single(datos_normalizados, excel_path)
+        itinerarios = get_itinerary_store()
+        if itinerarios is not None:
+            with _itinerary_lock:
+                itinerarios.append(datos_normalizados, DetectionStore.make_key(filepath))
+                # Solo escribe las filas nuevas (un segmento más), no todo el almacén
+                itinerarios.save(app.config['ITINERARY_STORE'])
         
-        # Exportar a PDF
-        pdf_exporter = PDFExporter()
-        pdf_exporter.export_single(datos_normalizados, pdf_path)
+        add_to_daily_workbook(datos_normalizados, filename)
+        
+        # Exportar en los formatos pedidos (Excel y PDF si no se indica ninguno)
+        base_name = Path(filename).stem
+        archivos = {}
+        for formato in formatos:
+            exporter = get_exporter(formato)
+            nombre_archivo = f'{base_name}_datos{exporter.extension}'
+            exporter.export_single(datos_normalizados, os.path.join(app.config['OUTPUT_FOLDER'], nombre_archivo))
+            archivos[formato] = f'/download/{formato}/{nombre_archivo}'
         
         # Preparar datos para mostrar (siempre incluir campos requeridos)
         datos_mostrar = {}
@@ -196,18 +399,13 @@ def upload_file():
             if datos_normalizados.get('numero_viaje'):
                 datos_mostrar['numero_viaje'] = datos_normalizados.get('numero_viaje')
         
-        # Texto completo (truncado para mostrar)
-        texto_completo = datos_normalizados.get('texto_completo', '')
-        datos_mostrar['texto_completo'] = texto_completo[:1000] + '...' if len(texto_completo) > 1000 else texto_completo
-        datos_mostrar['texto_completo_largo'] = texto_completo  # Versión completa para descargar
+        # Texto completo (una sola vez: la página lo muestra entero)
+        datos_mostrar['texto_completo'] = datos_normalizados.get('texto_completo', '')
         
         resultado = {
             'success': True,
             'datos': datos_mostrar,
-            'archivos': {
-                'excel': f'/download/excel/{base_name}_datos.xlsx',
-                'pdf': f'/download/pdf/{base_name}_datos.pdf'
-            }
+            'archivos': archivos
         }
         
         return jsonify(resultado)
@@ -229,17 +427,88 @@ def upload_file():
         
         return jsonify({'error': error_msg}), 500
 
-@app.route('/download/excel/<filename>')
-def download_excel(filename):
-    """Descarga archivo Excel."""
-    filepath = os.path.join(app.config['OUTPUT_FOLDER'], filename)
-    if os.path.exists(filepath):
-        return send_file(filepath, as_attachment=True, download_name=filename)
-    return jsonify({'error': 'Archivo no encontrado'}), 404
+@app.route('/extract', methods=['POST'])
+def extract_fields():
+    """
+    Extrae solo los campos pedidos, sin normalizar ni exportar.
+
+    Formulario: ``file`` (imagen) y ``campos`` (lista separada por comas,
+    por ejemplo ``naviera,nave,etd,eta``).
+    """
+    file = request.files.get('file')
+    if file is None or file.filename == '':
+        return jsonify({'error': 'No se selecciono archivo'}), 400
+
+    if not allowed_file(file.filename):
+        return jsonify({'error': 'Tipo de archivo no permitido. Use: PNG, JPG, JPEG'}), 400
+
+    campos = [c.strip() for c in request.form.get('campos', '').split(',') if c.strip()]
+    if not campos:
+        return jsonify({'error': 'Indique los campos a extraer (campos=naviera,nave,...)'}), 400
+    desconocidos = [c for c in campos if c not in OCRProcessor.FIELDS]
+    if desconocidos:
+        return jsonify({'error': f"Campos desconocidos: {', '.join(desconocidos)}",
+                        'disponibles': list(OCRProcessor.FIELDS)}), 400
+
+    filename = secure_filename(file.filename)
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    file.save(filepath)
+
+    try:
+        datos = get_ocr_processor().extract_structured_data(filepath, fields=campos)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    datos.pop('documento', None)
+    datos.pop('raw_text', None)
+    return jsonify({'success': True, 'datos': datos})
+
+@app.route('/api/itinerarios')
+def query_itineraries():
+    """
+    Consulta el almacén de itinerarios (una fila por nave).
+
+    Parámetros: ``naviera``, ``nave``, ``pol``, ``pod`` (se pueden repetir),
+    ``semana``, ``etd_desde``, ``etd_hasta``, ``eta_desde``, ``eta_hasta`` y
+    ``agrupar`` (columnas separadas por comas, por ejemplo ``pod,semana``).
+    Sin ``agrupar`` devuelve las filas; con ``agrupar``, un resumen por grupo.
+    """
+    itinerarios = get_itinerary_store()
+    if itinerarios is None:
+        return jsonify({'error': 'El almacén de itinerarios está desactivado'}), 404
+
+    filtros = {name: request.args.getlist(name) or None for name in ('naviera', 'nave', 'pol', 'pod')}
+    try:
+        semanas = [int(value) for value in request.args.getlist('semana')]
+    except ValueError:
+        return jsonify({'error': 'La semana debe ser un número'}), 400
+    filtros['semana'] = semanas or None
+    for name in ('etd', 'eta'):
+        desde, hasta = request.args.get(f'{name}_desde'), request.args.get(f'{name}_hasta')
+        filtros[name] = (desde, hasta) if desde or hasta else None
+    agrupar = [c.strip() for c in request.args.get('agrupar', '').split(',') if c.strip()]
+
+    try:
+        with _itinerary_lock:
+            if agrupar:
+                resultado = itinerarios.group_by(agrupar, **filtros)
+            else:
+                resultado = itinerarios.select(**filtros)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Fechas ISO (YYYY-MM-DD) y vacíos como null
+    for columna in resultado.columns:
+        if pd.api.types.is_datetime64_any_dtype(resultado[columna]):
+            resultado[columna] = resultado[columna].dt.strftime('%Y-%m-%d')
+    filas = json.loads(resultado.to_json(orient='records'))
+    return jsonify({'success': True, 'total': len(filas), 'filas': filas})
 
-@app.route('/download/pdf/<filename>')
-def download_pdf(filename):
-    """Descarga archivo PDF."""
+@app.route('/download/<formato>/<filename>')
+def download_file(formato, filename):
+    """Descarga un archivo generado (Excel, PDF, CSV, JSONL o Parquet)."""
+    if formato not in EXPORTERS or not filename.endswith(EXPORTERS[formato].extension):
+        return jsonify({'error': 'Archivo no encontrado'}), 404
     filepath = os.path.join(app.config['OUTPUT_FOLDER'], filename)
     if os.path.exists(filepath):
         return send_file(filepath, as_attachment=True, download_name=filename)
@@ -251,4 +520,11 @@ if __name__ == '__main__':
     print("="*60)
     print("\nAbre tu navegador en: http://localhost:5000")
     print("\nPresiona Ctrl+C para detener el servidor\n")
+    # Cargar el lector EasyOCR antes de atender la primera petición
+    # (solo en el proceso hijo del recargador de Flask, que es el que atiende)
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true' and app.config['OCR_WORKERS'] == 0:
+        try:
+            print(f"EasyOCR listo ({default_registry.preload().upper()})")
+        except Exception as e:
+            print(f"Aviso: no se pudo precargar EasyOCR: {str(e)}")
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,187 @@
+"""
+Mide el costo de cada regla de extracción.
+
+Recorre textos de ejemplo con cada regla por separado y con el escáner
+combinado de cada campo, y muestra las reglas ordenadas de más cara a más
+barata para encontrar patrones costosos.
+
+Uso:
+    python benchmark_reglas.py muestras/*.txt
+    python benchmark_reglas.py cache/ocr            # detecciones guardadas en la caché OCR
+    python benchmark_reglas.py muestras -n 50 --reglas data/reglas --top 15
+"""
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+# Agregar el directorio src al path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from src.ocr_document import OCRDocument
+from src.patterns import DEFAULT_DIR, PatternSet, load_rules
+
+
+def load_texts(paths: List[str]) -> List[str]:
+    """
+    Lee los textos de ejemplo.
+
+    Acepta archivos .txt (texto OCR), archivos .json de la caché OCR
+    (detecciones de EasyOCR) y directorios con cualquiera de los dos.
+    """
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(path.glob('*.txt')) + sorted(path.glob('*.json')))
+        elif path.exists():
+            files.append(path)
+        else:
+            print(f"Aviso: no existe {path}")
+
+    texts = []
+    for file in files:
+        if file.suffix == '.json':
+            with open(file, 'r', encoding='utf-8') as f:
+                texts.append(OCRDocument.from_detections(json.load(f)).text)
+        else:
+            texts.append(file.read_text(encoding='utf-8'))
+    return texts
+
+
+def combined_scanner(pattern_set: PatternSet) -> Callable[[str], List[Tuple[int, int, str]]]:
+    """
+    Escáner de una sola pasada con todas las reglas de un campo.
+
+    Las reglas se combinan en una alternancia dentro de un lookahead de ancho
+    cero, así que cada posición del texto se prueba una vez con todas ellas.
+    Sirve de referencia frente al recorrido regla por regla de ``PatternSet``:
+    el motor de ``re`` no aplica sus optimizaciones de prefijo dentro del
+    lookahead.
+
+    Returns:
+        Función que devuelve (prioridad, inicio, valor) de cada posición donde
+        alguna regla coincide (en cada posición, la regla de mayor prioridad).
+    """
+    # Cada patrón se envuelve en un grupo con nombre; se guarda dónde
+    # empiezan sus propios grupos dentro de la expresión combinada
+    parts = []
+    offsets = {}
+    index = 1
+    for priority, compiled in enumerate(pattern_set.patterns):
+        group = f'p{priority}'
+        parts.append(f'(?P<{group}>{compiled.pattern})')
+        offsets[group] = (priority, index, compiled.groups)
+        index += 1 + compiled.groups
+    flags = pattern_set.patterns[0].flags if pattern_set.patterns else 0
+    scanner = re.compile('(?=' + '|'.join(parts) + ')', flags)
+
+    def scan(text: str) -> List[Tuple[int, int, str]]:
+        candidates = []
+        for match in scanner.finditer(text):
+            priority, outer, groups = offsets[match.lastgroup]
+            value = match.group(outer + 1) if groups else match.group(outer)
+            candidates.append((priority, match.start(outer), value or ''))
+        return candidates
+
+    return scan
+
+
+def main():
+    """Función principal."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Mide el costo de cada regla de extracción sobre textos de ejemplo'
+    )
+    parser.add_argument(
+        'entradas',
+        type=str,
+        nargs='+',
+        help='Archivos .txt, archivos .json de la caché OCR o directorios'
+    )
+    parser.add_argument(
+        '-n', '--repeticiones',
+        type=int,
+        default=20,
+        help='Veces que se recorre cada texto (default: 20)'
+    )
+    parser.add_argument(
+        '--reglas',
+        type=str,
+        default=str(DEFAULT_DIR),
+        help=f'Directorio de paquetes de reglas (default: {DEFAULT_DIR})'
+    )
+    parser.add_argument(
+        '--top',
+        type=int,
+        default=20,
+        help='Reglas a mostrar (default: 20)'
+    )
+
+    args = parser.parse_args()
+
+    texts = load_texts(args.entradas)
+    if not texts:
+        print("Error: no hay textos de ejemplo")
+        sys.exit(1)
+
+    try:
+        fields, _ = load_rules(args.reglas)
+    except (OSError, ValueError) as e:
+        print(f"Error al cargar las reglas: {str(e)}")
+        sys.exit(1)
+
+    total_chars = sum(len(text) for text in texts)
+    runs = args.repeticiones * len(texts)
+    print(f"{len(texts)} textos ({total_chars} caracteres), {args.repeticiones} repeticiones, "
+          f"{len(fields)} campos\n")
+
+    rule_rows = []
+    field_rows = []
+    for name, pattern_set in fields.items():
+        # Escáner combinado del campo (una pasada por texto)
+        scan = combined_scanner(pattern_set)
+        start = time.perf_counter()
+        for _ in range(args.repeticiones):
+            for text in texts:
+                scan(text)
+        combined_ms = (time.perf_counter() - start) * 1000 / runs
+
+        # Cada regla por separado, recorriendo todas sus coincidencias
+        separate_ms = 0.0
+        for rule_id, compiled in zip(pattern_set.rule_ids, pattern_set.patterns):
+            matches = 0
+            start = time.perf_counter()
+            for _ in range(args.repeticiones):
+                for text in texts:
+                    for _ in compiled.finditer(text):
+                        matches += 1
+            elapsed = (time.perf_counter() - start) * 1000 / runs
+            separate_ms += elapsed
+            rule_rows.append((elapsed, name, rule_id, matches // args.repeticiones, compiled.pattern))
+        # Resolución del valor (cascada por prioridad con salida temprana)
+        start = time.perf_counter()
+        for _ in range(args.repeticiones):
+            for text in texts:
+                pattern_set.extract(text)
+        cascade_ms = (time.perf_counter() - start) * 1000 / runs
+        field_rows.append((cascade_ms, name, len(pattern_set.patterns), separate_ms, combined_ms))
+
+    print("Reglas más caras (ms por texto):")
+    print(f"{'ms':>8}  {'campo':<18} {'regla':<22} {'coinc.':>6}  patrón")
+    for elapsed, name, rule_id, matches, pattern in sorted(rule_rows, reverse=True)[:args.top]:
+        shown = pattern if len(pattern) <= 60 else pattern[:57] + '...'
+        print(f"{elapsed:8.3f}  {name:<18} {rule_id:<22} {matches:>6}  {shown}")
+
+    # valor: resolver el campo; reglas: todas las coincidencias de todas las
+    # reglas; escáner: todos los candidatos con el escáner combinado
+    print("\nCampos (ms por texto):")
+    print(f"{'valor':>8}  {'reglas':>8}  {'escáner':>8}  {'campo':<18} {'n':>3}")
+    for cascade_ms, name, count, separate_ms, combined_ms in sorted(field_rows, reverse=True):
+        print(f"{cascade_ms:8.3f}  {separate_ms:8.3f}  {combined_ms:8.3f}  {name:<18} {count:>3}")
+
+
+if __name__ == '__main__':
+    main()
@@ -12,18 +12,38 @@ sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
 from src.ocr_processor import OCRProcessor
 from src.data_normalizer import DataNormalizer
-from src.excel_exporter import ExcelExporter
-from src.pdf_exporter import PDFExporter
+from src.detection_store import DetectionStore
+from src.itinerary_store import ItineraryStore
+from src.fast_exporters import EXPORTERS, FORMAT_LABELS, get_exporter
 from src.utils import setup_logging
+from src.vessel_registry import VesselRegistry
+from src.workbook_exporter import GROUPINGS, WorkbookExporter
+from src.carrier_templates import DEFAULT_TEMPLATES
 
 
-def process_itinerary(image_path: str, output_dir: str = 'output'):
+def process_itinerary(image_path: str, output_dir: str = 'output', ocr: OCRProcessor = None,
+                      raw_data: dict = None, store: DetectionStore = None,
+                      normalizer: DataNormalizer = None, formats=('excel', 'pdf')):
     """
-    Procesa una imagen de itinerario y genera archivos Excel y PDF.
+    Procesa una imagen de itinerario y genera los archivos de salida (Excel y PDF por defecto).
     
     Args:
         image_path: Ruta a la imagen del itinerario.
         output_dir: Directorio donde guardar los archivos de salida.
+        ocr: Procesador OCR a reutilizar (opcional). Si no se indica se crea
+             uno que usa el lector compartido del proceso.
+        raw_data: Datos crudos ya extraídos (por ejemplo por el pool de
+                  trabajadores). Si se indican, se omite el paso de OCR.
+        store: Archivo de detecciones donde guardar el resultado normalizado
+               (referencia para comparar con ``replay.py``).
+        normalizer: Normalizador a reutilizar (por ejemplo con el registro de
+                    naves compartido por todas las imágenes).
+        formats: Formatos a generar (claves de ``EXPORTERS``: excel, pdf, csv,
+                 jsonl, parquet).
+    
+    Returns:
+        Diccionario con la ruta de cada formato generado y los datos
+        normalizados (``data``), o None si hubo un error.
     """
     # Configurar logging
     setup_logging(log_level='INFO')
@@ -42,8 +62,10 @@ def process_itinerary(image_path: str, output_dir: str = 'output'):
     try:
         # 1. Procesar OCR
         print("1. Extrayendo texto con OCR...")
-        ocr = OCRProcessor()
-        raw_data = ocr.extract_structured_data(image_path)
+        if raw_data is None:
+            if ocr is None:
+                ocr = OCRProcessor()
+            raw_data = ocr.extract_structured_data(image_path)
         print(f"   ✓ Texto extraído ({len(raw_data.get('raw_text', ''))} caracteres)")
         print(f"   ✓ Fecha encontrada: {raw_data.get('fecha')}")
         print(f"   ✓ Nave encontrada: {raw_data.get('nave')}")
@@ -51,11 +73,13 @@ def process_itinerary(image_path: str, output_dir: str = 'output'):
         
         # 2. Normalizar datos
         print("\n2. Normalizando datos...")
-        normalizer = DataNormalizer()
-        normalized_data = normalizer.normalize(raw_data)
+        if normalizer is None:
+            normalizer = DataNormalizer()
+        # Registro compacto: el lote completo queda en memoria hasta el libro consolidado
+        normalized_data = normalizer.normalize_record(raw_data)
         
         # Extraer campos adicionales
-        additional = normalizer.extract_additional_fields(raw_data.get('raw_text', ''))
+        additional = normalizer.extract_additional_fields(raw_data.get('documento') or raw_data.get('raw_text', ''))
         normalized_data.update(additional)
         
         print(f"   ✓ Fecha normalizada: {normalized_data.get('fecha_normalizada')}")
@@ -63,30 +87,25 @@ def process_itinerary(image_path: str, output_dir: str = 'output'):
         print(f"   ✓ Semana normalizada: {normalized_data.get('semana_normalizada')}")
         if additional:
             print(f"   ✓ Campos adicionales: {list(additional.keys())}")
+        if store is not None:
+            store.put_result(store.make_key(image_path), normalized_data)
         
-        # 3. Exportar a Excel
-        print("\n3. Generando archivo Excel...")
-        excel_exporter = ExcelExporter()
-        excel_path = output_path / f"{image_name}_datos.xlsx"
-        excel_exporter.export_single(normalized_data, str(excel_path))
-        print(f"   ✓ Archivo Excel generado: {excel_path}")
-        
-        # 4. Exportar a PDF
-        print("\n4. Generando archivo PDF...")
-        pdf_exporter = PDFExporter()
-        pdf_path = output_path / f"{image_name}_datos.pdf"
-        pdf_exporter.export_single(normalized_data, str(pdf_path))
-        print(f"   ✓ Archivo PDF generado: {pdf_path}")
+        # 3. Exportar en cada formato
+        result = {}
+        for step, format_name in enumerate(formats, 3):
+            exporter = get_exporter(format_name)
+            print(f"\n{step}. Generando archivo {FORMAT_LABELS[format_name]}...")
+            file_path = output_path / f"{image_name}_datos{exporter.extension}"
+            exporter.export_single(normalized_data, str(file_path))
+            result[format_name] = str(file_path)
+            print(f"   ✓ Archivo {FORMAT_LABELS[format_name]} generado: {file_path}")
         
         print(f"\n{'='*60}")
         print("✓ Procesamiento completado exitosamente")
         print(f"{'='*60}\n")
         
-        return {
-            'excel': str(excel_path),
-            'pdf': str(pdf_path),
-            'data': normalized_data
-        }
+        result['data'] = normalized_data
+        return result
         
     except FileNotFoundError as e:
         print(f"\n✗ Error: {str(e)}")
@@ -106,9 +125,10 @@ def main():
         description='Procesa imágenes de itinerarios de navieras con OCR'
     )
     parser.add_argument(
-        'image',
+        'images',
         type=str,
-        help='Ruta a la imagen del itinerario a procesar'
+        nargs='+',
+        help='Ruta(s) a la(s) imagen(es) del itinerario a procesar'
     )
     parser.add_argument(
         '-o', '--output',
@@ -116,23 +136,171 @@ def main():
         default='output',
         help='Directorio de salida (default: output)'
     )
+    parser.add_argument(
+        '-w', '--workers',
+        type=int,
+        default=0,
+        help='Procesos OCR en paralelo (0 = sin pool, default: 0)'
+    )
+    parser.add_argument(
+        '--max-jobs',
+        type=int,
+        default=50,
+        help='Imágenes por trabajador antes de reiniciarlo (default: 50)'
+    )
+    parser.add_argument(
+        '--cache-dir',
+        type=str,
+        default='cache/ocr',
+        help='Directorio de la caché de detecciones OCR (default: cache/ocr)'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='No usar la caché de detecciones OCR'
+    )
+    parser.add_argument(
+        '--detecciones-dir',
+        type=str,
+        default='detecciones',
+        help='Directorio del archivo de detecciones para replay.py (default: detecciones)'
+    )
+    parser.add_argument(
+        '--no-detecciones',
+        action='store_true',
+        help='No guardar las detecciones de cada imagen'
+    )
+    parser.add_argument(
+        '--registro-naves',
+        type=str,
+        default='naves.json',
+        help='Registro de naves para unificar los nombres entre documentos (default: naves.json)'
+    )
+    parser.add_argument(
+        '--no-registro-naves',
+        action='store_true',
+        help='No unificar los nombres de naves con el registro'
+    )
+    parser.add_argument(
+        '--itinerarios-dir',
+        type=str,
+        default='itinerarios',
+        help='Almacén de itinerarios para consultas agregadas (default: itinerarios)'
+    )
+    parser.add_argument(
+        '--no-itinerarios',
+        action='store_true',
+        help='No agregar los resultados al almacén de itinerarios'
+    )
+    parser.add_argument(
+        '-f', '--formatos',
+        type=str,
+        default='excel,pdf',
+        help=f"Formatos de salida separados por comas: {', '.join(EXPORTERS)} (default: excel,pdf)"
+    )
+    parser.add_argument(
+        '--libro',
+        type=str,
+        default=None,
+        help='Libro Excel consolidado con todos los documentos del lote (opcional)'
+    )
+    parser.add_argument(
+        '--agrupar',
+        choices=sorted(GROUPINGS),
+        default='naviera',
+        help='Hojas del libro consolidado: una por naviera o por semana (default: naviera)'
+    )
+    parser.add_argument(
+        '--preprocess',
+        action='store_true',
+        help='Reducir y normalizar las imágenes antes del OCR (experimental; por defecto se '
+             'envía la imagen original a EasyOCR)'
+    )
+    parser.add_argument(
+        '--plantillas',
+        action='store_true',
+        help='Extraer con las plantillas por naviera (experimental; por defecto solo la '
+             'extracción genérica)'
+    )
     
     args = parser.parse_args()
     
-    # Verificar que la imagen existe
-    image_path = Path(args.image)
-    if not image_path.exists():
-        print(f"Error: La imagen no existe: {args.image}")
-        sys.exit(1)
+    formats = [name.strip().lower() for name in args.formatos.split(',') if name.strip()]
+    for format_name in formats:
+        try:
+            get_exporter(format_name)
+        except (ValueError, ImportError) as e:
+            print(f"Error: {str(e)}")
+            sys.exit(1)
+    
+    # Verificar que las imágenes existen
+    for image in args.images:
+        if not Path(image).exists():
+            print(f"Error: La imagen no existe: {image}")
+            sys.exit(1)
     
-    # Procesar
-    result = process_itinerary(str(image_path), args.output)
+    cache_dir = None if args.no_cache else args.cache_dir
+    store_dir = None if args.no_detecciones else args.detecciones_dir
+    store = DetectionStore(store_dir) if store_dir else None
+    registry = None if args.no_registro_naves else VesselRegistry(args.registro_naves)
+    normalizer = DataNormalizer(vessel_registry=registry)
+    itineraries = None
+    if not args.no_itinerarios:
+        itineraries_path = Path(args.itinerarios_dir)
+        itineraries = (ItineraryStore.load(itineraries_path) if (itineraries_path / 'meta.json').exists()
+                       else ItineraryStore())
+    workbook = WorkbookExporter(args.libro, group_by=args.agrupar) if args.libro else None
+    failed = False
     
-    if result:
-        print(f"\nArchivos generados:")
-        print(f"  - Excel: {result['excel']}")
-        print(f"  - PDF: {result['pdf']}")
+    def report(image, result):
+        if result:
+            if itineraries is not None:
+                itineraries.append(result['data'], DetectionStore.make_key(image))
+            if workbook is not None:
+                workbook.add(result['data'], Path(image).name)
+            print(f"\nArchivos generados:")
+            for format_name in formats:
+                print(f"  - {FORMAT_LABELS[format_name]}: {result[format_name]}")
+            return False
+        return True
+    
+    if args.workers > 0:
+        # Pool de procesos: el OCR corre en paralelo y los resultados llegan en orden
+        from src.worker_pool import OCRWorkerPool
+        
+        with OCRWorkerPool(workers=args.workers, max_jobs_per_worker=args.max_jobs,
+                           cache_dir=cache_dir, preprocess=args.preprocess,
+                           store_dir=store_dir, templates=args.plantillas) as pool:
+            for image, raw_data, error in pool.imap_structured_data(args.images):
+                if error:
+                    print(f"\n✗ Error al procesar {image}: {error}")
+                    failed = True
+                    continue
+                failed |= report(image, process_itinerary(image, args.output, raw_data=raw_data, store=store,
+                                                          normalizer=normalizer, formats=formats))
     else:
+        # Un solo procesador para todas las imágenes (el lector EasyOCR se carga una vez)
+        from src.ocr_cache import OCRCache
+        from src.image_preprocessor import ImagePreprocessor
+        
+        ocr = OCRProcessor(
+            cache=OCRCache(cache_dir) if cache_dir else None,
+            preprocessor=ImagePreprocessor() if args.preprocess else None,
+            templates=DEFAULT_TEMPLATES if args.plantillas else None,
+            store=store,
+        )
+        for image in args.images:
+            failed |= report(image, process_itinerary(image, args.output, ocr=ocr, store=store,
+                                                      normalizer=normalizer, formats=formats))
+    
+    if registry is not None:
+        registry.save()
+    if itineraries is not None:
+        itineraries.save(args.itinerarios_dir)
+    if workbook is not None:
+        print(f"\nLibro consolidado ({workbook.documents} documentos): {workbook.close()}")
+    
+    if failed:
         sys.exit(1)
 
 
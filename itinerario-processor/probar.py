@@ -35,7 +35,9 @@ def main():
     try:
         # 1. Crear procesador OCR
         print("1. Inicializando EasyOCR...")
-        ocr = OCRProcessor()  # EasyOCR se inicializa automáticamente con español e inglés
+        # El lector EasyOCR (español e inglés) se toma del registro compartido:
+        # si ya estaba cargado en este proceso no se vuelven a leer los modelos
+        ocr = OCRProcessor()
         print("   OK")
         
         # 2. Extraer texto de la imagen
@@ -51,7 +53,7 @@ def main():
         datos_normalizados = normalizador.normalize(datos_crudos)
         
         # Extraer campos adicionales
-        adicionales = normalizador.extract_additional_fields(datos_crudos.get('raw_text', ''))
+        adicionales = normalizador.extract_additional_fields(datos_crudos.get('documento') or datos_crudos.get('raw_text', ''))
         datos_normalizados.update(adicionales)
         print("   OK")
         
@@ -0,0 +1,270 @@
+"""
+Reprocesa las detecciones OCR guardadas sin volver a ejecutar el OCR.
+
+Tras cambiar una regla de extracción o de normalización, vuelve a correr
+extracción → normalización (→ exportación, opcional) sobre todo el archivo de
+detecciones, en paralelo, e informa qué campos cambiaron respecto del último
+resultado guardado de cada imagen.
+
+Uso:
+    python replay.py                                  # informe de cambios
+    python replay.py --guardar                        # fijar los resultados actuales como referencia
+    python replay.py -w 8 --exportar excel -o output  # reexportar todo
+"""
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Agregar el directorio src al path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from src.detection_store import EXCLUDED_RESULT_FIELDS, DetectionStore
+from src.ocr_document import OCRDocument
+from src.vessel_registry import VesselRegistry
+
+# Estado propio de cada proceso trabajador
+_worker_state = None
+
+
+def _init_worker(store_dir: str, registry_path: Optional[str] = None, templates: bool = False,
+                 output_dir: Optional[str] = None, formats: Tuple[str, ...] = ()):
+    """Inicializa un proceso trabajador (sin cargar EasyOCR: el lector es perezoso)."""
+    global _worker_state
+
+    from src.ocr_processor import OCRProcessor
+    from src.data_normalizer import DataNormalizer
+    from src.carrier_templates import DEFAULT_TEMPLATES
+    # Solo lectura: el resultado no depende del orden en que cada proceso ve las naves
+    registry = VesselRegistry(registry_path, read_only=True) if registry_path else None
+    ocr = OCRProcessor(gpu=False, templates=DEFAULT_TEMPLATES if templates else None)
+    exporters = []
+    if 'excel' in formats:
+        from src.excel_exporter import ExcelExporter
+        exporters.append(ExcelExporter())
+    if 'pdf' in formats:
+        from src.pdf_exporter import PDFExporter
+        exporters.append(PDFExporter())
+    _worker_state = (DetectionStore(store_dir), ocr, DataNormalizer(vessel_registry=registry),
+                     Path(output_dir) if output_dir else None, exporters)
+
+
+def _replay_one(key: str) -> Tuple[str, Optional[str], Optional[Dict], Optional[str]]:
+    """
+    Extrae, normaliza y (si se pidió) exporta una imagen desde sus detecciones. Nunca lanza.
+
+    La exportación corre en el trabajador, en paralelo con las demás imágenes.
+
+    Returns:
+        Tupla (clave, ruta original, datos normalizados o None, mensaje de error o None).
+    """
+    store, ocr, normalizer, output_dir, exporters = _worker_state
+    image = None
+    try:
+        stored = store.get(key)
+        image = stored.image
+        doc = OCRDocument.from_detections(stored.detections, ocr.min_confidence)
+        # Registro compacto: es lo que viaja de vuelta al proceso principal
+        record = normalizer.normalize_record(ocr.extract_structured_data_from_document(doc))
+        record.update(normalizer.extract_additional_fields(doc))
+        if exporters:
+            _export(record, image, key, output_dir, exporters)
+        return key, image, record.to_dict(), None
+    except Exception as e:
+        return key, image, None, str(e)
+
+
+def _flatten(value, prefix: str = '') -> Dict[str, object]:
+    """Aplana diccionarios y listas anidados en rutas como ``naves_normalizadas[0].etd``."""
+    if isinstance(value, dict):
+        flat = {}
+        for field, item in value.items():
+            flat.update(_flatten(item, f'{prefix}.{field}' if prefix else field))
+        return flat
+    if isinstance(value, list) and any(isinstance(item, (dict, list)) for item in value):
+        flat = {}
+        for i, item in enumerate(value):
+            flat.update(_flatten(item, f'{prefix}[{i}]'))
+        return flat
+    return {prefix: value}
+
+
+def changed_fields(previous: Dict, current: Dict) -> Dict[str, Tuple[object, object]]:
+    """
+    Campos que cambiaron entre dos resultados normalizados.
+
+    Args:
+        previous: Resultado guardado (tal como se leyó del JSON).
+        current: Resultado recién calculado.
+
+    Returns:
+        Diccionario {ruta del campo: (antes, después)}.
+    """
+    current = {field: value for field, value in current.items() if field not in EXCLUDED_RESULT_FIELDS}
+    # Pasar por JSON para comparar con los mismos tipos que el resultado guardado
+    before = _flatten(previous)
+    after = _flatten(json.loads(json.dumps(current, default=str)))
+    fields = list(after) + [field for field in before if field not in after]
+    return {
+        field: (before.get(field), after.get(field))
+        for field in fields
+        if before.get(field) != after.get(field)
+    }
+
+
+def _export(normalized: Dict, image: Optional[str], key: str, output_dir: Path, exporters: list):
+    """Exporta un resultado con los exportadores habituales."""
+    base_name = Path(image).stem if image else key
+    for exporter in exporters:
+        exporter.export_single(normalized, str(output_dir / f'{base_name}_datos{exporter.extension}'))
+
+
+def main():
+    """Función principal."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Reprocesa las detecciones OCR guardadas e informa los campos que cambiaron'
+    )
+    parser.add_argument(
+        'claves',
+        type=str,
+        nargs='*',
+        help='Claves a reprocesar (default: todas las del archivo)'
+    )
+    parser.add_argument(
+        '--detecciones-dir',
+        type=str,
+        default='detecciones',
+        help='Directorio del archivo de detecciones (default: detecciones)'
+    )
+    parser.add_argument(
+        '--registro-naves',
+        type=str,
+        default='naves.json',
+        help='Registro de naves a usar, sin modificarlo (default: naves.json; vacío = sin registro)'
+    )
+    parser.add_argument(
+        '-w', '--workers',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='Procesos en paralelo (default: núcleos disponibles)'
+    )
+    parser.add_argument(
+        '--guardar',
+        action='store_true',
+        help='Guardar los nuevos resultados como referencia para la próxima comparación'
+    )
+    parser.add_argument(
+        '--exportar',
+        choices=['excel', 'pdf', 'ambos'],
+        help='Volver a exportar cada resultado'
+    )
+    parser.add_argument(
+        '-o', '--output',
+        type=str,
+        default='output',
+        help='Directorio de salida de la exportación (default: output)'
+    )
+    parser.add_argument(
+        '--plantillas',
+        action='store_true',
+        help='Extraer con las plantillas por naviera (experimental) para compararlas con el camino genérico'
+    )
+    parser.add_argument(
+        '--mostrar',
+        type=int,
+        default=20,
+        help='Imágenes con cambios a detallar (default: 20)'
+    )
+
+    args = parser.parse_args()
+
+    if not Path(args.detecciones_dir).is_dir():
+        print(f"Error: no existe el archivo de detecciones: {args.detecciones_dir}")
+        sys.exit(1)
+    store = DetectionStore(args.detecciones_dir)
+    keys = args.claves or store.keys()
+    if not keys:
+        print("No hay detecciones guardadas")
+        return
+
+    formats = ['excel', 'pdf'] if args.exportar == 'ambos' else [args.exportar] if args.exportar else []
+    output_dir = Path(args.output)
+    if formats:
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+    initargs = (args.detecciones_dir, args.registro_naves, args.plantillas, str(output_dir), tuple(formats))
+    workers = max(1, min(args.workers, len(keys)))
+    print(f"Reprocesando {len(keys)} imágenes con {workers} procesos...\n")
+
+    if workers == 1:
+        _init_worker(*initargs)
+        results = map(_replay_one, keys)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                       initargs=initargs)
+        # Lotes grandes: cada imagen tarda milisegundos
+        results = executor.map(_replay_one, keys, chunksize=max(1, len(keys) // (workers * 4)))
+
+    changes: List[Tuple[str, Optional[str], Dict]] = []
+    field_counts: Dict[str, int] = {}
+    errors = []
+    without_reference = 0
+    try:
+        for key, image, normalized, error in results:
+            if error:
+                errors.append((key, error))
+                continue
+
+            previous = store.get_result(key)
+            if previous is None:
+                without_reference += 1
+            else:
+                diff = changed_fields(previous, normalized)
+                if diff:
+                    changes.append((key, image, diff))
+                    for field in diff:
+                        # Las naves cuentan como un solo campo: naves_normalizadas[*].etd
+                        name = re.sub(r'\[\d+\]', '[*]', field)
+                        field_counts[name] = field_counts.get(name, 0) + 1
+
+            if args.guardar:
+                store.put_result(key, normalized)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    compared = len(keys) - len(errors) - without_reference
+    print(f"Comparadas: {compared}  con cambios: {len(changes)}  "
+          f"sin referencia: {without_reference}  errores: {len(errors)}")
+
+    if field_counts:
+        print("\nCampos que cambiaron (imágenes):")
+        for field, count in sorted(field_counts.items(), key=lambda item: (-item[1], item[0])):
+            print(f"  {count:6d}  {field}")
+
+    for key, image, diff in changes[:args.mostrar]:
+        print(f"\n{image or key}")
+        for field, (before, after) in diff.items():
+            print(f"  {field}: {before!r} -> {after!r}")
+    if len(changes) > args.mostrar:
+        print(f"\n... y {len(changes) - args.mostrar} imágenes más con cambios")
+
+    for key, error in errors:
+        print(f"\n✗ Error al reprocesar {key}: {error}")
+
+    if args.guardar:
+        print(f"\nResultados guardados como referencia en {args.detecciones_dir}")
+    if formats:
+        print(f"Archivos exportados en {output_dir}")
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,16 +2,49 @@
 Módulo de procesamiento de itinerarios de navieras.
 """
 from .ocr_processor import OCRProcessor
+from .ocr_document import LineIndex, OCRDocument, OCRToken
+from .reader_registry import ReaderRegistry, default_registry
+from .ocr_cache import OCRCache
+from .detection_store import DetectionStore
+from .itinerary_store import ItineraryStore
+from .gazetteer import Gazetteer
+from .port_index import PortIndex
+from .vessel_registry import VesselRegistry
+from .carrier_templates import CarrierTemplate
+from .image_preprocessor import ImagePreprocessor
 from .data_normalizer import DataNormalizer
+from .records import Itinerary, VesselLeg
 from .excel_exporter import ExcelExporter
+from .workbook_exporter import DailyWorkbook, WorkbookExporter
 from .pdf_exporter import PDFExporter
+from .fast_exporters import CSVExporter, JSONLExporter, ParquetExporter
 from .utils import setup_logging, ensure_output_dir
 
 __all__ = [
     'OCRProcessor',
+    'OCRDocument',
+    'OCRToken',
+    'LineIndex',
+    'ReaderRegistry',
+    'default_registry',
+    'OCRCache',
+    'DetectionStore',
+    'ItineraryStore',
+    'Gazetteer',
+    'PortIndex',
+    'VesselRegistry',
+    'CarrierTemplate',
+    'ImagePreprocessor',
     'DataNormalizer',
+    'Itinerary',
+    'VesselLeg',
     'ExcelExporter',
+    'DailyWorkbook',
+    'WorkbookExporter',
     'PDFExporter',
+    'CSVExporter',
+    'JSONLExporter',
+    'ParquetExporter',
     'setup_logging',
     'ensure_output_dir',
 ]
@@ -0,0 +1,276 @@
+"""
+Plantillas de itinerarios por naviera.
+
+Cada naviera publica sus itinerarios con un formato estable. La huella
+(fingerprint) identifica naviera y formato a partir de unas pocas palabras del
+encabezado; si coincide, cada campo se lee directamente de la línea de su
+etiqueta ("ETD:", "Vessel:") en lugar de recorrer la cascada genérica de
+heurísticas. Los documentos sin plantilla siguen por el camino genérico.
+
+Las plantillas todavía no se han ajustado con capturas reales, así que
+``OCRProcessor`` no las usa salvo que se le pasen (``--plantillas`` en
+main.py y replay.py, ``OCR_TEMPLATES=1`` en app.py). Un valor leído con una
+plantilla solo se acepta si pasa las mismas validaciones que el camino
+genérico; si no, el campo se extrae con el extractor genérico.
+"""
+import re
+from typing import Dict, List, Optional
+
+from . import patterns
+from .gazetteer import Gazetteer
+from .ocr_document import OCRDocument
+from .port_index import PortIndex
+
+# Líneas del encabezado que se usan para la huella
+HEADER_LINES = 15
+
+# Las etiquetas de una sola palabra ("to", "vessel") aparecen también en texto
+# corrido; solo cuentan como etiqueta si van seguidas de este separador
+SHORT_LABEL_SEPARATOR = ':'
+
+# Campos de salida que se leen con la etiqueta de otro campo
+FIELD_ALIASES = {
+    'fecha_salida': 'etd',
+    'fecha_llegada': 'eta',
+    'puerto_origen': 'pol',
+    'puerto_destino': 'pod',
+}
+
+# Plantillas conocidas: naviera (nombre canónico del gazetteer), palabras del
+# encabezado que identifican el formato y etiquetas de cada campo
+TEMPLATES = [
+    {
+        'nombre': 'msc',
+        'naviera': 'MSC',
+        'marcadores': ['mediterranean shipping', 'schedule', 'vessel', 'voyage', 'etd', 'eta'],
+        'min_marcadores': 3,
+        'etiquetas': {
+            'nave': ['vessel name', 'vessel'],
+            'numero_viaje': ['voyage no', 'voyage', 'voy'],
+            'pol': ['port of loading', 'pol'],
+            'pod': ['port of discharge', 'pod'],
+            'etd': ['etd', 'departure'],
+            'eta': ['eta', 'arrival'],
+        },
+    },
+    {
+        'nombre': 'maersk',
+        'naviera': 'MAERSK',
+        'marcadores': ['schedule', 'vessel', 'voyage', 'departing', 'arriving', 'departure', 'arrival'],
+        'min_marcadores': 3,
+        'etiquetas': {
+            'nave': ['vessel'],
+            'numero_viaje': ['voyage no', 'voyage', 'voy'],
+            'pol': ['from', 'port of loading'],
+            'pod': ['to', 'port of discharge'],
+            'etd': ['departing', 'departure', 'etd'],
+            'eta': ['arriving', 'arrival', 'eta'],
+        },
+    },
+    {
+        'nombre': 'cma_cgm',
+        'naviera': 'CMA CGM',
+        'marcadores': ['vessel', 'voyage', 'pol', 'pod', 'etd', 'eta'],
+        'min_marcadores': 4,
+        'etiquetas': {
+            'nave': ['vessel'],
+            'numero_viaje': ['voyage', 'voy'],
+            'pol': ['pol', 'port of loading'],
+            'pod': ['pod', 'port of discharge'],
+            'etd': ['etd'],
+            'eta': ['eta'],
+        },
+    },
+    {
+        'nombre': 'hapag_lloyd',
+        'naviera': 'HAPAG-LLOYD',
+        'marcadores': ['schedule', 'vessel', 'voyage', 'departure', 'arrival', 'port of loading', 'port of discharge'],
+        'min_marcadores': 3,
+        'etiquetas': {
+            'nave': ['vessel'],
+            'numero_viaje': ['voyage no', 'voyage'],
+            'pol': ['port of loading', 'pol'],
+            'pod': ['port of discharge', 'pod'],
+            'etd': ['departure', 'etd'],
+            'eta': ['arrival', 'eta'],
+        },
+    },
+]
+
+
+def _words_regex(words: List[str]) -> str:
+    """Alternancia de palabras o frases completas (las más largas primero)."""
+    alternatives = sorted((re.escape(word).replace(r'\ ', r'\s+') for word in words), key=len, reverse=True)
+    return r'\b(?:' + '|'.join(alternatives) + r')\b'
+
+
+class CarrierTemplate:
+    """Formato de itinerario de una naviera con extractores por etiqueta."""
+
+    def __init__(self, name: str, carrier: str, markers: List[str], labels: Dict[str, List[str]],
+                 min_markers: int = 3):
+        """
+        Args:
+            name: Identificador de la plantilla.
+            carrier: Nombre canónico de la naviera (como en el gazetteer).
+            markers: Palabras del encabezado que identifican el formato.
+            labels: Etiquetas de cada campo, por ejemplo {'etd': ['etd', 'departure']}.
+            min_markers: Marcadores necesarios para aceptar la plantilla.
+        """
+        self.name = name
+        self.carrier = carrier
+        self.min_markers = min_markers
+        self._markers = [re.compile(_words_regex([marker]), re.IGNORECASE) for marker in markers]
+        # Línea que empieza con la etiqueta del campo: el resto de la línea es el valor
+        self._labels = {field: self._label_regex(words) for field, words in labels.items()}
+        # Un valor que empieza con otra etiqueta es una fila de encabezado de tabla
+        all_labels = [word for words in labels.values() for word in words]
+        self._header_word = re.compile(r'^\s*' + _words_regex(all_labels), re.IGNORECASE)
+        # Marcadores que no son etiquetas ("schedule"): una línea que los contiene
+        # es el título del documento, no un campo
+        title_markers = [marker for marker in markers if marker not in all_labels]
+        self._title_line = (re.compile(_words_regex(title_markers), re.IGNORECASE)
+                            if title_markers else None)
+
+    @staticmethod
+    def _label_regex(words: List[str]) -> re.Pattern:
+        """Etiqueta al inicio de la línea; las de una palabra exigen ``SHORT_LABEL_SEPARATOR``."""
+        phrases = [word for word in words if ' ' in word]
+        single = [word for word in words if ' ' not in word]
+        alternatives = []
+        if phrases:
+            alternatives.append(_words_regex(phrases) + r'\s*[:.#-]?')
+        if single:
+            alternatives.append(_words_regex(single) + r'\s*' + re.escape(SHORT_LABEL_SEPARATOR))
+        return re.compile(r'^\s*(?:' + '|'.join(alternatives) + r')\s*(.*)$', re.IGNORECASE)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'CarrierTemplate':
+        """Construye la plantilla desde su definición en ``TEMPLATES``."""
+        return cls(data['nombre'], data['naviera'], data['marcadores'], data['etiquetas'],
+                   data.get('min_marcadores', 3))
+
+    def score(self, header: OCRDocument) -> int:
+        """Cantidad de marcadores presentes en el encabezado."""
+        return sum(1 for marker in self._markers if marker.search(header.text))
+
+    def labeled_value(self, doc: OCRDocument, field: str) -> Optional[str]:
+        """
+        Texto que sigue a la etiqueta del campo (o la línea siguiente si la etiqueta está sola).
+
+        Args:
+            doc: Documento OCR.
+            field: Campo de la plantilla.
+
+        Returns:
+            Texto crudo del valor o None.
+        """
+        label = self._labels.get(field)
+        if label is None:
+            return None
+        lines = doc.lines
+        for i, line in enumerate(lines):
+            if self._title_line is not None and self._title_line.search(line):
+                continue
+            match = label.match(line)
+            if not match:
+                continue
+            value = match.group(1).strip()
+            if not value and i + 1 < len(lines):
+                value = lines[i + 1].strip()
+                if self._title_line is not None and self._title_line.search(value):
+                    continue
+            if value and not self._header_word.match(value):
+                return value
+        return None
+
+    def extract(self, doc: OCRDocument, field: str, gazetteer: Gazetteer,
+                port_index: Optional[PortIndex] = None) -> Optional[str]:
+        """
+        Extrae un campo con la plantilla.
+
+        Args:
+            doc: Documento OCR.
+            field: Campo de salida (acepta los alias de ``FIELD_ALIASES``).
+            gazetteer: Diccionario para canonizar puertos y descartar naves que son puertos.
+            port_index: Índice de puertos para reconocer los POD que no están en
+                        el gazetteer (opcional).
+
+        Returns:
+            Valor del campo, o None si la plantilla no lo encuentra o el valor
+            no pasa la validación.
+        """
+        if field == 'naviera':
+            return self.carrier
+
+        field = FIELD_ALIASES.get(field, field)
+        value = doc.cached(('plantilla', self.name, field), lambda: self.labeled_value(doc, field))
+        if not value:
+            return None
+
+        if field in ('etd', 'eta'):
+            return patterns.get('fecha').extract(value)
+        if field == 'pol':
+            # POL solo San Antonio o Valparaíso
+            port = gazetteer.first(value, 'puerto', lambda entry: entry.pol)
+            return port.name if port else None
+        if field == 'pod':
+            # Solo puertos conocidos: el gazetteer o el índice de puertos
+            port = gazetteer.first(value, 'puerto')
+            if port is None and port_index is not None:
+                port = port_index.resolve(value)
+            if port is None or port.pol:
+                return None
+            return port.name
+        if field == 'nave':
+            words = []
+            for word in value.split():
+                if patterns.WORD_DATE.match(word) or patterns.WORD_VOYAGE.match(word) or len(word) > 20:
+                    break
+                words.append(word)
+                if len(words) >= 5:
+                    break
+            name = ' '.join(words)
+            # Mismas reglas que el extractor genérico de naves
+            if (len(name) <= 2 or not patterns.HAS_LETTER.search(name)
+                    or gazetteer.contains(name, ('puerto', 'indicador'))):
+                return None
+            return name
+        if field == 'numero_viaje':
+            voyage = value.split()[0].strip('.,;:')
+            # Un número de viaje siempre lleva dígitos ("123W", "FA412A")
+            return voyage if any(char.isdigit() for char in voyage) else None
+        return value
+
+
+# Plantillas compiladas una sola vez al importar el módulo
+DEFAULT_TEMPLATES = [CarrierTemplate.from_dict(data) for data in TEMPLATES]
+
+
+def fingerprint(doc: OCRDocument, gazetteer: Gazetteer,
+                templates: Optional[List[CarrierTemplate]] = None) -> Optional[CarrierTemplate]:
+    """
+    Identifica la plantilla de un documento a partir de su encabezado.
+
+    Args:
+        doc: Documento OCR.
+        gazetteer: Diccionario para reconocer la naviera.
+        templates: Plantillas candidatas (por defecto ``DEFAULT_TEMPLATES``).
+
+    Returns:
+        Plantilla con más marcadores presentes, o None si el formato no se reconoce.
+    """
+    templates = DEFAULT_TEMPLATES if templates is None else templates
+    header = doc.slice_lines(0, HEADER_LINES)
+    carrier = gazetteer.first(header, 'naviera')
+    if carrier is None:
+        return None
+
+    best, best_score = None, 0
+    for template in templates:
+        if template.carrier != carrier.name:
+            continue
+        score = template.score(header)
+        if score >= template.min_markers and score > best_score:
+            best, best_score = template, score
+    return best
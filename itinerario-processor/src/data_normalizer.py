@@ -2,22 +2,40 @@
 Módulo para normalizar datos extraídos de itinerarios.
 """
 import re
-from typing import Dict, Optional
-from datetime import datetime
+from typing import Dict, Iterable, Optional, Union
 import logging
 
+import numpy as np
+import pandas as pd
+
+from . import date_parser, patterns
+from .gazetteer import Gazetteer, load_default
+from .ocr_document import OCRDocument
+from .port_index import PortIndex, load_default as load_port_index
+from .records import Itinerary
+from .vessel_registry import VesselRegistry
+
 logger = logging.getLogger(__name__)
 
 
 class DataNormalizer:
     """Normalizador de datos extraídos de itinerarios."""
     
-    # Mapeo de meses en español
-    MONTHS_ES = {
-        'enero': '01', 'febrero': '02', 'marzo': '03', 'abril': '04',
-        'mayo': '05', 'junio': '06', 'julio': '07', 'agosto': '08',
-        'septiembre': '09', 'octubre': '10', 'noviembre': '11', 'diciembre': '12'
-    }
+    def __init__(self, gazetteer: Optional[Gazetteer] = None, port_index: Optional[PortIndex] = None,
+                 vessel_registry: Optional[VesselRegistry] = None):
+        """
+        Inicializa el normalizador.
+        
+        Args:
+            gazetteer: Diccionario de navieras y puertos (por defecto ``data/gazetteer.json``).
+            port_index: Índice de puertos con corrección de OCR (por defecto el del
+                        gazetteer más los CSV de ``data/unlocode/``).
+            vessel_registry: Registro de naves para unificar los nombres entre
+                             documentos. Sin registro, los nombres solo se limpian.
+        """
+        self.gazetteer = gazetteer or load_default()
+        self.port_index = port_index or load_port_index()
+        self.vessel_registry = vessel_registry
     
     def normalize(self, raw_data: Dict[str, str]) -> Dict[str, any]:
         """
@@ -59,7 +77,7 @@ class DataNormalizer:
                 nave_eta = nave_data.get('eta') or nave_data.get('fecha_llegada') or eta_general
                 
                 nave_normalizada = {
-                    'nombre': self.normalize_vessel(nave_data.get('nombre')) or 'No encontrada',
+                    'nombre': self.normalize_vessel(nave_data.get('nombre'), nave_data.get('imo')) or 'No encontrada',
                     'nombre_original': nave_data.get('nombre') or 'No encontrada',
                     'naviera': nave_data.get('naviera') or normalized.get('naviera') or 'No encontrada',
                     'pol': self.normalize_pol(nave_data.get('pol')) or normalized.get('pol') or 'No encontrado',
@@ -72,8 +90,10 @@ class DataNormalizer:
                     'numero_contenedor': nave_data.get('numero_contenedor'),
                     'numero_booking': nave_data.get('numero_booking'),
                 }
+                nave_normalizada.update(self.port_locodes(nave_normalizada))
                 normalized['naves_normalizadas'].append(nave_normalizada)
             
+            normalized.update(self.port_locodes(normalized))
             return normalized
         
         # Una sola nave - normalización normal con campos requeridos
@@ -85,8 +105,9 @@ class DataNormalizer:
             'multiple_naves': False,
             # Campos siempre requeridos
             'naviera': raw_data.get('naviera') or 'No encontrada',
-            'nave_normalizada': self.normalize_vessel(raw_data.get('nave')) or 'No encontrada',
+            'nave_normalizada': self.normalize_vessel(raw_data.get('nave'), raw_data.get('imo')) or 'No encontrada',
             'nave_original': raw_data.get('nave') or 'No encontrada',
+            'imo': raw_data.get('imo'),
             'pol': self.normalize_pol(raw_data.get('pol')) or 'No encontrado',
             'pod': self.normalize_port(raw_data.get('pod')) or 'No encontrado',
             'etd': self.normalize_date(etd_raw) or etd_raw or 'No encontrada',
@@ -107,7 +128,131 @@ class DataNormalizer:
             'semana_original': raw_data.get('semana'),
             'texto_completo': raw_data.get('raw_text', ''),
         }
+        normalized.update(self.port_locodes(normalized))
+        
+        return normalized
+    
+    def normalize_record(self, raw_data: Dict[str, str]) -> Itinerary:
+        """
+        Normaliza los datos extraídos del OCR en un registro compacto.
+        
+        Mismas reglas y mismas claves que ``normalize``, pero en un
+        ``Itinerary`` con ``__slots__``: pensado para lotes que mantienen
+        muchos itinerarios en memoria. El registro se comporta como el
+        diccionario de ``normalize`` (``registro['pol']``, ``update``, ...).
+        
+        Args:
+            raw_data: Diccionario con datos crudos extraídos.
+            
+        Returns:
+            Itinerario normalizado.
+        """
+        return Itinerary.from_dict(self.normalize(raw_data))
+    
+    def normalize_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Normaliza un lote de registros por columnas.
+        
+        Aplica las mismas reglas que ``normalize`` para un documento de una sola
+        nave, pero por columnas: cada columna se factoriza, la regla se aplica
+        una vez por valor distinto y el resultado se reparte a todas las filas
+        con una indexación de numpy. En un lote los mismos puertos, naves y
+        fechas se repiten miles de veces, así que el costo depende de los
+        valores distintos y no de las filas. Pensado para reprocesar el
+        histórico y para exportaciones masivas (una fila por nave).
+        
+        Args:
+            df: Datos crudos, una fila por registro, con las columnas de
+                ``extract_structured_data`` (naviera, nave, pol, pod, etd, eta,
+                fecha, fecha_salida, fecha_llegada, semana, ...). Las columnas
+                que falten se consideran vacías.
+            
+        Returns:
+            DataFrame con las mismas columnas y valores que devuelve
+            ``normalize`` (un valor faltante en ``df`` equivale a una clave
+            ausente en el diccionario) y el mismo índice que ``df``.
+        """
+        factorized: Dict[str, tuple] = {}
+        
+        def codes_of(name: str) -> tuple:
+            """Códigos y valores distintos de una columna (factorizada una sola vez)."""
+            if name not in factorized:
+                if name in df:
+                    codes, uniques = pd.factorize(df[name])  # Faltantes: código -1
+                    factorized[name] = (codes, np.asarray(uniques, dtype=object))
+                else:
+                    factorized[name] = (np.full(len(df), -1, dtype=np.intp), np.empty(0, dtype=object))
+            return factorized[name]
+        
+        def per_value(func, name: str) -> np.ndarray:
+            """Aplica ``func`` una vez por valor distinto de la columna y reparte el resultado."""
+            codes, uniques = codes_of(name)
+            results = np.empty(len(uniques) + 1, dtype=object)
+            results[:-1] = [func(value) for value in uniques]
+            results[-1] = func(None)  # El código -1 toma el último elemento
+            return results[codes]
+        
+        def either(func, first: str, second: str) -> np.ndarray:
+            """``func(first or second)`` fila por fila."""
+            codes, uniques = codes_of(first)
+            present = np.zeros(len(uniques) + 1, dtype=bool)
+            present[:-1] = [bool(value) for value in uniques]
+            return np.where(present[codes], per_value(func, first), per_value(func, second))
+        
+        def per_pair(func, first: str, second: str) -> np.ndarray:
+            """Aplica ``func(first, second)`` una vez por par distinto, en orden de aparición."""
+            codes_first, uniques_first = codes_of(first)
+            codes_second, uniques_second = codes_of(second)
+            width = len(uniques_second) + 1
+            pairs, pair_uniques = pd.factorize((codes_first + 1) * width + (codes_second + 1))
+            results = np.empty(len(pair_uniques), dtype=object)
+            results[:] = [
+                func(uniques_first[pair // width - 1] if pair // width else None,
+                     uniques_second[pair % width - 1] if pair % width else None)
+                for pair in pair_uniques
+            ]
+            return results[pairs]
+        
+        def keep(value):
+            return value
+        
+        def or_default(missing: str):
+            return lambda value: value or missing
+        
+        def date_or_default(value):
+            return self.normalize_date(value) or value or 'No encontrada'
         
+        normalized = pd.DataFrame({
+            # Campos siempre requeridos
+            'naviera': per_value(or_default('No encontrada'), 'naviera'),
+            'nave_normalizada': per_pair(lambda nave, imo: self.normalize_vessel(nave, imo) or 'No encontrada',
+                                         'nave', 'imo'),
+            'nave_original': per_value(or_default('No encontrada'), 'nave'),
+            'imo': per_value(keep, 'imo'),
+            'pol': per_value(lambda value: self.normalize_pol(value) or 'No encontrado', 'pol'),
+            'pod': per_value(lambda value: self.normalize_port(value) or 'No encontrado', 'pod'),
+            # Asegurar que ETD y ETA siempre tengan valor
+            'etd': either(date_or_default, 'etd', 'fecha_salida'),
+            'eta': either(date_or_default, 'eta', 'fecha_llegada'),
+            # Campos adicionales
+            'fecha_normalizada': per_value(self.normalize_date, 'fecha'),
+            'fecha_salida_normalizada': per_value(self.normalize_date, 'fecha_salida'),
+            'fecha_llegada_normalizada': per_value(self.normalize_date, 'fecha_llegada'),
+            'semana_normalizada': per_value(self.normalize_week, 'semana'),
+            'puerto_origen': either(self.normalize_pol, 'pol', 'puerto_origen'),
+            'puerto_destino': either(self.normalize_port, 'pod', 'puerto_destino'),
+            'numero_contenedor': per_value(keep, 'numero_contenedor'),
+            'numero_booking': per_value(keep, 'numero_booking'),
+            # Valores originales
+            'fecha_original': per_value(keep, 'fecha'),
+            'fecha_salida_original': per_value(keep, 'fecha_salida'),
+            'fecha_llegada_original': per_value(keep, 'fecha_llegada'),
+            'semana_original': per_value(keep, 'semana'),
+            'texto_completo': per_value(or_default(''), 'raw_text'),
+            'pol_locode': per_value(lambda value: self.port_index.locode(self.normalize_pol(value)), 'pol'),
+            'pod_locode': per_value(lambda value: self.port_index.locode(self.normalize_port(value)), 'pod'),
+        }, index=df.index, dtype=object)  # Sin inferencia de tipos: mismos valores que normalize (None, no NaN)
+        normalized.insert(0, 'multiple_naves', False)
         return normalized
     
     def normalize_pol(self, pol_str: Optional[str]) -> Optional[str]:
@@ -131,59 +276,72 @@ class DataNormalizer:
         elif 'valpara' in pol_lower:
             return 'Valparaíso'
         
+        # Errores de OCR ("5an Antonio", "Valparalso"): solo puertos de carga
+        entry = self.port_index.resolve(pol_str)
+        if entry and entry.pol:
+            return entry.name
+        
         return None
     
+    def port_locodes(self, record: Dict[str, any]) -> Dict[str, Optional[str]]:
+        """
+        Códigos UN/LOCODE de los puertos ya normalizados de un registro.
+        
+        Args:
+            record: Registro con 'pol' y 'pod' normalizados.
+            
+        Returns:
+            Diccionario con 'pol_locode' y 'pod_locode' (None si el puerto no está en el índice).
+        """
+        return {
+            'pol_locode': self.port_index.locode(record.get('pol')),
+            'pod_locode': self.port_index.locode(record.get('pod')),
+        }
+    
     def normalize_date(self, date_str: Optional[str]) -> Optional[str]:
         """
         Normaliza una fecha a formato estándar YYYY-MM-DD.
         
         Args:
-            date_str: Fecha en formato variado.
+            date_str: Fecha en formato variado (ver ``date_parser``).
             
         Returns:
-            Fecha normalizada en formato YYYY-MM-DD o None si no se puede parsear.
+            Fecha normalizada en formato YYYY-MM-DD, el texto original si no se
+            puede interpretar, o None si no hay fecha.
         """
         if not date_str:
             return None
         
-        try:
-            # Intentar diferentes formatos
-            formats = [
-                '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d', '%Y-%m-%d',
-                '%d/%m/%y', '%d-%m-%y', '%y/%m/%d', '%y-%m-%d',
-            ]
-            
-            # Primero intentar con formatos estándar
-            for fmt in formats:
-                try:
-                    dt = datetime.strptime(date_str.strip(), fmt)
-                    return dt.strftime('%Y-%m-%d')
-                except ValueError:
-                    continue
-            
-            # Intentar con formato de texto (ej: "15 enero 2024")
-            for month_name, month_num in self.MONTHS_ES.items():
-                if month_name.lower() in date_str.lower():
-                    pattern = rf'(\d{{1,2}})\s+{month_name}\s+(\d{{4}})'
-                    match = re.search(pattern, date_str, re.IGNORECASE)
-                    if match:
-                        day = match.group(1).zfill(2)
-                        year = match.group(2)
-                        return f"{year}-{month_num}-{day}"
-            
+        normalized = date_parser.parse_date(date_str)
+        if normalized is None:
             logger.warning(f"No se pudo normalizar la fecha: {date_str}")
             return date_str  # Retornar original si no se puede normalizar
+        return normalized
+    
+    def normalize_dates(self, dates: Union[pd.Series, Iterable[Optional[str]]]) -> pd.Series:
+        """
+        Normaliza una columna completa de fechas (cada fecha distinta se interpreta una vez).
+        
+        Args:
+            dates: Serie o lista de fechas en formato variado.
             
-        except Exception as e:
-            logger.error(f"Error al normalizar fecha {date_str}: {str(e)}")
-            return date_str
+        Returns:
+            Serie con las fechas en formato YYYY-MM-DD (o el texto original si
+            no se pueden interpretar), con el mismo índice.
+        """
+        return date_parser.normalize_dates(dates)
     
-    def normalize_vessel(self, vessel_str: Optional[str]) -> Optional[str]:
+    def normalize_vessel(self, vessel_str: Optional[str], imo: Optional[str] = None) -> Optional[str]:
         """
         Normaliza el nombre de la nave (mayúsculas, espacios, etc.).
         
+        Con registro de naves, el nombre se resuelve a la nave registrada (por
+        IMO, por nombre o por coincidencia aproximada) y se devuelve su nombre
+        canónico; las naves nuevas quedan registradas con el nombre limpio.
+        
         Args:
             vessel_str: Nombre de la nave en formato variado.
+            imo: Número IMO de la nave, si el documento lo trae.
             
         Returns:
             Nombre de la nave normalizado.
@@ -196,9 +354,14 @@ class DataNormalizer:
         normalized = normalized.title()
         
         # Remover caracteres especiales no deseados
-        normalized = re.sub(r'[^\w\s-]', '', normalized)
+        normalized = re.sub(r'[^\w\s-]', '', normalized).strip()
+        
+        if normalized and self.vessel_registry is not None:
+            vessel = self.vessel_registry.resolve(normalized, imo)
+            if vessel:
+                return vessel.name
         
-        return normalized.strip()
+        return normalized
     
     def normalize_week(self, week_str: Optional[str]) -> Optional[int]:
         """
@@ -226,104 +389,48 @@ class DataNormalizer:
             logger.warning(f"No se pudo normalizar la semana: {week_str}")
             return None
     
-    def extract_additional_fields(self, text: str) -> Dict[str, any]:
+    def extract_additional_fields(self, text: Union[str, OCRDocument]) -> Dict[str, any]:
         """
         Extrae campos adicionales del texto completo.
         
         Args:
-            text: Texto completo extraído del OCR.
+            text: Documento OCR (``raw_data['documento']``) o texto completo extraído.
             
         Returns:
             Diccionario con campos adicionales extraídos.
         """
+        doc = OCRDocument.coerce(text)
         additional = {}
         
         # Extraer puertos
-        ports = self._extract_ports(text)
+        ports = self._extract_ports(doc)
         if ports:
             additional['puertos'] = ports
         
         # Extraer números de viaje
-        voyage = self._extract_voyage_number(text)
+        voyage = self._extract_voyage_number(doc)
         if voyage:
             additional['numero_viaje'] = voyage
         
         return additional
     
-    def _extract_ports(self, text: str) -> list:
+    def _extract_ports(self, doc: OCRDocument) -> list:
         """Extrae nombres de puertos del texto."""
-        # Lista común de puertos (puede extenderse)
-        common_ports = [
-            'valparaíso', 'san antonio', 'iquique', 'antofagasta', 'arica',
-            'callao', 'guayaquil', 'buenos aires', 'montevideo', 'santos',
-            'centra terminal', 'puerto centra', 'asia central', 'central terminal'
-        ]
-        
-        found_ports = []
-        text_lower = text.lower()
-        
-        # Buscar puertos por nombre completo
-        for port in common_ports:
-            if port in text_lower:
-                found_ports.append(port.title())
+        # Puertos conocidos del diccionario
+        found_ports = [port.name for port in self.gazetteer.all(doc, 'puerto')]
         
         # También buscar patrones de puertos
-        port_patterns = [
-            r'puerto[:\s]+([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s]+)',
-            r'port[:\s]+([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s]+)',
-            r'terminal[:\s]+([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s]+)',
-        ]
-        
-        for pattern in port_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                port_name = match.group(1).strip()
-                port_words = port_name.split()[:3]  # Primeras 3 palabras
-                port_clean = ' '.join(port_words).title()
-                if port_clean and port_clean not in found_ports:
-                    found_ports.append(port_clean)
+        port_rules = patterns.get('puerto')
+        for match in port_rules.finditer(doc.text):
+            port_clean = port_rules.process(match.group(1))
+            if port_clean and port_clean not in found_ports:
+                found_ports.append(port_clean)
         
         return found_ports
     
-    def _extract_voyage_number(self, text: str) -> Optional[str]:
+    def _extract_voyage_number(self, doc: OCRDocument) -> Optional[str]:
         """Extrae número de viaje del texto con múltiples variantes."""
-        patterns = [
-            # Patrones en español
-            r'viaje[:\s]+([A-Z0-9-]+)',
-            r'n[úu]mero\s+de\s+viaje[:\s]+([A-Z0-9-]+)',
-            r'viaje\s+n[úu]mero[:\s]+([A-Z0-9-]+)',
-            # Patrones en inglés
-            r'voyage[:\s]+([A-Z0-9-]+)',
-            r'voyage\s+number[:\s]+([A-Z0-9-]+)',
-            r'voyage\s+no[.:\s]+([A-Z0-9-]+)',
-            r'voyage\s+#[:\s]*([A-Z0-9-]+)',
-            r'voy\s+number[:\s]+([A-Z0-9-]+)',
-            r'voy\s+no[.:\s]+([A-Z0-9-]+)',
-            # Patrones abreviados
-            r'V\.?\s*([A-Z0-9-]+)',
-            r'VOY[:\s]*([A-Z0-9-]+)',
-            r'VN[:\s]+([A-Z0-9-]+)',  # Voyage Number
-            r'V\.?\s*N[úu]?[.:\s]*([A-Z0-9-]+)',  # V.N. o V N
-            # Patrones con formato común
-            r'V[OY]?[:\s]*([A-Z]{1,3}\d{1,4})',  # V123, VOY123, V.123
-            r'([A-Z0-9-]{2,15})\s*(?:VOYAGE|VIAJE)',  # 123 VOYAGE
-            # Patrones con guiones
-            r'V[OY]?[:\s]*([A-Z0-9-]{3,15})',  # V-123, VOY-ABC
-            # Buscar después de palabras clave
-            r'(?:voyage|viaje|voy)[:\s]+(?:number|n[úu]mero|no|#)?[:\s]*([A-Z0-9-]{2,15})',
-        ]
-        
-        for pattern in patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                voyage_num = match.group(1).strip()
-                # Validar que tenga al menos un carácter alfanumérico
-                if voyage_num and len(voyage_num) >= 2:
-                    # Limpiar caracteres no deseados al inicio/final
-                    voyage_num = voyage_num.strip('.,;:')
-                    return voyage_num
-        
-        return None
+        return patterns.get('numero_viaje').extract(doc)
     
     def normalize_port(self, port_str: Optional[str]) -> Optional[str]:
         """
@@ -333,12 +440,18 @@ class DataNormalizer:
             port_str: Nombre del puerto en formato variado.
             
         Returns:
-            Nombre del puerto normalizado.
+            Nombre canónico si el puerto está en el índice (corrigiendo errores
+            de OCR y descartando palabras pegadas), o el nombre limpio y
+            capitalizado si no.
         """
         if not port_str:
             return None
         
-        # Limpiar y capitalizar
+        entry = self.port_index.resolve(port_str)
+        if entry:
+            return entry.name
+        
+        # Puerto desconocido: limpiar y capitalizar
         normalized = ' '.join(port_str.split())
         normalized = normalized.title()
         
@@ -0,0 +1,148 @@
+"""
+Interpretación de fechas de itinerarios con una gramática compilada.
+
+Una sola expresión regular reconoce todas las formas de fecha que aparecen en
+los itinerarios:
+
+- numéricas: ``15/01/2024``, ``15-01-24``, ``2024/01/15``, ``15.01.2024``, ``15 01 2024``
+- con mes en palabras (español o inglés, completo o abreviado):
+  ``15 enero 2024``, ``15 de enero de 2024``, ``15 Jan 2024``, ``January 15, 2024``
+
+Las fechas numéricas se interpretan en el mismo orden de preferencia que los
+formatos ``strptime`` que se usaban antes (día/mes/año de 4 dígitos,
+año/mes/día, y luego las mismas con año de 2 dígitos), descartando las
+combinaciones que no son fechas válidas. Los resultados se memoizan: en un
+lote los mismos textos de fecha se repiten muchas veces.
+"""
+import datetime
+import functools
+import re
+from typing import Dict, Iterable, Optional, Union
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MONTHS_ES = {
+    'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4, 'mayo': 5, 'junio': 6,
+    'julio': 7, 'agosto': 8, 'septiembre': 9, 'setiembre': 9, 'octubre': 10,
+    'noviembre': 11, 'diciembre': 12,
+    'ene': 1, 'feb': 2, 'mar': 3, 'abr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'ago': 8, 'sep': 9, 'set': 9, 'oct': 10, 'nov': 11, 'dic': 12,
+}
+
+MONTHS_EN = {
+    'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6,
+    'july': 7, 'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12,
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'jun': 6, 'jul': 7, 'aug': 8,
+    'sep': 9, 'sept': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+}
+
+MONTHS: Dict[str, int] = {**MONTHS_ES, **MONTHS_EN}
+
+# Nombres más largos primero para que "septiembre" no quede como "sep"
+_MONTH_NAMES = '|'.join(sorted(MONTHS, key=len, reverse=True))
+
+_GRAMMAR = re.compile(
+    rf'''
+    # Numérica: todo el texto, con el mismo separador entre los tres números
+    ^(?P<a>\d{{1,4}})(?P<sep>[/.\-]|\s+)(?P<b>\d{{1,2}})(?P=sep)(?P<c>\d{{1,4}})$
+    # 15 enero 2024 / 15 de enero de 2024 / 15 Jan. 2024
+    | \b(?P<dia>\d{{1,2}})\s+(?:de\s+)?(?P<mes>{_MONTH_NAMES})\.?,?\s+(?:de\s+)?(?P<anio>\d{{4}})\b
+    # January 15, 2024
+    | \b(?P<mes_en>{_MONTH_NAMES})\.?\s+(?P<dia_en>\d{{1,2}}),?\s+(?P<anio_en>\d{{4}})\b
+    ''',
+    re.IGNORECASE | re.VERBOSE,
+)
+
+
+def _full_year(year: str) -> Optional[int]:
+    """Año de 4 dígitos, o de 2 con la misma regla que ``%y`` (69-99 → 19xx)."""
+    if len(year) == 4:
+        return int(year)
+    if len(year) == 2:
+        value = int(year)
+        return value + (1900 if value >= 69 else 2000)
+    return None
+
+
+def _valid(year: Optional[int], month: int, day: int) -> Optional[str]:
+    """Fecha ISO si año, mes y día forman una fecha válida."""
+    if year is None:
+        return None
+    try:
+        return datetime.date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+
+def _numeric(a: str, b: str, c: str) -> Optional[str]:
+    """Interpreta una fecha numérica en el orden de preferencia de los formatos ``strptime``."""
+    candidates = []
+    for year_digits in (4, 2):
+        if len(c) == year_digits and len(a) <= 2:
+            candidates.append((c, b, a))  # día/mes/año
+        if len(a) == year_digits and len(c) <= 2:
+            candidates.append((a, b, c))  # año/mes/día
+    for year, month, day in candidates:
+        result = _valid(_full_year(year), int(month), int(day))
+        if result:
+            return result
+    return None
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_date(text: str) -> Optional[str]:
+    """
+    Convierte una fecha en formato variado a ``YYYY-MM-DD``.
+
+    Args:
+        text: Fecha tal como aparece en el documento.
+
+    Returns:
+        Fecha en formato ISO, o None si el texto no es una fecha reconocible.
+    """
+    match = _GRAMMAR.search(text.strip())
+    if match is None:
+        return None
+    if match.group('sep') is not None:
+        return _numeric(match.group('a'), match.group('b'), match.group('c'))
+    if match.group('mes') is not None:
+        day, month, year = match.group('dia', 'mes', 'anio')
+    else:
+        day, month, year = match.group('dia_en', 'mes_en', 'anio_en')
+    return _valid(int(year), MONTHS[month.lower()], int(day))
+
+
+def normalize_dates(values: Union[pd.Series, Iterable[Optional[str]]], keep_original: bool = True) -> pd.Series:
+    """
+    Normaliza una columna de fechas.
+
+    Cada valor distinto se interpreta una sola vez y el resultado se reparte
+    con un mapeo vectorizado, de modo que el costo depende de la cantidad de
+    fechas distintas y no de la cantidad de filas.
+
+    Args:
+        values: Serie (o lista) de fechas en formato variado. Los vacíos se mantienen.
+        keep_original: Si mantener el texto original de las fechas no reconocidas
+                       (como ``DataNormalizer.normalize_date``) o dejarlas vacías.
+
+    Returns:
+        Serie con el mismo índice y las fechas en formato ``YYYY-MM-DD``.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+    mask = series.notna() & (series.astype(str) != '')
+    present = series[mask]
+
+    mapping = {}
+    for value in present.unique():
+        parsed = parse_date(str(value))
+        if parsed is None:
+            logger.warning(f"No se pudo normalizar la fecha: {value}")
+            parsed = value if keep_original else None
+        mapping[value] = parsed
+
+    result = pd.Series([None] * len(series), index=series.index, dtype=object)
+    result[mask] = present.map(mapping).to_numpy()
+    return result
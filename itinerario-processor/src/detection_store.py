@@ -0,0 +1,215 @@
+"""
+Archivo en disco de las detecciones OCR de cada imagen procesada.
+
+A diferencia de la caché OCR (direccionada por contenido y con expulsión
+LRU), este archivo guarda por imagen las detecciones crudas de EasyOCR y el
+último resultado normalizado, sin expulsar nada. Permite volver a ejecutar la
+extracción y la normalización sobre todo el histórico (``replay.py``) sin
+volver a pasar las imágenes por el OCR.
+
+Cada imagen ocupa dos archivos:
+
+- ``<clave>.json.gz``: detecciones en formato compacto, cajas aplanadas
+  ``[x1, y1, ..., x4, y4]`` redondeadas a un decimal.
+- ``<clave>.resultado.json``: último resultado normalizado (sin el texto completo).
+"""
+import functools
+import gzip
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, NamedTuple, Optional
+import logging
+
+from .records import Itinerary
+
+logger = logging.getLogger(__name__)
+
+# Versión del formato de los archivos de detecciones
+FORMAT_VERSION = 1
+
+# Bloque de lectura al calcular el hash del contenido de una imagen
+_HASH_CHUNK_BYTES = 1024 * 1024
+
+# Campos del resultado que no se guardan (se reconstruyen desde las detecciones)
+EXCLUDED_RESULT_FIELDS = ('texto_completo', 'raw_text', 'documento')
+
+
+@functools.lru_cache(maxsize=1024)
+def _content_digest(path: str, size: int, mtime_ns: int) -> str:
+    """
+    SHA-1 de los bytes del archivo.
+
+    Se memoiza por (ruta, tamaño, fecha de modificación): la misma imagen pide
+    su clave varias veces (detecciones, resultado, almacén de itinerarios).
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class StoredDetections(NamedTuple):
+    """Detecciones guardadas de una imagen."""
+
+    key: str
+    image: str  # Ruta de la imagen cuando se procesó
+    detections: List[tuple]  # (bbox, text, confidence) como las devuelve EasyOCR
+    saved_at: str  # Fecha y hora ISO del guardado
+
+
+class DetectionStore:
+    """Archivo de detecciones OCR y resultados por imagen."""
+
+    def __init__(self, store_dir: str = 'detecciones'):
+        """
+        Inicializa el archivo.
+
+        Args:
+            store_dir: Directorio donde guardar las detecciones.
+        """
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(image_path: str) -> str:
+        """
+        Clave de una imagen: su nombre más un hash corto de su contenido.
+
+        Como en ``OCRCache``, la clave depende del contenido y no de la ruta:
+        dos subidas distintas con el mismo nombre de archivo son documentos
+        distintos, y la misma imagen subida otra vez reemplaza a la anterior.
+
+        Args:
+            image_path: Ruta a la imagen.
+
+        Returns:
+            Clave legible y sin separadores de ruta.
+
+        Raises:
+            FileNotFoundError: Si la imagen no existe.
+        """
+        path = Path(image_path).resolve()
+        stat = path.stat()
+        digest = _content_digest(str(path), stat.st_size, stat.st_mtime_ns)
+        stem = ''.join(c if c.isalnum() or c in '-_' else '_' for c in path.stem)
+        return f'{stem}-{digest[:16]}'
+
+    def _detections_path(self, key: str) -> Path:
+        return self.store_dir / f'{key}.json.gz'
+
+    def _result_path(self, key: str) -> Path:
+        return self.store_dir / f'{key}.resultado.json'
+
+    def _write(self, path: Path, payload: bytes):
+        """Escritura atómica: otros procesos nunca leen un archivo a medias."""
+        tmp_path = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+    def put(self, image_path: str, detections: list) -> Optional[str]:
+        """
+        Guarda las detecciones crudas de una imagen (reemplaza las anteriores).
+
+        Args:
+            image_path: Ruta a la imagen procesada.
+            detections: Resultados de EasyOCR: lista de (bbox, text, confidence).
+
+        Returns:
+            Clave de la imagen, o None si no se pudo guardar.
+        """
+        key = self.make_key(image_path)
+        stored = {
+            'version': FORMAT_VERSION,
+            'imagen': str(image_path),
+            'guardado': datetime.now().isoformat(timespec='seconds'),
+            'detecciones': [
+                [[round(float(v), 1) for point in bbox for v in point], str(text), round(float(confidence), 4)]
+                for bbox, text, confidence in detections
+            ],
+        }
+        payload = json.dumps(stored, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        try:
+            self._write(self._detections_path(key), gzip.compress(payload, compresslevel=6))
+        except OSError as e:
+            logger.warning(f"No se pudieron guardar las detecciones de {image_path}: {str(e)}")
+            return None
+        return key
+
+    def get(self, key: str) -> StoredDetections:
+        """
+        Lee las detecciones guardadas de una imagen.
+
+        Args:
+            key: Clave de la imagen (ver ``keys``).
+
+        Returns:
+            Detecciones con la misma forma que las de EasyOCR.
+
+        Raises:
+            FileNotFoundError: Si no hay detecciones para la clave.
+            ValueError: Si el archivo está dañado o tiene un formato desconocido.
+        """
+        path = self._detections_path(key)
+        if not path.exists():
+            raise FileNotFoundError(f"No hay detecciones guardadas para {key}")
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ValueError(f"Archivo de detecciones dañado {path}: {str(e)}")
+        if stored.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Formato de detecciones no soportado en {path}: {stored.get('version')}")
+
+        detections = [
+            ([[box[i], box[i + 1]] for i in range(0, len(box), 2)], text, confidence)
+            for box, text, confidence in stored['detecciones']
+        ]
+        return StoredDetections(key, stored['imagen'], detections, stored['guardado'])
+
+    def put_result(self, key: str, result: Mapping) -> bool:
+        """
+        Guarda el último resultado normalizado de una imagen.
+
+        Args:
+            key: Clave de la imagen (``make_key(ruta)``).
+            result: Datos normalizados (diccionario o ``Itinerary``). El texto completo
+                    no se guarda.
+
+        Returns:
+            True si se guardó.
+        """
+        if isinstance(result, Itinerary):
+            result = result.to_dict()
+        stored = {field: value for field, value in result.items() if field not in EXCLUDED_RESULT_FIELDS}
+        payload = json.dumps(stored, ensure_ascii=False, indent=1, default=str).encode('utf-8')
+        try:
+            self._write(self._result_path(key), payload)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar el resultado de {key}: {str(e)}")
+            return False
+        return True
+
+    def get_result(self, key: str) -> Optional[Dict]:
+        """Último resultado guardado de una imagen, o None si no hay."""
+        try:
+            with open(self._result_path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def keys(self) -> List[str]:
+        """Claves de todas las imágenes con detecciones guardadas, en orden alfabético."""
+        return sorted(path.name[:-len('.json.gz')] for path in self.store_dir.glob('*.json.gz'))
+
+    def __iter__(self) -> Iterator[StoredDetections]:
+        for key in self.keys():
+            yield self.get(key)
+
+    def __len__(self) -> int:
+        return len(self.keys())
@@ -1,18 +1,40 @@
 """
 Módulo para exportar datos normalizados a Excel.
+
+Las tablas de varias filas se escriben en modo streaming (libro de openpyxl
+en modo solo escritura): las filas se toman de un iterador y se vuelcan al
+archivo a medida que llegan, así la memoria no crece con la cantidad de
+filas. El ancho de las columnas se calcula con una muestra de las primeras
+filas, antes de escribir.
 """
+import itertools
 import pandas as pd
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Sequence
 from datetime import datetime
 import logging
 
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+from .utils import ITINERARY_COLUMNS, itinerary_row, itinerary_rows
+
 logger = logging.getLogger(__name__)
 
+# Filas usadas para estimar el ancho de las columnas
+WIDTH_SAMPLE_ROWS = 1000
+
+# Ancho máximo de una columna (caracteres)
+MAX_COLUMN_WIDTH = 50
+
 
 class ExcelExporter:
     """Exportador de datos a formato Excel."""
     
+    extension = '.xlsx'
+    
     def __init__(self):
         """Inicializa el exportador Excel."""
         pass
@@ -114,62 +136,115 @@ class ExcelExporter:
         if not data_list:
             raise ValueError("La lista de datos está vacía")
         
-        output_path_obj = Path(output_path)
-        output_path_obj.parent.mkdir(parents=True, exist_ok=True)
+        return self.export_stream((itinerary_row(data, datos_generales) for data in data_list), output_path)
+    
+    def export_documents(self, documents: Iterable[Dict[str, any]], output_path: str) -> str:
+        """
+        Exporta muchos documentos normalizados a una tabla (una fila por nave).
         
-        # Preparar datos para DataFrame (campos requeridos siempre)
-        rows = []
-        for data in data_list:
-            row = {
-                'Naviera': data.get('naviera') or (datos_generales.get('naviera') if datos_generales else ''),
-                'Nave': data.get('nombre') or data.get('nave_normalizada') or data.get('nombre_original'),
-                'POL': data.get('pol') or (datos_generales.get('pol') if datos_generales else ''),
-                'POD': data.get('pod') or (datos_generales.get('pod') if datos_generales else ''),
-                'ETD': data.get('etd') or data.get('fecha_salida_normalizada') or (datos_generales.get('etd') if datos_generales else ''),
-                'ETA': data.get('eta') or data.get('fecha_llegada_normalizada') or (datos_generales.get('eta') if datos_generales else ''),
-                'Fecha': data.get('fecha_normalizada') or data.get('fecha_original'),
-                'Semana': data.get('semana_normalizada') or (datos_generales.get('semana_normalizada') if datos_generales else ''),
-                'Número de Viaje': data.get('numero_viaje', ''),
-                'Número de Contenedor': data.get('numero_contenedor', ''),
-                'Número de Booking': data.get('numero_booking', ''),
-            }
-            rows.append(row)
-        
-        df = pd.DataFrame(rows)
-        
-        # Crear archivo Excel
-        output_path_obj = Path(output_path)
-        output_path_obj.parent.mkdir(parents=True, exist_ok=True)
+        Los documentos se recorren de a uno (puede ser un generador), así que
+        la memoria no depende de cuántos sean.
         
-        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Itinerarios', index=False)
-            
-            # Aplicar formato
-            worksheet = writer.sheets['Itinerarios']
-            
-            # Ajustar ancho de columnas
-            for col in worksheet.columns:
-                max_length = 0
-                col_letter = col[0].column_letter
-                for cell in col:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                worksheet.column_dimensions[col_letter].width = adjusted_width
-            
-            # Formato de encabezado
-            from openpyxl.styles import Font, PatternFill, Alignment
+        Args:
+            documents: Resultados de ``DataNormalizer.normalize``.
+            output_path: Ruta donde guardar el archivo Excel.
             
-            header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-            header_font = Font(bold=True, color="FFFFFF")
+        Returns:
+            Ruta del archivo generado.
+        """
+        return self.export_stream(itinerary_rows(documents), output_path)
+    
+    def export_stream(self, rows: Iterable[Sequence], output_path: str,
+                      columns: Sequence[str] = ITINERARY_COLUMNS, sheet_name: str = 'Itinerarios') -> str:
+        """
+        Escribe una tabla desde un iterador de filas con memoria constante.
+        
+        Args:
+            rows: Filas (listas de valores en el orden de ``columns``).
+            output_path: Ruta donde guardar el archivo Excel.
+            columns: Encabezados de las columnas.
+            sheet_name: Nombre de la hoja.
             
-            for cell in worksheet[1]:
-                cell.fill = header_fill
-                cell.font = header_font
-                cell.alignment = Alignment(horizontal="center", vertical="center")
+        Returns:
+            Ruta del archivo generado.
+        """
+        output_path_obj = Path(output_path)
+        output_path_obj.parent.mkdir(parents=True, exist_ok=True)
         
-        logger.info(f"Archivo Excel con {len(data_list)} registros generado: {output_path}")
+        workbook = Workbook(write_only=True)
+        count = self.write_sheet(workbook, sheet_name, columns, rows)
+        workbook.save(output_path)
+        
+        logger.info(f"Archivo Excel con {count} filas generado: {output_path}")
         return output_path
+    
+    def write_sheet(self, workbook: Workbook, sheet_name: str, columns: Sequence[str],
+                    rows: Iterable[Sequence], sample_size: int = WIDTH_SAMPLE_ROWS) -> int:
+        """
+        Agrega una hoja a un libro en modo solo escritura.
+        
+        Las primeras ``sample_size`` filas se retienen para calcular el ancho
+        de las columnas (en modo solo escritura los anchos deben fijarse antes
+        de la primera fila); el resto se escribe directamente.
+        
+        Args:
+            workbook: Libro creado con ``Workbook(write_only=True)``.
+            sheet_name: Nombre de la hoja.
+            columns: Encabezados de las columnas.
+            rows: Filas (listas de valores en el orden de ``columns``).
+            sample_size: Filas usadas para estimar el ancho de las columnas.
+            
+        Returns:
+            Cantidad de filas escritas (sin el encabezado).
+        """
+        rows = iter(rows)
+        sample = list(itertools.islice(rows, sample_size))
+        worksheet = self.start_sheet(workbook, sheet_name, columns, sample)
+        
+        count = len(sample)
+        for row in rows:
+            worksheet.append(row)
+            count += 1
+        return count
+    
+    def start_sheet(self, workbook: Workbook, sheet_name: str, columns: Sequence[str],
+                    sample: Sequence[Sequence], index: Optional[int] = None):
+        """
+        Crea una hoja en modo solo escritura con el encabezado y las primeras filas.
+        
+        El ancho de las columnas se calcula con el encabezado y ``sample``; las
+        filas siguientes se agregan con ``worksheet.append``.
+        
+        Args:
+            workbook: Libro creado con ``Workbook(write_only=True)``.
+            sheet_name: Nombre de la hoja.
+            columns: Encabezados de las columnas.
+            sample: Primeras filas de la hoja.
+            index: Posición de la hoja en el libro (default: al final).
+            
+        Returns:
+            Hoja creada.
+        """
+        worksheet = workbook.create_sheet(sheet_name, index)
+        
+        # Ancho de cada columna según el encabezado y la muestra
+        for position, header in enumerate(columns):
+            longest = max([len(header)] + [len(str(row[position])) for row in sample if row[position] is not None])
+            worksheet.column_dimensions[get_column_letter(position + 1)].width = min(longest + 2, MAX_COLUMN_WIDTH)
+        
+        # Encabezado con formato
+        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+        header_font = Font(bold=True, color="FFFFFF")
+        header_alignment = Alignment(horizontal="center", vertical="center")
+        header_cells = []
+        for header in columns:
+            cell = WriteOnlyCell(worksheet, value=header)
+            cell.fill = header_fill
+            cell.font = header_font
+            cell.alignment = header_alignment
+            header_cells.append(cell)
+        worksheet.append(header_cells)
+        
+        for row in sample:
+            worksheet.append(row)
+        return worksheet
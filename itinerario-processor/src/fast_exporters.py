@@ -0,0 +1,253 @@
+"""
+Exportadores a formatos de intercambio: CSV, JSONL y Parquet.
+
+Reciben los mismos diccionarios normalizados que ``ExcelExporter`` y
+``PDFExporter`` y escriben la tabla de itinerarios (una fila por nave, las
+columnas de ``ITINERARY_FIELDS``), pensada para otros sistemas y no para
+leerla a mano:
+
+- los valores de relleno ("No encontrada") y los vacíos se escriben como
+  nulos;
+- las filas se escriben a medida que se generan (Parquet, por bloques), así
+  que exportar muchos documentos no los carga todos en memoria;
+- en Parquet las fechas son columnas ``date32`` y la semana un entero.
+  Requiere ``pyarrow``, que es opcional.
+"""
+import abc
+import csv
+import functools
+import json
+from datetime import date
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+import logging
+
+from .excel_exporter import ExcelExporter
+from .itinerary_store import PLACEHOLDERS
+from .pdf_exporter import PDFExporter
+from .utils import ITINERARY_FIELDS, itinerary_row, itinerary_rows
+
+logger = logging.getLogger(__name__)
+
+# Filas por bloque (row group) de Parquet
+PARQUET_CHUNK_ROWS = 65536
+
+_DATE_FIELDS = ('etd', 'eta', 'fecha')
+
+
+def _clean(value):
+    """None para los vacíos y los valores de relleno."""
+    if value is None or value == '' or (isinstance(value, str) and value in PLACEHOLDERS):
+        return None
+    return value
+
+
+def _to_date(value) -> Optional[date]:
+    """Fecha de un texto YYYY-MM-DD, o None si no lo es."""
+    if not isinstance(value, str):
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+class _RowExporter(abc.ABC):
+    """Base de los exportadores de la tabla de itinerarios (cada formato implementa ``_write``)."""
+
+    extension = ''
+
+    def export_single(self, data: Dict[str, any], output_path: str) -> str:
+        """
+        Exporta un documento normalizado (una fila por nave).
+
+        Args:
+            data: Diccionario con datos normalizados.
+            output_path: Ruta del archivo a generar.
+
+        Returns:
+            Ruta del archivo generado.
+        """
+        return self.export_documents([data], output_path)
+
+    def export_multiple(self, data_list: List[Dict[str, any]], output_path: str, datos_generales: Dict = None) -> str:
+        """
+        Exporta las naves de un itinerario (como ``ExcelExporter.export_multiple``).
+
+        Args:
+            data_list: Lista de diccionarios con datos normalizados (naves).
+            output_path: Ruta del archivo a generar.
+            datos_generales: Datos generales del itinerario (opcional).
+
+        Returns:
+            Ruta del archivo generado.
+        """
+        if not data_list:
+            raise ValueError("La lista de datos está vacía")
+        return self.export_rows((itinerary_row(data, datos_generales) for data in data_list), output_path)
+
+    def export_documents(self, documents: Iterable[Dict[str, any]], output_path: str) -> str:
+        """
+        Exporta muchos documentos normalizados (se recorren de a uno).
+
+        Args:
+            documents: Resultados de ``DataNormalizer.normalize``.
+            output_path: Ruta del archivo a generar.
+
+        Returns:
+            Ruta del archivo generado.
+        """
+        return self.export_rows(itinerary_rows(documents), output_path)
+
+    def export_rows(self, rows: Iterable[Sequence], output_path: str) -> str:
+        """
+        Escribe filas en el orden de ``ITINERARY_FIELDS``.
+
+        Args:
+            rows: Filas como las de ``itinerary_row``.
+            output_path: Ruta del archivo a generar.
+
+        Returns:
+            Ruta del archivo generado.
+        """
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        count = self._write(([_clean(value) for value in row] for row in rows), output_path)
+        logger.info(f"Archivo {self.extension.lstrip('.').upper()} con {count} filas generado: {output_path}")
+        return output_path
+
+    @abc.abstractmethod
+    def _write(self, rows: Iterator[List], output_path: str) -> int:
+        """Escribe las filas (ya sin valores de relleno) y devuelve cuántas escribió."""
+
+
+class CSVExporter(_RowExporter):
+    """Exportador a CSV (UTF-8, con encabezado)."""
+
+    extension = '.csv'
+
+    def __init__(self, delimiter: str = ','):
+        """
+        Args:
+            delimiter: Separador de campos.
+        """
+        self.delimiter = delimiter
+
+    def _write(self, rows: Iterator[List], output_path: str) -> int:
+        count = 0
+        with open(output_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f, delimiter=self.delimiter)
+            writer.writerow(ITINERARY_FIELDS)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        return count
+
+
+class JSONLExporter(_RowExporter):
+    """Exportador a JSON Lines (un objeto JSON por fila)."""
+
+    extension = '.jsonl'
+
+    def _write(self, rows: Iterator[List], output_path: str) -> int:
+        count = 0
+        encoder = json.JSONEncoder(ensure_ascii=False, default=str)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            for row in rows:
+                f.write(encoder.encode(dict(zip(ITINERARY_FIELDS, row))))
+                f.write('\n')
+                count += 1
+        return count
+
+
+class ParquetExporter(_RowExporter):
+    """Exportador a Parquet con columnas tipadas (requiere pyarrow)."""
+
+    extension = '.parquet'
+
+    def __init__(self, compression: str = 'snappy'):
+        """
+        Args:
+            compression: Compresión de Parquet ('snappy', 'zstd', 'gzip' o 'none').
+
+        Raises:
+            ImportError: Si pyarrow no está instalado.
+        """
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("La exportación a Parquet requiere pyarrow. Instálalo con: pip install pyarrow")
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.compression = compression
+        self.schema = pyarrow.schema([
+            (field, pyarrow.date32() if field in _DATE_FIELDS
+             else pyarrow.int32() if field == 'semana'
+             else pyarrow.string())
+            for field in ITINERARY_FIELDS
+        ])
+
+    def _columns(self, chunk: List[List]) -> List[list]:
+        """Columnas de un bloque de filas, con los tipos del esquema."""
+        columns = [list(column) for column in zip(*chunk)]
+        for index, field in enumerate(ITINERARY_FIELDS):
+            if field in _DATE_FIELDS:
+                columns[index] = [_to_date(value) for value in columns[index]]
+            elif field == 'semana':
+                columns[index] = [value if isinstance(value, int) else None for value in columns[index]]
+            else:
+                columns[index] = [None if value is None else str(value) for value in columns[index]]
+        return columns
+
+    def _write(self, rows: Iterator[List], output_path: str) -> int:
+        count = 0
+        with self._pq.ParquetWriter(output_path, self.schema, compression=self.compression) as writer:
+            while True:
+                chunk = list(islice(rows, PARQUET_CHUNK_ROWS))
+                if not chunk:
+                    break
+                arrays = [self._pa.array(column, type=field.type)
+                          for column, field in zip(self._columns(chunk), self.schema)]
+                writer.write_table(self._pa.Table.from_arrays(arrays, schema=self.schema))
+                count += len(chunk)
+            if not count:
+                writer.write_table(self.schema.empty_table())
+        return count
+
+
+# Formatos de exportación disponibles (nombre -> clase del exportador)
+EXPORTERS = {
+    'excel': ExcelExporter,
+    'pdf': PDFExporter,
+    'csv': CSVExporter,
+    'jsonl': JSONLExporter,
+    'parquet': ParquetExporter,
+}
+
+# Nombre de cada formato para mostrar
+FORMAT_LABELS = {'excel': 'Excel', 'pdf': 'PDF', 'csv': 'CSV', 'jsonl': 'JSONL', 'parquet': 'Parquet'}
+
+
+@functools.lru_cache(maxsize=None)
+def get_exporter(format_name: str):
+    """
+    Devuelve el exportador de un formato.
+
+    Hay una sola instancia por formato, compartida: los exportadores no
+    guardan estado entre exportaciones y así sus estilos se crean una vez.
+
+    Args:
+        format_name: Uno de ``EXPORTERS``.
+
+    Returns:
+        Exportador (con ``export_single``, ``export_multiple`` y ``extension``).
+
+    Raises:
+        ValueError: Si el formato no existe.
+        ImportError: Si falta una dependencia opcional del formato.
+    """
+    exporter_class = EXPORTERS.get(format_name)
+    if exporter_class is None:
+        raise ValueError(f"Formato no soportado: {format_name} (opciones: {', '.join(EXPORTERS)})")
+    return exporter_class()
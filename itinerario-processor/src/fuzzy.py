@@ -0,0 +1,172 @@
+"""
+Búsqueda aproximada de cadenas para corregir errores de OCR.
+
+- ``bounded_levenshtein``: distancia de edición con cota; abandona en cuanto
+  la distancia supera el máximo, así comparar contra candidatos lejanos es
+  casi gratis.
+- ``TrigramIndex``: índice invertido de trigramas de caracteres. Para una
+  consulta solo se comparan las claves que comparten suficientes trigramas
+  (cada edición cambia a lo sumo tres), de modo que el costo depende de los
+  candidatos plausibles y no del tamaño del índice. Admite altas incrementales.
+- ``normalize_key``: clave de búsqueda común (minúsculas, sin tildes ni
+  puntuación, con las confusiones típicas del OCR corregidas).
+"""
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Generic, List, NamedTuple, Optional, Set, TypeVar
+
+T = TypeVar('T')
+
+# Confusiones típicas del OCR dentro de palabras con letras
+OCR_CONFUSIONS = str.maketrans({'1': 'l', '0': 'o', '5': 's'})
+
+_WORD = re.compile(r'[a-z0-9]+')
+_LETTER = re.compile(r'[a-z]')
+
+
+def normalize_key(text: str) -> str:
+    """
+    Clave de búsqueda de un nombre (puerto, nave).
+
+    Args:
+        text: Nombre tal como aparece en el documento.
+
+    Returns:
+        Palabras en minúsculas, sin tildes ni puntuación y con las confusiones
+        de OCR corregidas, separadas por un espacio.
+    """
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    words = [
+        word.translate(OCR_CONFUSIONS) if _LETTER.search(word) else word
+        for word in _WORD.findall(text)
+    ]
+    return ' '.join(words)
+
+
+def bounded_levenshtein(a: str, b: str, max_distance: int) -> Optional[int]:
+    """
+    Distancia de Levenshtein entre ``a`` y ``b`` si no supera ``max_distance``.
+
+    Args:
+        a: Primera cadena.
+        b: Segunda cadena.
+        max_distance: Distancia máxima de interés.
+
+    Returns:
+        Distancia, o None si es mayor que ``max_distance``.
+    """
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+    if len(a) > len(b):
+        a, b = b, a
+
+    # Valores mayores que la cota se guardan como ``cap``: no cambian el resultado
+    cap = max_distance + 1
+    previous = [min(j, cap) for j in range(len(b) + 1)]
+    for i, char_a in enumerate(a, 1):
+        current = [cap] * (len(b) + 1)
+        current[0] = min(i, cap)
+        # Solo la banda diagonal |i - j| <= max_distance puede quedar dentro de la cota
+        low = max(1, i - max_distance)
+        high = min(len(b), i + max_distance)
+        for j in range(low, high + 1):
+            cost = 0 if char_a == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost, cap)
+        if min(current[low - 1:high + 1]) > max_distance:
+            return None
+        previous = current
+
+    distance = previous[len(b)]
+    return distance if distance <= max_distance else None
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigramas de caracteres de ``text`` con relleno, para que los bordes también cuenten."""
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FuzzyMatch(NamedTuple):
+    """Resultado de una búsqueda aproximada."""
+
+    distance: int
+    key: str
+    value: object
+
+
+class TrigramIndex(Generic[T]):
+    """Índice de trigramas con verificación por distancia de edición."""
+
+    def __init__(self):
+        self._keys: List[str] = []
+        self._values: List[T] = []
+        self._ids: Dict[str, int] = {}
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+
+    def add(self, key: str, value: T):
+        """
+        Agrega una clave (o reemplaza el valor de una existente).
+
+        Args:
+            key: Clave ya normalizada.
+            value: Valor asociado.
+        """
+        key_id = self._ids.get(key)
+        if key_id is not None:
+            self._values[key_id] = value
+            return
+        key_id = len(self._keys)
+        self._ids[key] = key_id
+        self._keys.append(key)
+        self._values.append(value)
+        for gram in trigrams(key):
+            self._postings[gram].append(key_id)
+
+    def get(self, key: str) -> Optional[T]:
+        """Valor de una clave exacta, o None."""
+        key_id = self._ids.get(key)
+        return None if key_id is None else self._values[key_id]
+
+    def search(self, query: str, max_distance: int, limit: int = 5) -> List[FuzzyMatch]:
+        """
+        Claves a distancia de edición ``max_distance`` o menos de la consulta.
+
+        Args:
+            query: Consulta ya normalizada.
+            max_distance: Distancia máxima aceptada.
+            limit: Máximo de resultados.
+
+        Returns:
+            Coincidencias ordenadas por distancia y, a igual distancia, por
+            orden de alta en el índice.
+        """
+        grams = trigrams(query)
+        # Cada edición altera a lo sumo tres trigramas de la consulta
+        required = max(1, len(grams) - 3 * max_distance)
+
+        counts: Dict[int, int] = defaultdict(int)
+        for gram in grams:
+            for key_id in self._postings.get(gram, ()):
+                counts[key_id] += 1
+
+        matches = []
+        for key_id, shared in counts.items():
+            if shared < required:
+                continue
+            key = self._keys[key_id]
+            distance = bounded_levenshtein(query, key, max_distance)
+            if distance is not None:
+                matches.append((distance, key_id))
+        matches.sort()
+        return [FuzzyMatch(distance, self._keys[key_id], self._values[key_id])
+                for distance, key_id in matches[:limit]]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._ids
+
+    def __len__(self) -> int:
+        return len(self._keys)
@@ -0,0 +1,208 @@
+"""
+Diccionario (gazetteer) de navieras, puertos e indicadores de puerto.
+
+Las entradas se cargan desde un archivo JSON externo y se compilan una sola
+vez en un autómata de Aho-Corasick. Una pasada sobre el texto en minúsculas
+encuentra todas las apariciones de todas las entradas, con comprobación de
+límites de palabra, de modo que agregar entradas no encarece cada documento.
+"""
+import functools
+import json
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from .ocr_document import OCRDocument
+
+DEFAULT_PATH = Path(__file__).resolve().parent.parent / 'data' / 'gazetteer.json'
+
+
+class GazetteerEntry(NamedTuple):
+    """Entrada del diccionario."""
+
+    kind: str  # 'naviera', 'puerto' o 'indicador'
+    name: str  # Nombre canónico
+    priority: int  # Posición dentro de su tipo (menor = preferida)
+    locode: Optional[str] = None
+    pol: bool = False  # Puerto de carga (San Antonio, Valparaíso)
+
+
+class GazetteerMatch(NamedTuple):
+    """Aparición de una entrada en el texto."""
+
+    start: int
+    end: int
+    entry: GazetteerEntry
+
+
+class AhoCorasick:
+    """Autómata de Aho-Corasick sobre claves en minúsculas."""
+
+    def __init__(self, keys: Iterable[Tuple[str, object]]):
+        """
+        Args:
+            keys: Pares (clave, valor). Una clave puede tener varios valores.
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, object]]] = [[]]
+
+        for key, value in keys:
+            node = 0
+            for char in key:
+                nxt = self._goto[node].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((len(key), value))
+
+        # Enlaces de fallo en anchura
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def iter(self, text: str):
+        """Genera (inicio, fin, valor) para cada aparición de una clave en ``text``."""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for length, value in out[node]:
+                yield i + 1 - length, i + 1, value
+
+
+def _is_boundary(text: str, index: int) -> bool:
+    """Indica si ``index`` está en un límite de palabra de ``text``."""
+    if index <= 0 or index >= len(text):
+        return True
+    return not (text[index - 1].isalnum() and text[index].isalnum())
+
+
+class Gazetteer:
+    """Diccionario compilado de navieras y puertos."""
+
+    def __init__(self, carriers: List[dict], ports: List[dict], port_indicators: List[str]):
+        """
+        Args:
+            carriers: Navieras en orden de prioridad: {"nombre", "alias"}.
+            ports: Puertos en orden de prioridad: {"nombre", "alias", "locode", "pol"}.
+            port_indicators: Palabras que indican que un nombre es un puerto.
+        """
+        keys = []
+        self.entries: List[GazetteerEntry] = []
+
+        def add(entry: GazetteerEntry, aliases: Iterable[str]):
+            self.entries.append(entry)
+            for alias in aliases:
+                alias = ' '.join(alias.lower().split())
+                if alias:
+                    keys.append((alias, entry))
+
+        for i, carrier in enumerate(carriers):
+            add(GazetteerEntry('naviera', carrier['nombre'], i),
+                carrier.get('alias') or [carrier['nombre']])
+        for i, port in enumerate(ports):
+            entry = GazetteerEntry('puerto', port['nombre'], i, port.get('locode'), bool(port.get('pol')))
+            aliases = list(port.get('alias') or [port['nombre']])
+            if entry.locode:
+                aliases.append(entry.locode)
+            add(entry, aliases)
+        for i, indicator in enumerate(port_indicators):
+            add(GazetteerEntry('indicador', indicator, i), [indicator])
+
+        self._automaton = AhoCorasick(keys)
+        self._key = id(self)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'Gazetteer':
+        """
+        Carga el diccionario desde un archivo JSON.
+
+        Args:
+            path: Ruta al archivo con las claves "navieras", "puertos" e "indicadores_puerto".
+
+        Returns:
+            Gazetteer compilado.
+
+        Raises:
+            FileNotFoundError: Si el archivo no existe.
+            ValueError: Si el archivo no tiene el formato esperado.
+        """
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"Diccionario no encontrado: {path}")
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        try:
+            return cls(data.get('navieras', []), data.get('puertos', []), data.get('indicadores_puerto', []))
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"Formato de diccionario inválido en {path}: {str(e)}")
+
+    def find_all(self, text_lower: str) -> List[GazetteerMatch]:
+        """
+        Todas las apariciones de entradas en un texto en minúsculas, respetando límites de palabra.
+
+        Args:
+            text_lower: Texto ya convertido a minúsculas.
+
+        Returns:
+            Apariciones en orden de fin.
+        """
+        return [
+            GazetteerMatch(start, end, entry)
+            for start, end, entry in self._automaton.iter(text_lower)
+            if _is_boundary(text_lower, start) and _is_boundary(text_lower, end)
+        ]
+
+    def matches(self, source: Union[str, OCRDocument]) -> List[GazetteerMatch]:
+        """Apariciones en un texto o en un documento (memoizadas en el documento)."""
+        if isinstance(source, OCRDocument):
+            return source.cached(('gazetteer', self._key), lambda: self.find_all(source.text_lower))
+        return self.find_all(source.lower())
+
+    def first(self, source: Union[str, OCRDocument], kind: str,
+              predicate: Optional[Callable[[GazetteerEntry], bool]] = None) -> Optional[GazetteerEntry]:
+        """
+        Entrada de mayor prioridad de un tipo que aparece en el texto.
+
+        Args:
+            source: Texto o documento OCR.
+            kind: Tipo de entrada ('naviera', 'puerto' o 'indicador').
+            predicate: Filtro adicional opcional.
+
+        Returns:
+            Entrada encontrada o None.
+        """
+        found = [
+            match.entry for match in self.matches(source)
+            if match.entry.kind == kind and (predicate is None or predicate(match.entry))
+        ]
+        return min(found, key=lambda entry: entry.priority) if found else None
+
+    def all(self, source: Union[str, OCRDocument], kind: str) -> List[GazetteerEntry]:
+        """Entradas distintas de un tipo que aparecen en el texto, en orden de prioridad."""
+        found = {match.entry for match in self.matches(source) if match.entry.kind == kind}
+        return sorted(found, key=lambda entry: entry.priority)
+
+    def contains(self, source: Union[str, OCRDocument], kinds: Iterable[str]) -> bool:
+        """Indica si el texto contiene alguna entrada de los tipos indicados."""
+        kinds = set(kinds)
+        return any(match.entry.kind in kinds for match in self.matches(source))
+
+
+@functools.lru_cache(maxsize=None)
+def load_default() -> Gazetteer:
+    """Diccionario por defecto (``data/gazetteer.json``), compilado una vez por proceso."""
+    return Gazetteer.load(DEFAULT_PATH)
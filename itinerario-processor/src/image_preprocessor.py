@@ -0,0 +1,197 @@
+"""
+Preprocesamiento de imágenes antes del OCR.
+
+Reduce la resolución de fotos y escaneos grandes (el costo del detector crece
+con la cantidad de píxeles), corrige la rotación EXIF, convierte a escala de
+grises y opcionalmente elimina ruido o binariza. Informa el tiempo de cada paso.
+
+Es opcional (``--preprocess`` en main.py, ``OCR_PREPROCESS=1`` en la web): la
+escala se elige a partir de una estimación del alto del texto que los fondos
+de tabla y las barras de encabezado pueden distorsionar, así que cambia el
+resultado del OCR y todavía no está validado con capturas reales.
+"""
+import time
+from typing import Dict, Optional, Union
+import numpy as np
+from PIL import Image, ImageFilter, ImageOps
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PreprocessResult:
+    """Resultado del preprocesamiento de una imagen."""
+
+    def __init__(self, image: np.ndarray, scale: float, original_size: tuple, timings: Dict[str, float]):
+        """
+        Args:
+            image: Imagen lista para EasyOCR (arreglo NumPy).
+            scale: Factor aplicado al tamaño original (1.0 = sin cambios).
+            original_size: Tamaño (ancho, alto) tras corregir la rotación EXIF.
+            timings: Milisegundos empleados en cada paso.
+        """
+        self.image = image
+        self.scale = scale
+        self.original_size = original_size
+        self.timings = timings
+
+    @property
+    def total_ms(self) -> float:
+        """Tiempo total del preprocesamiento en milisegundos."""
+        return sum(self.timings.values())
+
+
+class ImagePreprocessor:
+    """Pipeline configurable de preprocesamiento de imágenes para OCR."""
+
+    def __init__(self, target_text_height: Optional[int] = 32, max_side: Optional[int] = 2560,
+                 grayscale: bool = True, fix_rotation: bool = True,
+                 denoise: bool = False, binarize: bool = False):
+        """
+        Inicializa el preprocesador.
+
+        Args:
+            target_text_height: Altura de línea de texto (px) a la que reducir la
+                                imagen. El detector de EasyOCR no gana precisión con
+                                letras más grandes. None = no estimar.
+            max_side: Tamaño máximo del lado mayor (px). None = sin límite.
+            grayscale: Si convertir a escala de grises.
+            fix_rotation: Si aplicar la orientación EXIF (fotos de teléfono).
+            denoise: Si aplicar un filtro de mediana para eliminar ruido.
+            binarize: Si binarizar con umbral de Otsu.
+        """
+        self.target_text_height = target_text_height
+        self.max_side = max_side
+        self.grayscale = grayscale
+        self.fix_rotation = fix_rotation
+        self.denoise = denoise
+        self.binarize = binarize
+
+    def settings(self) -> Dict:
+        """Configuración del preprocesador (se usa en la clave de la caché OCR)."""
+        return {
+            'target_text_height': self.target_text_height,
+            'max_side': self.max_side,
+            'grayscale': self.grayscale,
+            'fix_rotation': self.fix_rotation,
+            'denoise': self.denoise,
+            'binarize': self.binarize,
+        }
+
+    def process(self, image: Union[str, Image.Image]) -> PreprocessResult:
+        """
+        Aplica el pipeline a una imagen.
+
+        Args:
+            image: Ruta a la imagen o imagen PIL ya abierta.
+
+        Returns:
+            PreprocessResult con la imagen procesada, la escala y los tiempos por paso.
+        """
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+
+        def mark(step: str):
+            nonlocal start
+            now = time.perf_counter()
+            timings[step] = (now - start) * 1000
+            start = now
+
+        img = Image.open(image) if isinstance(image, str) else image
+        img.load()
+        mark('carga')
+
+        if self.fix_rotation:
+            img = ImageOps.exif_transpose(img)
+            mark('rotacion')
+        original_size = img.size
+
+        if self.grayscale:
+            img = img.convert('L')
+        elif img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        mark('escala_grises')
+
+        scale = self._compute_scale(img)
+        if scale < 1.0:
+            new_size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+            img = img.resize(new_size, Image.LANCZOS)
+        mark('redimension')
+
+        if self.denoise:
+            img = img.filter(ImageFilter.MedianFilter(3))
+            mark('ruido')
+
+        array = np.asarray(img)
+        if self.binarize:
+            gray = array if array.ndim == 2 else np.asarray(img.convert('L'))
+            threshold = self._otsu_threshold(gray)
+            array = np.where(gray > threshold, 255, 0).astype(np.uint8)
+            mark('binarizacion')
+
+        return PreprocessResult(array, scale, original_size, timings)
+
+    def _compute_scale(self, img: Image.Image) -> float:
+        """Calcula el factor de reducción (nunca amplía)."""
+        scale = 1.0
+
+        if self.max_side and max(img.size) > self.max_side:
+            scale = self.max_side / max(img.size)
+
+        if self.target_text_height:
+            text_height = self.estimate_text_height(img)
+            if text_height and text_height > self.target_text_height:
+                scale = min(scale, self.target_text_height / text_height)
+
+        return scale
+
+    @staticmethod
+    def estimate_text_height(img: Image.Image, sample_width: int = 512) -> Optional[float]:
+        """
+        Estima la altura típica de una línea de texto con el perfil horizontal de tinta.
+
+        Se trabaja sobre una miniatura de ancho fijo (la altura de línea relativa
+        no cambia) para que la estimación cueste lo mismo sin importar el tamaño.
+
+        Args:
+            img: Imagen en escala de grises o color.
+            sample_width: Ancho de la miniatura usada para estimar.
+
+        Returns:
+            Altura de línea en píxeles de la imagen original, o None si no hay texto claro.
+        """
+        ratio = min(1.0, sample_width / img.width)
+        thumb = img.convert('L')
+        if ratio < 1.0:
+            thumb = thumb.resize((max(1, round(img.width * ratio)), max(1, round(img.height * ratio))))
+        gray = np.asarray(thumb)
+
+        # Tinta = píxeles claramente más oscuros que el fondo
+        ink = gray < ImagePreprocessor._otsu_threshold(gray)
+        rows = ink.mean(axis=1) > 0.01
+
+        # Longitud de las secuencias de filas con tinta (una por línea de texto)
+        padded = np.concatenate(([False], rows, [False])).astype(np.int8)
+        edges = np.flatnonzero(np.diff(padded))
+        runs = edges[1::2] - edges[0::2]
+        runs = runs[runs >= 2]
+        if len(runs) < 3:
+            return None
+
+        return float(np.median(runs)) / ratio
+
+    @staticmethod
+    def _otsu_threshold(gray: np.ndarray) -> int:
+        """Umbral de Otsu de una imagen en escala de grises."""
+        hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+        total = hist.sum()
+        if total == 0:
+            return 127
+        levels = np.arange(256)
+        weight_bg = np.cumsum(hist)
+        weight_fg = total - weight_bg
+        sum_bg = np.cumsum(hist * levels)
+        mean_bg = sum_bg / np.maximum(weight_bg, 1)
+        mean_fg = (sum_bg[-1] - sum_bg) / np.maximum(weight_fg, 1)
+        between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        return int(np.argmax(between))
@@ -0,0 +1,559 @@
+"""
+Almacén columnar en memoria de itinerarios normalizados.
+
+Hasta ahora los resultados solo quedaban como archivos Excel/PDF sueltos:
+responder "todos los ETD con POD Callao en la semana 14" obligaba a releer
+los libros. El almacén guarda una fila por nave (un documento con varias
+naves aporta varias filas) en columnas de NumPy:
+
+- textos (naviera, nave, POL, POD, viaje, documento) codificados con
+  diccionario: cada columna es un arreglo ``int32`` de códigos y cada valor
+  distinto se guarda una sola vez (-1 = vacío);
+- ETD y ETA como ``datetime64[D]`` (NaT = sin fecha reconocida);
+- semana como ``int16`` (-1 = sin semana) y el lote de alta como ``int32``.
+
+Los filtros y las agrupaciones operan sobre los arreglos completos, sin
+recorrer filas en Python. El almacén solo admite altas; si un documento se
+vuelve a procesar, las consultas usan por defecto solo su último lote.
+
+Formato en disco (un directorio de segmentos que solo crece)::
+
+    meta.json                 versión, filas, lotes y segmentos vigentes
+    diccionarios.NNNNN.json   valores de texto nuevos de cada segmento
+    <columna>.NNNNN.npy       un arreglo por columna y segmento
+
+``save`` solo escribe las filas agregadas desde el guardado anterior, en un
+segmento nuevo, y reemplaza ``meta.json`` al final: guardar tras cada alta
+cuesta lo que esa alta y no lo que todo el almacén. Para que los segmentos
+no se acumulen, el último se mezcla con el anterior mientras el anterior no
+sea más grande (como un contador binario): quedan O(log n) segmentos y cada
+fila se reescribe O(log n) veces en total.
+
+``load`` abre los ``.npy`` con ``mmap_mode='r'``: cargar el almacén al
+arrancar no lee los datos, el sistema operativo trae las páginas a medida
+que las consultas las usan. Las altas se guardan en bloques aparte (nunca
+se copian las columnas mapeadas) y, tras cada ``save``, se vuelven a abrir
+mapeadas desde su segmento.
+"""
+import json
+import os
+import re
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .records import Itinerary
+
+logger = logging.getLogger(__name__)
+
+# Versión del formato en disco
+FORMAT_VERSION = 1
+
+# Archivos de cada segmento
+SEGMENT_COLUMN_FILE = '{name}.{segment:05d}.npy'
+SEGMENT_VALUES_FILE = 'diccionarios.{segment:05d}.json'
+
+STRING_COLUMNS = ('naviera', 'nave', 'pol', 'pod', 'numero_viaje', 'documento')
+DATE_COLUMNS = ('etd', 'eta')
+COLUMN_DTYPES = {
+    **{name: np.dtype(np.int32) for name in STRING_COLUMNS},
+    **{name: np.dtype('datetime64[D]') for name in DATE_COLUMNS},
+    'semana': np.dtype(np.int16),
+    'lote': np.dtype(np.int32),
+}
+
+# Valores de relleno de ``normalize`` que equivalen a vacío
+PLACEHOLDERS = {'No encontrada', 'No encontrado'}
+
+_ISO_DATE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+# Filtro de una columna: un valor, una lista de valores o, en fechas, un rango (desde, hasta)
+Filter = Union[str, int, Sequence[Union[str, int]], Tuple[Optional[str], Optional[str]]]
+
+
+def _text(value) -> Optional[str]:
+    if value is None or value in PLACEHOLDERS:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _date(value) -> str:
+    """Fecha ISO para ``datetime64``; cualquier otra cosa queda como NaT."""
+    if isinstance(value, date):
+        return value.isoformat()
+    return value if isinstance(value, str) and _ISO_DATE.match(value) else 'NaT'
+
+
+def _write_atomic(target: Path, writer):
+    """Escribe un archivo en uno temporal y lo reemplaza de forma atómica."""
+    tmp_path = target.with_name(f'{target.name}.{os.getpid()}.tmp')
+    with open(tmp_path, 'wb') as f:
+        writer(f)
+    os.replace(tmp_path, target)
+
+
+def _read_meta(path: Path) -> Optional[Dict]:
+    """``meta.json`` de un almacén, o None si el directorio no tiene uno."""
+    try:
+        with open(path / 'meta.json', 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _record_rows(itinerary: Itinerary) -> List[Dict[str, object]]:
+    """Filas de un ``Itinerary``: lee los campos tipados, sin volver a interpretar textos."""
+    legs = (itinerary.legs or []) if itinerary.multiple else [itinerary]
+    return [
+        {
+            'naviera': leg.carrier,
+            'nave': leg.name if itinerary.multiple else leg.vessel,
+            'pol': leg.pol,
+            'pod': leg.pod,
+            'numero_viaje': leg.voyage if itinerary.multiple else leg.get('numero_viaje'),
+            'etd': leg.departure,
+            'eta': leg.arrival,
+            'semana': itinerary.week,
+        }
+        for leg in legs
+    ]
+
+
+def _rows(normalized: Mapping) -> List[Dict[str, object]]:
+    """Filas (una por nave) de un resultado de ``DataNormalizer.normalize`` o de un ``Itinerary``."""
+    if isinstance(normalized, Itinerary):
+        return _record_rows(normalized)
+    week = normalized.get('semana_normalizada')
+    if normalized.get('multiple_naves'):
+        return [
+            {
+                'naviera': leg.get('naviera'),
+                'nave': leg.get('nombre'),
+                'pol': leg.get('pol'),
+                'pod': leg.get('pod'),
+                'numero_viaje': leg.get('numero_viaje'),
+                'etd': leg.get('etd'),
+                'eta': leg.get('eta'),
+                'semana': week,
+            }
+            for leg in normalized.get('naves_normalizadas') or []
+        ]
+    return [{
+        'naviera': normalized.get('naviera'),
+        'nave': normalized.get('nave_normalizada'),
+        'pol': normalized.get('pol'),
+        'pod': normalized.get('pod'),
+        'numero_viaje': normalized.get('numero_viaje'),
+        'etd': normalized.get('etd'),
+        'eta': normalized.get('eta'),
+        'semana': week,
+    }]
+
+
+class ItineraryStore:
+    """Almacén columnar de itinerarios (una fila por nave), solo de altas."""
+
+    def __init__(self):
+        """Crea un almacén vacío."""
+        self._values: Dict[str, List[str]] = {name: [] for name in STRING_COLUMNS}
+        self._codes: Dict[str, Dict[str, int]] = {name: {} for name in STRING_COLUMNS}
+        # Bloques de filas: uno por segmento guardado (mapeado) y luego las altas sin guardar
+        self._chunks: List[Dict[str, np.ndarray]] = []
+        # Altas pendientes de pasar a un bloque (se juntan en la próxima consulta)
+        self._pending: Dict[str, list] = {name: [] for name in COLUMN_DTYPES}
+        self._batches = 0
+        self._latest: Optional[np.ndarray] = None
+        # Estado en disco: directorio, segmentos (id, filas) y valores de texto ya escritos
+        self._path: Optional[Path] = None
+        self._segments: List[Tuple[int, int]] = []
+        self._saved_values: Dict[str, int] = {name: 0 for name in STRING_COLUMNS}
+        self._saved_batches = 0
+        self._mmap = True
+
+    def _encode(self, name: str, value) -> int:
+        value = _text(value)
+        if value is None:
+            return -1
+        codes = self._codes[name]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self._values[name])
+            self._values[name].append(value)
+        return code
+
+    def append(self, normalized: Mapping, document: Optional[str] = None) -> int:
+        """
+        Agrega un itinerario normalizado.
+
+        Args:
+            normalized: Resultado de ``DataNormalizer.normalize`` (o un ``Itinerary``).
+            document: Identificador del documento de origen (por ejemplo la
+                      clave del archivo de detecciones). Si el documento ya
+                      estaba, sus filas anteriores dejan de contar en las consultas.
+
+        Returns:
+            Cantidad de filas agregadas.
+        """
+        rows = _rows(normalized)
+        batch = self._batches
+        self._batches += 1
+        document_code = self._encode('documento', document)
+        pending = self._pending
+        for row in rows:
+            for name in ('naviera', 'nave', 'pol', 'pod', 'numero_viaje'):
+                pending[name].append(self._encode(name, row[name]))
+            pending['documento'].append(document_code)
+            pending['etd'].append(_date(row['etd']))
+            pending['eta'].append(_date(row['eta']))
+            week = row['semana']
+            pending['semana'].append(week if isinstance(week, int) and 0 < week <= 53 else -1)
+            pending['lote'].append(batch)
+        return len(rows)
+
+    def extend(self, results: Iterable[Tuple[Mapping, Optional[str]]]) -> int:
+        """Agrega varios pares (itinerario normalizado, documento). Devuelve las filas agregadas."""
+        return sum(self.append(normalized, document) for normalized, document in results)
+
+    def _flush(self):
+        """Pasa las altas pendientes a un bloque nuevo (los bloques anteriores no se copian)."""
+        if not self._pending['lote']:
+            return
+        self._chunks.append({
+            name: np.array(self._pending[name], dtype=dtype) for name, dtype in COLUMN_DTYPES.items()
+        })
+        for name in COLUMN_DTYPES:
+            self._pending[name] = []
+        self._latest = None
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Arreglo de una columna (códigos en las columnas de texto).
+
+        Raises:
+            ValueError: Si la columna no existe.
+        """
+        if name not in COLUMN_DTYPES:
+            raise ValueError(f"Columna desconocida: {name}")
+        self._flush()
+        parts = [chunk[name] for chunk in self._chunks]
+        if not parts:
+            return np.empty(0, dtype=COLUMN_DTYPES[name])
+        # Con varios bloques la unión es temporal: dura lo que la consulta
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def values(self, name: str) -> List[str]:
+        """Valores distintos de una columna de texto, en el orden de sus códigos."""
+        if name not in STRING_COLUMNS:
+            raise ValueError(f"No es una columna de texto: {name}")
+        return list(self._values[name])
+
+    def decode(self, name: str, codes: Optional[np.ndarray] = None) -> np.ndarray:
+        """Textos de una columna (o de los códigos dados); None donde está vacía."""
+        codes = self.column(name) if codes is None else codes
+        lookup = np.empty(len(self._values[name]) + 1, dtype=object)
+        lookup[:-1] = self._values[name]
+        lookup[-1] = None  # El código -1 toma el último elemento
+        return lookup[codes]
+
+    def latest_mask(self) -> np.ndarray:
+        """Filas del último lote de cada documento (las filas sin documento siempre cuentan)."""
+        documents = self.column('documento')
+        if self._latest is None:
+            batches = self.column('lote')
+            latest = np.full(len(self._values['documento']) + 1, -1, dtype=np.int64)
+            np.maximum.at(latest, documents + 1, batches)
+            self._latest = (documents < 0) | (batches == latest[documents + 1])
+        return self._latest
+
+    def mask(self, latest: bool = True, **filters: Filter) -> np.ndarray:
+        """
+        Filas que cumplen todos los filtros.
+
+        Args:
+            latest: Si considerar solo el último lote de cada documento.
+            **filters: Columna = filtro. En las columnas de texto y en
+                       ``semana`` el filtro es un valor o una lista de
+                       valores; en ``etd``/``eta`` es una fecha ISO o un rango
+                       ``(desde, hasta)`` inclusivo, con None para no acotar.
+
+        Returns:
+            Arreglo booleano con una posición por fila.
+
+        Raises:
+            ValueError: Si una columna no existe.
+        """
+        result = self.latest_mask().copy() if latest else np.ones(len(self), dtype=bool)
+        for name, wanted in filters.items():
+            if wanted is None:
+                continue
+            column = self.column(name)
+            if name in STRING_COLUMNS:
+                wanted = [wanted] if isinstance(wanted, str) else list(wanted)
+                codes = [self._codes[name][value] for value in wanted if value in self._codes[name]]
+                result &= np.isin(column, codes)
+            elif name in DATE_COLUMNS:
+                if isinstance(wanted, str):
+                    result &= column == np.datetime64(wanted, 'D')
+                else:
+                    start, end = wanted
+                    if start is not None:
+                        result &= column >= np.datetime64(start, 'D')
+                    if end is not None:
+                        result &= column <= np.datetime64(end, 'D')
+            else:
+                wanted = [wanted] if isinstance(wanted, int) else list(wanted)
+                result &= np.isin(column, wanted)
+        return result
+
+    def select(self, latest: bool = True, **filters: Filter) -> pd.DataFrame:
+        """
+        Filas que cumplen los filtros, con los textos decodificados.
+
+        Args:
+            latest: Ver ``mask``.
+            **filters: Ver ``mask``.
+
+        Returns:
+            DataFrame con una columna por columna del almacén (sin ``lote``).
+        """
+        rows = np.flatnonzero(self.mask(latest, **filters))
+        data = {}
+        for name in COLUMN_DTYPES:
+            if name == 'lote':
+                continue
+            column = self.column(name)[rows]
+            if name in STRING_COLUMNS:
+                column = self.decode(name, column)
+            elif name == 'semana':
+                weeks = pd.array(column, dtype='Int16')
+                weeks[column < 0] = pd.NA
+                column = weeks
+            data[name] = column
+        return pd.DataFrame(data)
+
+    def group_by(self, by: Union[str, Sequence[str]], latest: bool = True, **filters: Filter) -> pd.DataFrame:
+        """
+        Agrupa las filas que cumplen los filtros.
+
+        Args:
+            by: Columna o columnas de agrupación (de texto o ``semana``).
+            latest: Ver ``mask``.
+            **filters: Ver ``mask``.
+
+        Returns:
+            DataFrame con las columnas de agrupación, ``registros`` (filas del
+            grupo) y el ETD mínimo y máximo del grupo (``etd_min``, ``etd_max``).
+
+        Raises:
+            ValueError: Si se agrupa por una columna de fecha o desconocida.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        for name in by:
+            if name in DATE_COLUMNS or name not in COLUMN_DTYPES:
+                raise ValueError(f"No se puede agrupar por la columna: {name}")
+        rows = np.flatnonzero(self.mask(latest, **filters))
+
+        # Una sola clave entera por fila: los códigos de cada columna en base (valores + 1)
+        columns = [self.column(name)[rows].astype(np.int64) + 1 for name in by]
+        bases = [int(column.max(initial=0)) + 1 for column in columns]
+        keys = np.zeros(len(rows), dtype=np.int64)
+        for column, base in zip(columns, bases):
+            keys = keys * base + column
+        groups, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+
+        # Mínimo y máximo de ETD por grupo, con las filas ordenadas por grupo
+        # (sobre los enteros de datetime64; NaT es el menor int64)
+        order = np.argsort(inverse.ravel(), kind='stable')
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        etd = self.column('etd')[rows].view(np.int64)[order]
+        missing, largest = np.iinfo(np.int64).min, np.iinfo(np.int64).max
+        etd_min = np.minimum.reduceat(np.where(etd == missing, largest, etd), starts) if len(rows) else etd
+        etd_min[etd_min == largest] = missing
+        etd_max = np.maximum.reduceat(etd, starts) if len(rows) else etd
+
+        # Separar la clave en los códigos de cada columna
+        codes_by_column = []
+        remainder = groups
+        for base in reversed(bases):
+            codes_by_column.insert(0, remainder % base - 1)
+            remainder = remainder // base
+
+        data = {}
+        for name, codes in zip(by, codes_by_column):
+            if name in STRING_COLUMNS:
+                data[name] = self.decode(name, codes.astype(np.int32))
+            else:
+                weeks = pd.array(codes, dtype='Int16')
+                weeks[codes < 0] = pd.NA
+                data[name] = weeks
+        data['registros'] = counts
+        data['etd_min'] = etd_min.view('datetime64[D]')
+        data['etd_max'] = etd_max.view('datetime64[D]')
+        return pd.DataFrame(data).sort_values('registros', ascending=False, kind='stable').reset_index(drop=True)
+
+    def save(self, path: Union[str, Path]):
+        """
+        Guarda el almacén en un directorio.
+
+        En el mismo directorio del que se cargó (o del último guardado) solo
+        se escriben las altas nuevas, como un segmento más. En otro
+        directorio se escribe todo en un segmento. Los archivos se escriben
+        aparte y ``meta.json`` se reemplaza de forma atómica al final, así un
+        lector nunca ve segmentos a medio escribir.
+
+        Args:
+            path: Directorio de destino (se crea si no existe).
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        self._flush()
+
+        meta = _read_meta(path)
+        if self._path is None or meta is None or not self._path.exists() or not path.samefile(self._path):
+            # Directorio nuevo: todo va a un segmento (los de un almacén anterior se descartan)
+            obsolete = [segment['id'] for segment in meta['segmentos']] if meta else []
+            next_segment = meta['siguiente'] if meta else 0
+            segments: List[Tuple[int, int]] = []
+            chunks: List[Dict[str, np.ndarray]] = []
+            saved_values = {name: 0 for name in STRING_COLUMNS}
+            unsaved = self._chunks
+        else:
+            if (len(self._chunks) == len(self._segments) and self._batches == self._saved_batches
+                    and all(len(self._values[name]) == self._saved_values[name] for name in STRING_COLUMNS)):
+                return
+            obsolete = []
+            next_segment = meta['siguiente']
+            segments = list(self._segments)
+            chunks = self._chunks[:len(self._segments)]
+            saved_values = self._saved_values
+            unsaved = self._chunks[len(self._segments):]
+
+        columns = {
+            name: (np.concatenate([chunk[name] for chunk in unsaved]) if unsaved
+                   else np.empty(0, dtype=dtype))
+            for name, dtype in COLUMN_DTYPES.items()
+        }
+        values = {name: self._values[name][saved_values[name]:] for name in STRING_COLUMNS}
+        self._write_segment(path, next_segment, columns, values)
+        segments.append((next_segment, len(columns['lote'])))
+        chunks.append(columns)
+        written = {next_segment}
+        next_segment += 1
+
+        # Mezcla el último segmento con el anterior mientras el anterior no sea más grande
+        while len(segments) >= 2 and segments[-2][1] <= segments[-1][1]:
+            previous, _ = segments[-2]
+            columns = {name: np.concatenate([chunks[-2][name], chunks[-1][name]]) for name in COLUMN_DTYPES}
+            values = {name: self._read_values(path, previous).get(name, []) + values[name]
+                      for name in STRING_COLUMNS}
+            self._write_segment(path, next_segment, columns, values)
+            obsolete.extend(segment for segment, _ in segments[-2:])
+            segments[-2:] = [(next_segment, len(columns['lote']))]
+            chunks[-2:] = [columns]
+            written.add(next_segment)
+            next_segment += 1
+
+        _write_atomic(path / 'meta.json', lambda f: f.write(json.dumps({
+            'version': FORMAT_VERSION,
+            'filas': len(self),
+            'lotes': self._batches,
+            'segmentos': [{'id': segment, 'filas': rows} for segment, rows in segments],
+            'siguiente': next_segment,
+        }).encode('utf-8')))
+
+        # Las altas pasan a leerse de sus segmentos (y dejan de ocupar memoria)
+        self._path = path
+        self._segments = segments
+        self._saved_values = {name: len(self._values[name]) for name in STRING_COLUMNS}
+        self._saved_batches = self._batches
+        self._chunks = [
+            self._open_segment(path, segment, rows) if segment in written and self._mmap else chunk
+            for (segment, rows), chunk in zip(segments, chunks)
+        ]
+        for segment in obsolete:
+            self._remove_segment(path, segment)
+
+    @staticmethod
+    def _write_segment(path: Path, segment: int, columns: Dict[str, np.ndarray], values: Dict[str, List[str]]):
+        for name, column in columns.items():
+            _write_atomic(path / SEGMENT_COLUMN_FILE.format(name=name, segment=segment),
+                          lambda f, column=column: np.save(f, np.ascontiguousarray(column)))
+        _write_atomic(path / SEGMENT_VALUES_FILE.format(segment=segment), lambda f: f.write(
+            json.dumps(values, ensure_ascii=False).encode('utf-8')))
+
+    @staticmethod
+    def _read_column(path: Path, segment: int, name: str, rows: int, mmap: bool = True) -> np.ndarray:
+        column = np.load(path / SEGMENT_COLUMN_FILE.format(name=name, segment=segment),
+                         mmap_mode='r' if mmap else None)
+        if column.dtype != COLUMN_DTYPES[name] or len(column) != rows:
+            raise ValueError(f"Columna inválida en {path}: {name} (segmento {segment})")
+        return column
+
+    @staticmethod
+    def _read_values(path: Path, segment: int) -> Dict[str, List[str]]:
+        with open(path / SEGMENT_VALUES_FILE.format(segment=segment), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _open_segment(self, path: Path, segment: int, rows: int) -> Dict[str, np.ndarray]:
+        return {name: self._read_column(path, segment, name, rows, self._mmap) for name in COLUMN_DTYPES}
+
+    @staticmethod
+    def _remove_segment(path: Path, segment: int):
+        names = [SEGMENT_COLUMN_FILE.format(name=name, segment=segment) for name in COLUMN_DTYPES]
+        names.append(SEGMENT_VALUES_FILE.format(segment=segment))
+        for name in names:
+            try:
+                os.remove(path / name)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                # Por ejemplo en Windows, si otro proceso aún tiene el archivo mapeado
+                logger.warning(f"No se pudo borrar el segmento {path / name}: {str(e)}")
+
+    @classmethod
+    def load(cls, path: Union[str, Path], mmap: bool = True) -> 'ItineraryStore':
+        """
+        Abre un almacén guardado con ``save``.
+
+        Args:
+            path: Directorio del almacén.
+            mmap: Si mapear las columnas en memoria (solo lectura) en vez de leerlas.
+                  Las altas posteriores se agregan en memoria hasta el próximo ``save``.
+
+        Returns:
+            Almacén con los datos guardados.
+
+        Raises:
+            FileNotFoundError: Si el directorio no tiene un almacén.
+            ValueError: Si el formato no es compatible.
+        """
+        path = Path(path)
+        meta = _read_meta(path)
+        if meta is None:
+            raise FileNotFoundError(f"Almacén de itinerarios no encontrado: {path}")
+        if meta.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Formato de almacén no soportado en {path}: {meta.get('version')}")
+
+        store = cls()
+        store._mmap = mmap
+        store._segments = [(segment['id'], segment['filas']) for segment in meta['segmentos']]
+        store._chunks = [store._open_segment(path, segment, rows) for segment, rows in store._segments]
+        if sum(rows for _, rows in store._segments) != meta['filas']:
+            raise ValueError(f"Segmentos incompletos en {path}")
+        for segment, _ in store._segments:
+            for name, added in cls._read_values(path, segment).items():
+                store._values[name].extend(added)
+        for name in STRING_COLUMNS:
+            store._codes[name] = {value: code for code, value in enumerate(store._values[name])}
+        store._path = path
+        store._saved_values = {name: len(store._values[name]) for name in STRING_COLUMNS}
+        store._batches = store._saved_batches = meta['lotes']
+        return store
+
+    def __len__(self) -> int:
+        return sum(len(chunk['lote']) for chunk in self._chunks) + len(self._pending['lote'])
@@ -0,0 +1,183 @@
+"""
+Caché en disco de resultados OCR direccionada por contenido.
+
+La clave es un hash de los píxeles decodificados de la imagen (no del nombre
+ni de los bytes del archivo, que cambian al volver a guardarla) junto con la
+configuración OCR. Se guardan las detecciones crudas ``(bbox, text, confidence)``
+de EasyOCR, con un tamaño máximo y expulsión LRU.
+
+Varios procesos pueden compartir el directorio (por ejemplo los trabajadores
+de ``OCRWorkerPool``). Como cada uno solo lleva la cuenta de lo que escribe,
+el índice se vuelve a leer del directorio cada ``RESCAN_INTERVAL``
+escrituras, así el tamaño máximo vale para la caché completa y no por
+proceso.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+from PIL import Image
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Escrituras entre relecturas del directorio (para contar lo escrito por otros procesos)
+RESCAN_INTERVAL = 32
+
+
+class OCRCache:
+    """Caché LRU en disco de detecciones EasyOCR."""
+
+    def __init__(self, cache_dir: str = 'cache/ocr', max_bytes: int = 256 * 1024 * 1024):
+        """
+        Inicializa la caché.
+
+        Args:
+            cache_dir: Directorio donde guardar las entradas.
+            max_bytes: Tamaño máximo total de la caché en bytes.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        # clave -> tamaño en bytes, ordenado del menos al más recientemente usado
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._puts_since_scan = 0
+        self._load_index()
+
+    def _load_index(self):
+        """Reconstruye el índice LRU a partir de los archivos existentes (por fecha de uso)."""
+        self._entries.clear()
+        self._total_bytes = 0
+        self._puts_since_scan = 0
+        files = []
+        for path in self.cache_dir.glob('*.json'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, path.stem, stat.st_size))
+
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    @staticmethod
+    def make_key(image_path: str, settings: Dict) -> str:
+        """
+        Calcula la clave de una imagen: hash de sus píxeles y de la configuración OCR.
+
+        Args:
+            image_path: Ruta a la imagen.
+            settings: Configuración que afecta al resultado (idiomas, umbral, preprocesamiento).
+
+        Returns:
+            Clave hexadecimal.
+        """
+        digest = hashlib.sha256()
+        with Image.open(image_path) as img:
+            digest.update(f'{img.mode}:{img.size[0]}x{img.size[1]}:'.encode())
+            digest.update(img.tobytes())
+        digest.update(json.dumps(settings, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f'{key}.json'
+
+    def get(self, key: str) -> Optional[List[tuple]]:
+        """
+        Obtiene las detecciones guardadas.
+
+        Args:
+            key: Clave calculada con ``make_key``.
+
+        Returns:
+            Lista de tuplas (bbox, text, confidence) o None si no está en caché.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            else:
+                # Entrada escrita por otro proceso que comparte el directorio
+                size = path.stat().st_size if path.exists() else 0
+                self._entries[key] = size
+                self._total_bytes += size
+        try:
+            # La fecha de modificación registra el último uso entre reinicios
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        return [(bbox, text, confidence) for bbox, text, confidence in stored]
+
+    def put(self, key: str, results: list):
+        """
+        Guarda las detecciones de una imagen y expulsa entradas antiguas si se supera el límite.
+
+        Args:
+            key: Clave calculada con ``make_key``.
+            results: Resultados de EasyOCR: lista de (bbox, text, confidence).
+        """
+        serializable = [
+            [[[float(x), float(y)] for x, y in bbox], str(text), float(confidence)]
+            for bbox, text, confidence in results
+        ]
+        payload = json.dumps(serializable, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+        path = self._path(key)
+        tmp_path = path.with_name(f'{key}.{os.getpid()}.{threading.get_ident()}.tmp')
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+            # Escritura atómica: otros procesos nunca leen un archivo a medias
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar en caché OCR {key}: {str(e)}")
+            return
+
+        with self._lock:
+            self._total_bytes -= self._entries.pop(key, 0)
+            self._entries[key] = len(payload)
+            self._total_bytes += len(payload)
+            self._puts_since_scan += 1
+            if self._puts_since_scan >= RESCAN_INTERVAL or self._total_bytes > self.max_bytes:
+                # Contar también lo que escribieron otros procesos
+                self._load_index()
+            self._evict()
+
+    def _evict(self):
+        """Elimina las entradas menos usadas hasta respetar el tamaño máximo."""
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+            logger.debug(f"Entrada de caché OCR expulsada: {key}")
+
+    def clear(self):
+        """Elimina todas las entradas de la caché."""
+        with self._lock:
+            for key in list(self._entries):
+                try:
+                    self._path(key).unlink()
+                except OSError:
+                    pass
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,217 @@
+"""
+Representación estructurada de un documento OCR.
+
+En lugar de un único string con las detecciones unidas por saltos de línea,
+el documento conserva cada token con su texto, caja, confianza y fila visual.
+El texto completo, su versión en minúsculas y la lista de líneas se calculan
+una sola vez y todos los extractores leen de este objeto compartido.
+"""
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+import numpy as np
+
+
+class OCRToken:
+    """Una detección de OCR."""
+
+    __slots__ = ('text', 'bbox', 'confidence', 'line', 'row', 'column')
+
+    def __init__(self, text: str, bbox: Optional[list] = None, confidence: float = 1.0,
+                 line: int = 0, row: int = 0, column: Optional[int] = None):
+        """
+        Args:
+            text: Texto reconocido.
+            bbox: Cuatro puntos [x, y] de la caja (None si el documento viene de texto plano).
+            confidence: Confianza de EasyOCR.
+            line: Índice de la línea que ocupa en ``OCRDocument.text``.
+            row: Fila visual (detecciones a la misma altura comparten fila).
+            column: Columna de tabla, si se ha reconstruido el layout.
+        """
+        self.text = text
+        self.bbox = bbox
+        self.confidence = confidence
+        self.line = line
+        self.row = row
+        self.column = column
+
+    @property
+    def x0(self) -> float:
+        return min(x for x, _ in self.bbox)
+
+    @property
+    def x1(self) -> float:
+        return max(x for x, _ in self.bbox)
+
+    @property
+    def y0(self) -> float:
+        return min(y for _, y in self.bbox)
+
+    @property
+    def y1(self) -> float:
+        return max(y for _, y in self.bbox)
+
+    def __repr__(self) -> str:
+        return f"OCRToken({self.text!r}, line={self.line}, row={self.row}, conf={self.confidence:.2f})"
+
+
+class LineIndex:
+    """Índice de desplazamientos de inicio de línea para pasar de offset a línea en O(log n)."""
+
+    def __init__(self, lines: List[str]):
+        """
+        Args:
+            lines: Líneas del texto (unidas por un salto de línea).
+        """
+        # Cada línea empieza después de la anterior más su salto de línea
+        ends = list(accumulate(len(line) + 1 for line in lines))
+        self.starts: List[int] = [0] + ends[:-1]
+        self.length = ends[-1] - 1 if ends else 0
+
+    def line_of(self, offset: int) -> int:
+        """
+        Línea que contiene un desplazamiento del texto.
+
+        Args:
+            offset: Posición de un carácter en el texto completo.
+
+        Returns:
+            Índice de la línea (el salto de línea final pertenece a su línea).
+        """
+        return bisect_right(self.starts, offset) - 1
+
+    def span(self, line: int) -> Tuple[int, int]:
+        """Desplazamientos [inicio, fin) de una línea, sin el salto de línea."""
+        start = self.starts[line]
+        end = self.starts[line + 1] - 1 if line + 1 < len(self.starts) else self.length
+        return start, end
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+
+class OCRDocument:
+    """Documento OCR: tokens más índices de texto calculados una sola vez."""
+
+    def __init__(self, tokens: List[OCRToken]):
+        """
+        Args:
+            tokens: Tokens en orden de lectura (uno por línea de ``text``).
+        """
+        self.tokens = tokens
+        self.lines: List[str] = [token.text for token in tokens]
+        self.text = '\n'.join(self.lines)
+        self.text_lower = self.text.lower()
+        self.lines_lower: List[str] = self.text_lower.split('\n') if tokens else []
+        self._memo: Dict[Any, Any] = {}
+
+    @classmethod
+    def from_detections(cls, detections: Iterable, min_confidence: float = 0.3) -> 'OCRDocument':
+        """
+        Construye el documento a partir de los resultados de EasyOCR.
+
+        Args:
+            detections: Lista de tuplas (bbox, text, confidence).
+            min_confidence: Las detecciones con confianza menor o igual se descartan.
+
+        Returns:
+            Documento con un token por detección aceptada.
+        """
+        tokens = []
+        for bbox, text, confidence in detections:
+            if confidence > min_confidence:
+                # Un salto de línea dentro del texto rompería la correspondencia token/línea
+                text = ' '.join(str(text).split('\n'))
+                tokens.append(OCRToken(text, bbox, float(confidence), line=len(tokens)))
+
+        cls._assign_rows(tokens)
+        return cls(tokens)
+
+    @classmethod
+    def from_text(cls, text: str) -> 'OCRDocument':
+        """Construye un documento sin geometría a partir de texto plano (una línea por token)."""
+        if not text:
+            return cls([])
+        return cls([OCRToken(line, line=i, row=i) for i, line in enumerate(text.split('\n'))])
+
+    @classmethod
+    def coerce(cls, value: Union[str, 'OCRDocument', None]) -> 'OCRDocument':
+        """Devuelve ``value`` si ya es un documento o lo construye a partir de texto."""
+        if isinstance(value, OCRDocument):
+            return value
+        return cls.from_text(value or '')
+
+    @staticmethod
+    def _assign_rows(tokens: List[OCRToken]):
+        """Agrupa los tokens en filas visuales según la posición vertical de su centro."""
+        if not tokens:
+            return
+        boxes = np.array([np.asarray(token.bbox, dtype=float) for token in tokens])
+        y0 = boxes[:, :, 1].min(axis=1)
+        y1 = boxes[:, :, 1].max(axis=1)
+        centers = (y0 + y1) / 2
+        tolerance = max(float(np.median(y1 - y0)) / 2, 1.0)
+
+        by_y = np.argsort(centers, kind='stable')
+        gaps = np.diff(centers[by_y]) > tolerance
+        rows = np.empty(len(tokens), dtype=int)
+        rows[by_y] = np.concatenate(([0], np.cumsum(gaps)))
+        for token, row in zip(tokens, rows):
+            token.row = int(row)
+
+    @property
+    def has_geometry(self) -> bool:
+        """Indica si los tokens tienen cajas (documento construido desde detecciones)."""
+        return bool(self.tokens) and self.tokens[0].bbox is not None
+
+    def slice_lines(self, start: int, end: int) -> 'OCRDocument':
+        """
+        Devuelve un sub-documento con las líneas [start, end), compartiendo los tokens.
+
+        Args:
+            start: Primera línea (incluida).
+            end: Última línea (excluida).
+
+        Returns:
+            Documento con la ventana de líneas pedida.
+        """
+        start = max(0, start)
+        end = min(len(self.tokens), end)
+        key = ('slice', start, end)
+        if key not in self._memo:
+            self._memo[key] = OCRDocument(self.tokens[start:end])
+        return self._memo[key]
+
+    @property
+    def line_index(self) -> LineIndex:
+        """Índice de líneas del texto completo (calculado una vez)."""
+        return self.cached('line_index', lambda: LineIndex(self.lines))
+
+    def line_of(self, offset: int) -> int:
+        """Línea de ``text`` que contiene el desplazamiento ``offset``."""
+        return self.line_index.line_of(offset)
+
+    def cached(self, key: Any, factory: Callable[[], Any]) -> Any:
+        """
+        Memoiza un resultado derivado del documento (por ejemplo, una extracción).
+
+        Args:
+            key: Clave del resultado.
+            factory: Función que lo calcula si aún no existe.
+
+        Returns:
+            Resultado memoizado.
+        """
+        if key not in self._memo:
+            self._memo[key] = factory()
+        return self._memo[key]
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def __getstate__(self):
+        # Los resultados memoizados se recalculan; no viajan entre procesos
+        return {'tokens': self.tokens}
+
+    def __setstate__(self, state):
+        self.__init__(state['tokens'])
@@ -1,42 +1,139 @@
 """
 Módulo para procesamiento de imágenes de itinerarios usando OCR.
 """
-import re
-from typing import Dict, Optional
+import functools
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
 from pathlib import Path
-import easyocr
+import numpy as np
+from PIL import Image, ImageOps
 import logging
 
+from . import patterns, tiling
+from .ocr_document import OCRDocument
+from .table_layout import TableLayout
+from .image_preprocessor import ImagePreprocessor
+from .ocr_cache import OCRCache
+from .detection_store import DetectionStore
+from .gazetteer import Gazetteer, load_default
+from .carrier_templates import CarrierTemplate, fingerprint
+from .port_index import load_default as load_port_index
+from .reader_registry import ReaderRegistry, default_registry
+
 logger = logging.getLogger(__name__)
 
 
+def _per_document(method):
+    """Memoiza un extractor ``(self, doc)`` en el propio documento: se calcula una vez por documento."""
+    @functools.wraps(method)
+    def wrapper(self, doc: OCRDocument):
+        return doc.cached(method.__name__, lambda: method(self, doc))
+    return wrapper
+
+
 class OCRProcessor:
     """Procesador de OCR para extraer texto de imágenes de itinerarios."""
     
-    def __init__(self, languages: Optional[list] = None, gpu: bool = True):
+    # Campos que se pueden pedir a extract_fields y el método que calcula cada uno
+    FIELDS = {
+        'naviera': '_extract_shipping_line',
+        'nave': '_extract_vessel',
+        'imo': '_extract_imo',
+        'pol': '_extract_pol',
+        'pod': '_extract_pod',
+        'etd': '_resolve_etd',
+        'eta': '_resolve_eta',
+        'fecha': '_extract_document_date',
+        'fecha_salida': '_resolve_etd',
+        'fecha_llegada': '_resolve_eta',
+        'semana': '_extract_week',
+        'puerto_origen': '_extract_pol',  # POL es el puerto de origen
+        'puerto_destino': '_extract_pod',  # POD es el puerto de destino
+        'numero_contenedor': '_extract_container_number',
+        'numero_booking': '_extract_booking_number',
+        'numero_viaje': '_extract_voyage_number',
+        'naves': '_extract_vessels_data',
+    }
+    
+    def __init__(self, languages: Optional[list] = None, gpu: bool = True,
+                 registry: Optional[ReaderRegistry] = None, cache: Optional[OCRCache] = None,
+                 preprocessor: Optional[ImagePreprocessor] = None,
+                 tile_height: int = 2048, tile_overlap: int = 256,
+                 tile_threshold: Optional[int] = 6000, tile_workers: int = 2,
+                 gazetteer: Optional[Gazetteer] = None,
+                 templates: Optional[List[CarrierTemplate]] = None,
+                 store: Optional[DetectionStore] = None):
         """
         Inicializa el procesador OCR.
         
+        El lector EasyOCR se obtiene del registro compartido del proceso, de
+        modo que crear varios procesadores no vuelve a cargar los modelos. Se
+        pide recién la primera vez que hace falta OCR: un procesador que solo
+        extrae datos de documentos ya reconocidos nunca carga EasyOCR.
+        
         Args:
             languages: Lista de idiomas a usar (por defecto ['es', 'en']).
                       Ejemplo: ['es', 'en'] para español e inglés.
             gpu: Si usar GPU para procesamiento (por defecto True).
                  Si no hay GPU disponible, se usará CPU automáticamente.
+            registry: Registro de lectores a usar (por defecto el del proceso).
+            cache: Caché de detecciones en disco (opcional). Si se indica, las
+                   imágenes ya procesadas no vuelven a pasar por EasyOCR.
+            preprocessor: Preprocesador de imágenes (opcional). Si se indica, la
+                          imagen se reduce y normaliza antes del OCR.
+            tile_height: Alto de cada franja en el modo por franjas.
+            tile_overlap: Solapamiento entre franjas (mayor que una línea de texto).
+            tile_threshold: Alto de imagen a partir del cual se usa automáticamente
+                            el modo por franjas (None = solo bajo pedido).
+            tile_workers: Franjas procesadas en paralelo. También limita cuántas
+                          franjas hay en memoria a la vez.
+            gazetteer: Diccionario de navieras y puertos (por defecto ``data/gazetteer.json``).
+            templates: Plantillas de formato por naviera (por defecto ninguna: solo
+                       extracción genérica). ``carrier_templates.DEFAULT_TEMPLATES``
+                       activa las plantillas incluidas, que aún son experimentales.
+            store: Archivo de detecciones (opcional). Si se indica, se guardan las
+                   detecciones de cada imagen para reprocesarlas con ``replay.py``.
         """
         if languages is None:
             languages = ['es', 'en']  # Español e inglés por defecto
         
-        try:
-            self.reader = easyocr.Reader(languages, gpu=gpu)
-            logger.info(f"EasyOCR inicializado con idiomas: {languages}")
-        except Exception as e:
-            logger.warning(f"Error al inicializar EasyOCR con GPU, intentando con CPU: {str(e)}")
-            try:
-                self.reader = easyocr.Reader(languages, gpu=False)
-                logger.info(f"EasyOCR inicializado con CPU e idiomas: {languages}")
-            except Exception as e2:
-                logger.error(f"Error al inicializar EasyOCR: {str(e2)}")
-                raise
+        self.languages = list(languages)
+        # Umbral de confianza mínimo para aceptar una detección
+        self.min_confidence = 0.3
+        self.cache = cache
+        self.preprocessor = preprocessor
+        self.tile_height = tile_height
+        self.tile_overlap = tile_overlap
+        self.tile_threshold = tile_threshold
+        self.tile_workers = tile_workers
+        # Milisegundos por paso de la última imagen procesada (preprocesamiento + OCR)
+        self.last_timings: Dict[str, float] = {}
+        self.gazetteer = gazetteer or load_default()
+        self.templates = list(templates or [])
+        self.store = store
+        self.registry = registry or default_registry
+        self.gpu = gpu
+        self._reader = None
+        self._device = None
+    
+    @property
+    def reader(self):
+        """Lector EasyOCR compartido (se obtiene del registro en el primer uso)."""
+        if self._reader is None:
+            self._load_reader()
+        return self._reader
+    
+    @property
+    def device(self) -> str:
+        """Dispositivo efectivo del lector: 'gpu' o 'cpu' (carga el lector si hace falta)."""
+        if self._device is None:
+            self._load_reader()
+        return self._device
+    
+    def _load_reader(self):
+        self._reader, self._device = self.registry.get_reader(self.languages, self.gpu)
     
     def extract_text(self, image_path: str) -> str:
         """
@@ -58,27 +155,333 @@ class OCRProcessor:
             raise FileNotFoundError(f"La imagen no existe: {image_path}")
         
         try:
+            results = self._read_detections(str(image_path))
+            text = self._results_to_text(results)
+            
+            logger.info(f"Texto extraído exitosamente de {image_path} ({len(results)} detecciones)")
+            return text
+        except Exception as e:
+            logger.error(f"Error al procesar imagen {image_path}: {str(e)}")
+            raise ValueError(f"Error al procesar la imagen: {str(e)}")
+    
+    def extract_text_tiled(self, image_path: str) -> str:
+        """
+        Extrae texto de una imagen muy alta procesándola por franjas solapadas.
+        
+        Args:
+            image_path: Ruta a la imagen a procesar.
+            
+        Returns:
+            Texto extraído, en orden de lectura.
+            
+        Raises:
+            FileNotFoundError: Si la imagen no existe.
+            ValueError: Si hay un error al procesar la imagen.
+        """
+        if not Path(image_path).exists():
+            raise FileNotFoundError(f"La imagen no existe: {image_path}")
+        
+        try:
+            results = self._read_detections(str(image_path), tiled=True)
+            return self._results_to_text(results)
+        except Exception as e:
+            logger.error(f"Error al procesar imagen {image_path} por franjas: {str(e)}")
+            raise ValueError(f"Error al procesar la imagen: {str(e)}")
+    
+    def extract_text_batch(self, image_paths: List[str], batch_size: int = 8) -> List[str]:
+        """
+        Extrae texto de varias imágenes aprovechando el reconocimiento por lotes de EasyOCR.
+        
+        Las imágenes se agrupan por tamaño (tras la rotación EXIF; EasyOCR solo
+        apila en un lote imágenes de iguales dimensiones) y cada grupo se procesa
+        con ``readtext_batched`` en bloques de a lo sumo ``batch_size`` imágenes.
+        Las imágenes sin pareja se procesan con ``readtext`` normal.
+        
+        Args:
+            image_paths: Rutas de las imágenes a procesar.
+            batch_size: Imágenes por llamada a EasyOCR (y tamaño de lote del reconocedor).
+            
+        Returns:
+            Lista de textos, uno por imagen y en el mismo orden de entrada.
+            
+        Raises:
+            FileNotFoundError: Si alguna imagen no existe.
+            ValueError: Si hay un error al procesar las imágenes.
+        """
+        return [self._results_to_text(results) for results in self._read_detections_batch(image_paths, batch_size)]
+    
+    def _read_detections_batch(self, image_paths: List[str], batch_size: int) -> List[list]:
+        """Detecciones crudas de varias imágenes (caché, franjas y lotes por tamaño)."""
+        for image_path in image_paths:
+            if not Path(image_path).exists():
+                raise FileNotFoundError(f"La imagen no existe: {image_path}")
+        
+        detections: List[Optional[list]] = [None] * len(image_paths)
+        
+        # Primero resolver desde la caché; solo las imágenes faltantes van a EasyOCR
+        pending = []
+        cache_keys = {}
+        for index, image_path in enumerate(image_paths):
+            if self._needs_tiling(str(image_path)):
+                # Las imágenes muy altas no entran en un lote; van por franjas
+                detections[index] = self._read_detections(str(image_path), tiled=True)
+                continue
+            if self.cache is not None:
+                cache_keys[index] = self.cache.make_key(str(image_path), self._cache_settings())
+                cached = self.cache.get(cache_keys[index])
+                if cached is not None:
+                    detections[index] = cached
+                    self._archive(str(image_path), cached)
+                    continue
+            pending.append(index)
+        
+        # Grupos por tamaño; un grupo se procesa en cuanto junta ``batch_size``
+        # imágenes, así solo quedan en memoria las de los grupos incompletos.
+        # Con preprocesamiento, el agrupamiento usa el tamaño ya reducido.
+        groups: Dict[tuple, List[Tuple[int, Optional[np.ndarray], float]]] = {}
+        for index in pending:
+            image_path = str(image_paths[index])
+            if self.preprocessor is not None:
+                image, scale = self._prepare_input(image_path)
+                size = image.shape
+            else:
+                # Sin preprocesamiento la imagen se carga recién al procesar el bloque
+                image, scale, size = None, 1.0, self._oriented_size(image_path)
+            group = groups.setdefault(size, [])
+            group.append((index, image, scale))
+            if len(group) >= batch_size:
+                self._recognize_group(groups.pop(size), image_paths, cache_keys, detections, batch_size)
+        for group in groups.values():
+            self._recognize_group(group, image_paths, cache_keys, detections, batch_size)
+        
+        logger.info(f"Texto extraído de {len(image_paths)} imágenes en lote")
+        return detections
+    
+    def _recognize_group(self, group: List[Tuple[int, Optional[np.ndarray], float]], image_paths: List[str],
+                         cache_keys: Dict[int, str], detections: List[Optional[list]], batch_size: int):
+        """Procesa un bloque de imágenes del mismo tamaño y guarda sus detecciones."""
+        images = [
+            image if image is not None else self._load_oriented(str(image_paths[index]))
+            for index, image, _ in group
+        ]
+        try:
+            if len(images) == 1:
+                results_list = [self.reader.readtext(images[0], batch_size=batch_size)]
+            else:
+                results_list = self.reader.readtext_batched(images, batch_size=batch_size)
+        except Exception as e:
+            logger.error(f"Error al procesar lote de {len(images)} imágenes {images[0].shape}: {str(e)}")
+            raise ValueError(f"Error al procesar las imágenes: {str(e)}")
+        
+        for (index, _, scale), results in zip(group, results_list):
+            results = self._rescale_results(results, scale)
+            if self.cache is not None:
+                self.cache.put(cache_keys[index], results)
+            self._archive(str(image_paths[index]), results)
+            detections[index] = results
+    
+    def _read_detections(self, image_path: str, tiled: Optional[bool] = None) -> list:
+        """
+        Obtiene las detecciones crudas de EasyOCR de una imagen, usando la caché si existe.
+        
+        Args:
+            image_path: Ruta a la imagen.
+            tiled: Forzar (True) o impedir (False) el modo por franjas.
+                   None = automático según ``tile_threshold``.
+            
+        Returns:
+            Lista de tuplas (bbox, text, confidence).
+        """
+        if tiled is None:
+            tiled = self._needs_tiling(image_path)
+        
+        key = None
+        if self.cache is not None:
+            key = self.cache.make_key(image_path, self._cache_settings(tiled))
+            cached = self.cache.get(key)
+            if cached is not None:
+                logger.info(f"Detecciones OCR de {image_path} obtenidas de caché")
+                self._archive(image_path, cached)
+                return cached
+        
+        if tiled:
+            results = self._read_detections_tiled(image_path)
+        else:
+            image, scale = self._prepare_input(image_path)
+            
+            start = time.perf_counter()
+            results = self.reader.readtext(image)
+            self.last_timings['ocr'] = (time.perf_counter() - start) * 1000
+            results = self._rescale_results(results, scale)
+        
+        if self.preprocessor is not None:
+            steps = ', '.join(f'{step}={ms:.0f}ms' for step, ms in self.last_timings.items())
+            logger.info(f"Tiempos de {image_path}: {steps}")
+        
+        if key is not None:
+            self.cache.put(key, results)
+        self._archive(image_path, results)
+        return results
+    
+    def _archive(self, image_path: str, results: list):
+        """Guarda las detecciones de la imagen en el archivo de detecciones, si hay."""
+        if self.store is not None:
+            self.store.put(image_path, results)
+    
+    def _needs_tiling(self, image_path: str) -> bool:
+        """Indica si la imagen es lo bastante alta para procesarla por franjas."""
+        if not self.tile_threshold:
+            return False
+        with Image.open(image_path) as img:
+            return img.height > self.tile_threshold
+    
+    def _read_detections_tiled(self, image_path: str) -> list:
+        """
+        Procesa una imagen por franjas horizontales solapadas, en paralelo.
+        
+        Solo hay ``tile_workers`` franjas en vuelo a la vez, por lo que la memoria
+        del detector no depende del alto de la imagen. La imagen en sí se
+        decodifica una vez, en escala de grises (un byte por píxel).
+        
+        Returns:
+            Detecciones en coordenadas de la imagen completa, sin duplicados y
+            en orden de lectura.
+        """
+        self.last_timings = {}
+        start = time.perf_counter()
+        
+        with Image.open(image_path) as source:
+            # Una sola decodificación; en gris ocupa un byte por píxel
+            grayscale = self.preprocessor is None or self.preprocessor.grayscale
+            if grayscale:
+                # Las JPEG se decodifican directamente en gris, sin pasar por RGB
+                source.draft('L', source.size)
+            image = source.convert('L') if grayscale else source.convert('RGB')
+        
+        bands = tiling.iter_bands(image.height, self.tile_height, self.tile_overlap)
+        
+        def process_band(band):
+            top, bottom, own_top, own_bottom = band
+            crop = image.crop((0, top, image.width, bottom))
+            if self.preprocessor is not None:
+                prepared = self.preprocessor.process(crop)
+                band_input, scale = prepared.image, prepared.scale
+            else:
+                band_input, scale = np.asarray(crop), 1.0
+            results = self._rescale_results(self.reader.readtext(band_input), scale)
+            results = tiling.offset_detections(results, 0, top)
+            return tiling.keep_own_detections(results, own_top, own_bottom)
+        
+        detections = []
+        with ThreadPoolExecutor(max_workers=self.tile_workers) as executor:
+            pending = deque()
+            for band in bands:
+                if len(pending) >= self.tile_workers:
+                    detections.extend(pending.popleft().result())
+                pending.append(executor.submit(process_band, band))
+            while pending:
+                detections.extend(pending.popleft().result())
+        
+        detections = tiling.suppress_overlap_duplicates(detections, bands)
+        detections = tiling.reading_order(detections)
+        
+        self.last_timings['ocr_franjas'] = (time.perf_counter() - start) * 1000
+        logger.info(f"{image_path} procesada en {len(bands)} franjas ({len(detections)} detecciones)")
+        return detections
+    
+    def _prepare_input(self, image_path: str) -> Tuple[Union[str, np.ndarray], float]:
+        """
+        Prepara la entrada de EasyOCR aplicando el preprocesador si existe.
+        
+        Returns:
+            Tupla (ruta o arreglo de imagen, escala aplicada).
+        """
+        self.last_timings = {}
+        if self.preprocessor is None:
             # EasyOCR lee directamente desde la ruta del archivo
-            results = self.reader.readtext(str(image_path))
+            return image_path, 1.0
+        
+        prepared = self.preprocessor.process(image_path)
+        self.last_timings.update(prepared.timings)
+        return prepared.image, prepared.scale
+    
+    @staticmethod
+    def _oriented_size(image_path: str) -> tuple:
+        """Forma (alto, ancho, canales) de la imagen tras la rotación EXIF, sin decodificarla."""
+        with Image.open(image_path) as img:
+            width, height = img.size
+            # Orientaciones 5 a 8: la imagen se gira 90°
+            if img.getexif().get(0x0112) in (5, 6, 7, 8):
+                width, height = height, width
+        return height, width, 3
+    
+    @staticmethod
+    def _load_oriented(image_path: str) -> np.ndarray:
+        """Imagen en RGB con la rotación EXIF aplicada (la forma coincide con ``_oriented_size``)."""
+        with Image.open(image_path) as img:
+            return np.asarray(ImageOps.exif_transpose(img).convert('RGB'))
+    
+    @staticmethod
+    def _rescale_results(results: list, scale: float) -> list:
+        """Devuelve las cajas a coordenadas de la imagen original (tras la rotación EXIF)."""
+        if scale == 1.0:
+            return results
+        return [
+            ([[x / scale, y / scale] for x, y in bbox], text, confidence)
+            for bbox, text, confidence in results
+        ]
+    
+    def _cache_settings(self, tiled: bool = False) -> Dict:
+        """Configuración que forma parte de la clave de caché."""
+        return {
+            'tiling': [self.tile_height, self.tile_overlap] if tiled else None,
+            'languages': sorted(self.languages),
+            'preprocessing': self.preprocessor.settings() if self.preprocessor else None,
+        }
+    
+    def _results_to_text(self, results: list) -> str:
+        """
+        Convierte los resultados de EasyOCR en texto.
+        
+        Args:
+            results: Lista de tuplas (bbox, text, confidence).
             
-            # Extraer texto de los resultados
-            # results es una lista de tuplas: (bbox, text, confidence)
-            text_lines = []
-            for (bbox, text, confidence) in results:
-                # Filtrar resultados con baja confianza (opcional)
-                if confidence > 0.3:  # Umbral de confianza mínimo
-                    text_lines.append(text)
+        Returns:
+            Líneas con confianza suficiente unidas por saltos de línea.
+        """
+        return OCRDocument.from_detections(results, self.min_confidence).text
+    
+    def extract_document(self, image_path: str) -> OCRDocument:
+        """
+        Extrae el documento OCR estructurado de una imagen.
+        
+        A diferencia de ``extract_text``, conserva la caja, la confianza y la
+        fila visual de cada detección.
+        
+        Args:
+            image_path: Ruta a la imagen a procesar.
             
-            # Unir todas las líneas de texto
-            text = '\n'.join(text_lines)
+        Returns:
+            OCRDocument con un token por detección aceptada.
             
-            logger.info(f"Texto extraído exitosamente de {image_path} ({len(results)} detecciones)")
-            return text
+        Raises:
+            FileNotFoundError: Si la imagen no existe.
+            ValueError: Si hay un error al procesar la imagen.
+        """
+        if not Path(image_path).exists():
+            raise FileNotFoundError(f"La imagen no existe: {image_path}")
+        
+        try:
+            results = self._read_detections(str(image_path))
         except Exception as e:
             logger.error(f"Error al procesar imagen {image_path}: {str(e)}")
             raise ValueError(f"Error al procesar la imagen: {str(e)}")
+        
+        document = OCRDocument.from_detections(results, self.min_confidence)
+        logger.info(f"Texto extraído exitosamente de {image_path} ({len(results)} detecciones)")
+        return document
     
-    def extract_structured_data(self, image_path: str) -> Dict[str, str]:
+    def extract_structured_data(self, image_path: str, fields: Optional[List[str]] = None) -> Dict[str, str]:
         """
         Extrae datos estructurados básicos de un itinerario.
         Siempre devuelve: Naviera, Nave, POL, POD, ETD, ETA
@@ -86,140 +489,256 @@ class OCRProcessor:
         
         Args:
             image_path: Ruta a la imagen del itinerario.
+            fields: Campos a extraer (ver ``FIELDS``). None = todos, con la forma completa.
+            
+        Returns:
+            Diccionario con datos extraídos (texto crudo y datos estructurados).
+        """
+        return self.extract_structured_data_from_document(self.extract_document(image_path), fields)
+    
+    def extract_structured_data_batch(self, image_paths: List[str], batch_size: int = 8,
+                                      fields: Optional[List[str]] = None) -> List[Dict[str, str]]:
+        """
+        Extrae datos estructurados de varias imágenes usando OCR por lotes.
+        
+        Args:
+            image_paths: Rutas de las imágenes de itinerarios.
+            batch_size: Tamaño de lote del reconocedor.
+            fields: Campos a extraer (None = todos).
+            
+        Returns:
+            Lista de diccionarios con la misma forma que ``extract_structured_data``,
+            uno por imagen y en el mismo orden de entrada.
+        """
+        return [
+            self.extract_structured_data_from_document(
+                OCRDocument.from_detections(results, self.min_confidence), fields)
+            for results in self._read_detections_batch(image_paths, batch_size)
+        ]
+    
+    def extract_structured_data_from_text(self, raw_text: str, fields: Optional[List[str]] = None) -> Dict[str, str]:
+        """
+        Extrae datos estructurados a partir del texto ya reconocido.
+        
+        Args:
+            raw_text: Texto extraído por OCR.
+            fields: Campos a extraer (None = todos).
             
         Returns:
             Diccionario con datos extraídos (texto crudo y datos estructurados).
         """
-        raw_text = self.extract_text(image_path)
+        return self.extract_structured_data_from_document(OCRDocument.from_text(raw_text), fields)
+    
+    def extract_structured_data_from_document(self, doc: OCRDocument,
+                                              fields: Optional[List[str]] = None) -> Dict[str, str]:
+        """
+        Extrae datos estructurados de un documento OCR.
+        
+        Todos los extractores leen del mismo documento, que memoiza el texto en
+        minúsculas, las líneas y los resultados intermedios.
+        
+        Args:
+            doc: Documento OCR.
+            fields: Campos a extraer. Si se indican, sólo se calculan esos campos
+                    (y sus dependencias) y el resultado contiene ``raw_text``,
+                    ``documento`` y los campos pedidos.
+            
+        Returns:
+            Diccionario con datos extraídos (texto crudo, documento y datos estructurados).
+        """
+        if fields is not None:
+            data = {'raw_text': doc.text, 'documento': doc}
+            data.update(self.extract_fields(doc, fields))
+            return data
+        
+        naves = self._extract_vessels_data(doc)
+        
+        # Si hay múltiples naves, devolver la información de cada una
+        if naves:
+            return {
+                'raw_text': doc.text,
+                'documento': doc,
+                'multiple_naves': True,
+                'plantilla': self._template_name(doc),
+                'total_naves': len(naves),
+                'naves': [dict(nave) for nave in naves],
+                # Datos generales siempre requeridos
+                **self.extract_fields(doc, ['naviera', 'pol', 'pod', 'etd', 'eta', 'fecha', 'semana']),
+            }
+        
+        # Una sola nave - extracción normal con campos requeridos
+        data = {
+            'raw_text': doc.text,
+            'documento': doc,
+            'multiple_naves': False,
+            'plantilla': self._template_name(doc),
+        }
+        data.update(self.extract_fields(doc, [
+            'naviera', 'nave', 'imo', 'pol', 'pod', 'etd', 'eta', 'fecha', 'fecha_salida', 'fecha_llegada',
+            'semana', 'puerto_origen', 'puerto_destino', 'numero_contenedor', 'numero_booking',
+        ]))
+        return data
+    
+    def extract_fields(self, source: Union[str, OCRDocument], fields: List[str]) -> Dict[str, object]:
+        """
+        Extrae sólo los campos pedidos.
+        
+        Cada campo se calcula la primera vez que se pide y queda memoizado en el
+        documento; los campos que comparten un resultado intermedio (por ejemplo
+        ``etd`` y ``fecha_salida``, o ``naves`` y ``pol``) lo reutilizan.
         
-        # Extraer datos básicos siempre requeridos
-        naviera = self._extract_shipping_line(raw_text)
-        nave = self._extract_vessel(raw_text)
-        pol = self._extract_pol(raw_text)  # Solo San Antonio o Valparaíso
-        pod = self._extract_pod(raw_text)  # Cualquier otro destino
+        Args:
+            source: Ruta a una imagen o documento OCR ya extraído.
+            fields: Nombres de campos (claves de ``FIELDS``).
+            
+        Returns:
+            Diccionario {campo: valor} en el orden pedido.
+            
+        Raises:
+            ValueError: Si algún campo no existe.
+        """
+        unknown = [field for field in fields if field not in self.FIELDS]
+        if unknown:
+            raise ValueError(f"Campos desconocidos: {', '.join(unknown)}. "
+                             f"Disponibles: {', '.join(self.FIELDS)}")
         
-        # ETD y ETA - siempre intentar extraer con máxima prioridad
-        # Intentar múltiples métodos para asegurar que se encuentren
-        etd = self._extract_etd(raw_text)  # Fecha de salida
+        doc = source if isinstance(source, OCRDocument) else self.extract_document(source)
+        return {field: self._field(doc, field) for field in fields}
+    
+    def _field(self, doc: OCRDocument, field: str):
+        """Un campo: primero con la plantilla de la naviera, si hay; si no, con el extractor genérico."""
+        template = self._match_template(doc)
+        if template is not None:
+            value = template.extract(doc, field, self.gazetteer, load_port_index())
+            if value:
+                return value
+        return getattr(self, self.FIELDS[field])(doc)
+    
+    def _template_name(self, doc: OCRDocument) -> Optional[str]:
+        """Nombre de la plantilla reconocida (None = extracción genérica)."""
+        template = self._match_template(doc)
+        return template.name if template else None
+    
+    @_per_document
+    def _match_template(self, doc: OCRDocument) -> Optional[CarrierTemplate]:
+        """Plantilla de naviera del documento según la huella de su encabezado."""
+        if not self.templates:
+            return None
+        template = fingerprint(doc, self.gazetteer, self.templates)
+        if template is not None:
+            logger.info(f"Formato reconocido: plantilla {template.name}")
+        return template
+    
+    @_per_document
+    def _resolve_etd(self, doc: OCRDocument) -> Optional[str]:
+        """ETD con todos los métodos de respaldo."""
+        # ETD y ETA - intentar múltiples métodos para asegurar que se encuentren
+        etd = self._extract_etd(doc)  # Fecha de salida
         if not etd:
-            etd = self._extract_departure_date(raw_text)
+            etd = self._extract_departure_date(doc)
         if not etd:
             # Buscar cualquier fecha en el texto como último recurso
-            etd = self._extract_any_date_near_keyword(raw_text, ['salida', 'departure', 'etd', 'despacho'])
-        
-        eta = self._extract_eta(raw_text)  # Fecha de llegada
+            etd = self._extract_any_date_near_keyword(doc, patterns.keywords('salida'))
+        return etd
+    
+    @_per_document
+    def _resolve_eta(self, doc: OCRDocument) -> Optional[str]:
+        """ETA con todos los métodos de respaldo."""
+        eta = self._extract_eta(doc)  # Fecha de llegada
         if not eta:
-            eta = self._extract_arrival_date(raw_text)
+            eta = self._extract_arrival_date(doc)
         if not eta:
             # Buscar cualquier fecha en el texto como último recurso
-            eta = self._extract_any_date_near_keyword(raw_text, ['llegada', 'arrival', 'eta', 'arribo'])
+            eta = self._extract_any_date_near_keyword(doc, patterns.keywords('llegada'))
+        return eta
+    
+    @_per_document
+    def _extract_document_date(self, doc: OCRDocument) -> Optional[str]:
+        """Primera fecha del documento completo."""
+        return self._extract_date(doc.text)
+    
+    @_per_document
+    def _extract_vessels_data(self, doc: OCRDocument) -> List[dict]:
+        """
+        Datos de cada nave cuando el documento tiene varias.
         
-        # Detectar múltiples naves
-        naves_encontradas = self._extract_all_vessels(raw_text)
+        Returns:
+            Una entrada por nave, o lista vacía si el documento tiene una sola nave.
+        """
+        # Si el documento es una tabla de naves, leerla directamente por columnas
+        tabla = self._extract_table(doc)
+        if tabla is not None and len(tabla.rows) > 1:
+            naves_encontradas = tabla.rows
+        else:
+            tabla = None
+            # Detectar múltiples naves por palabras clave alrededor de cada nombre
+            naves_encontradas = self._extract_all_vessels(doc)
         
-        # Si hay múltiples naves, extraer información de cada una
-        if len(naves_encontradas) > 1:
-            data = {
-                'raw_text': raw_text,
-                'multiple_naves': True,
-                'total_naves': len(naves_encontradas),
-                'naves': [],
-                # Datos generales siempre requeridos
-                'naviera': naviera,
-                'pol': pol,
-                'pod': pod,
-                'etd': etd,
-                'eta': eta,
-                'fecha': self._extract_date(raw_text),
-                'semana': self._extract_week(raw_text),
-            }
-            
-            # Extraer información para cada nave
-            for nave_info in naves_encontradas:
-                nave_data = self._extract_data_for_vessel(raw_text, nave_info)
+        if len(naves_encontradas) <= 1:
+            return []
+        
+        naviera = self._field(doc, 'naviera')
+        pol = self._field(doc, 'pol')  # Solo San Antonio o Valparaíso
+        pod = self._field(doc, 'pod')  # Cualquier otro destino
+        etd = self._field(doc, 'etd')
+        eta = self._field(doc, 'eta')
+        
+        naves = []
+        for nave_info in naves_encontradas:
+            if tabla is not None:
+                nave_data = self._vessel_data_from_row(nave_info)
+                # En una tabla, los puertos de la fila mandan sobre los generales
+                nave_data['naviera'] = naviera
+                nave_data['pol'] = nave_data.get('puerto_origen') or pol
+                nave_data['pod'] = nave_data.get('puerto_destino') or pod
+            else:
+                nave_data = self._extract_data_for_vessel(doc, nave_info)
                 # Asegurar que cada nave tenga los campos requeridos
                 nave_data['naviera'] = naviera or nave_data.get('naviera')
-                nave_data['pol'] = pol or self._extract_pol_from_context(raw_text, nave_info)
-                nave_data['pod'] = pod or self._extract_pod_from_context(raw_text, nave_info)
-                nave_data['etd'] = nave_data.get('fecha_salida') or etd
-                nave_data['eta'] = nave_data.get('fecha_llegada') or eta
-                data['naves'].append(nave_data)
-            
-        else:
-            # Una sola nave - extracción normal con campos requeridos
-            data = {
-                'raw_text': raw_text,
-                'multiple_naves': False,
-                'naviera': naviera,
-                'nave': nave,
-                'pol': pol,
-                'pod': pod,
-                'etd': etd,
-                'eta': eta,
-                'fecha': self._extract_date(raw_text),
-                'fecha_salida': etd,
-                'fecha_llegada': eta,
-                'semana': self._extract_week(raw_text),
-                'puerto_origen': pol,  # POL es el puerto de origen
-                'puerto_destino': pod,  # POD es el puerto de destino
-                'numero_contenedor': self._extract_container_number(raw_text),
-                'numero_booking': self._extract_booking_number(raw_text),
-            }
-        
-        return data
+                nave_data['pol'] = pol or self._extract_pol_from_context(doc, nave_info)
+                nave_data['pod'] = pod or self._extract_pod_from_context(doc, nave_info)
+            nave_data['etd'] = nave_data.get('fecha_salida') or etd
+            nave_data['eta'] = nave_data.get('fecha_llegada') or eta
+            naves.append(nave_data)
+        return naves
     
     def _extract_date(self, text: str) -> Optional[str]:
         """Extrae fechas del texto usando patrones comunes."""
-        # Patrones comunes de fechas en itinerarios (más flexibles)
-        date_patterns = [
-            r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}',  # DD/MM/YYYY o DD-MM-YYYY
-            r'\d{1,2}\s+(enero|febrero|marzo|abril|mayo|junio|julio|agosto|septiembre|octubre|noviembre|diciembre)\s+\d{4}',
-            r'\d{4}[/-]\d{1,2}[/-]\d{1,2}',  # YYYY/MM/DD
-            r'\d{1,2}[/-]\d{1,2}[/-]\d{2}',  # DD/MM/YY
-            r'\d{1,2}\.\d{1,2}\.\d{2,4}',  # DD.MM.YYYY
-            r'\d{1,2}\s+\d{1,2}\s+\d{2,4}',  # DD MM YYYY
-        ]
-        
-        for pattern in date_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                fecha = match.group(0).strip()
-                if fecha:
-                    return fecha
-        
-        return None
+        return patterns.get('fecha').extract(text)
     
-    def _extract_any_date_near_keyword(self, text: str, keywords: list) -> Optional[str]:
+    def _extract_any_date_near_keyword(self, doc: OCRDocument, keywords: list) -> Optional[str]:
         """
         Busca cualquier fecha cerca de palabras clave.
         Útil como último recurso para encontrar fechas.
         """
-        lines = text.split('\n')
-        for i, line in enumerate(lines):
-            line_lower = line.lower()
+        lines_lower = doc.lines_lower
+        for i, line_lower in enumerate(lines_lower):
             for keyword in keywords:
                 if keyword in line_lower:
                     # Buscar fecha en esta línea
-                    fecha = self._extract_date(line)
+                    fecha = self._date_in_line(doc, i)
                     if fecha:
                         return fecha
                     # Buscar en líneas adyacentes (2 líneas antes y después)
                     for offset in [-2, -1, 1, 2]:
                         idx = i + offset
-                        if 0 <= idx < len(lines):
-                            fecha = self._extract_date(lines[idx])
+                        if 0 <= idx < len(lines_lower):
+                            fecha = self._date_in_line(doc, idx)
                             if fecha:
                                 return fecha
         return None
     
-    def _extract_vessel(self, text: str) -> Optional[str]:
+    def _date_in_line(self, doc: OCRDocument, index: int) -> Optional[str]:
+        """Primera fecha de una línea del documento (memoizada: las búsquedas de ETD/ETA la repiten)."""
+        return doc.cached(('fecha_linea', index), lambda: self._extract_date(doc.lines[index]))
+    
+    @_per_document
+    def _extract_vessel(self, doc: OCRDocument) -> Optional[str]:
         """Extrae el nombre de la nave del texto."""
         # Buscar palabras clave relacionadas con naves
-        vessel_keywords = ['nave', 'vessel', 'barco', 'ship', 'buque']
+        vessel_keywords = patterns.keywords('nave')
         
-        lines = text.split('\n')
-        for line in lines:
-            line_lower = line.lower()
+        for line, line_lower in zip(doc.lines, doc.lines_lower):
             for keyword in vessel_keywords:
                 if keyword in line_lower:
                     # Intentar extraer el nombre que sigue a la palabra clave
@@ -232,9 +751,9 @@ class OCRProcessor:
                         
                         for word in words:
                             # Detener si encontramos números que parecen fechas o códigos
-                            if re.match(r'^\d{1,2}[/-]\d', word):  # Fecha
+                            if patterns.WORD_DATE.match(word):  # Fecha
                                 break
-                            if re.match(r'^V\.?\d', word):  # Viaje V.123
+                            if patterns.WORD_VOYAGE.match(word):  # Viaje V.123
                                 break
                             if len(word) > 20:  # Palabra muy larga, probablemente no es parte del nombre
                                 break
@@ -248,34 +767,20 @@ class OCRProcessor:
         
         return None
     
-    def _extract_all_vessels(self, text: str) -> list:
+    @_per_document
+    def _extract_all_vessels(self, doc: OCRDocument) -> list:
         """Extrae todas las naves encontradas en el texto, evitando confundir con puertos."""
         naves = []
-        vessel_keywords = ['nave', 'vessel', 'barco', 'ship', 'buque']
-        
-        # Lista de palabras que indican que es un puerto, no una nave
-        port_indicators = [
-            'puerto', 'port', 'terminal', 'centra', 'san antonio', 'valparaíso', 
-            'iquique', 'antofagasta', 'arica', 'callao', 'guayaquil', 'buenos aires',
-            'montevideo', 'santos', 'asia', 'central', 'centro'
-        ]
+        seen = set()  # Nombres ya agregados
+        vessel_keywords = patterns.keywords('nave')
         
         def is_likely_port(name: str) -> bool:
             """Verifica si un nombre es probablemente un puerto."""
-            name_lower = name.lower()
-            # Si contiene indicadores de puerto
-            for indicator in port_indicators:
-                if indicator in name_lower:
-                    return True
-            # Si empieza con "Puerto" o "Port"
-            if name_lower.startswith('puerto ') or name_lower.startswith('port '):
-                return True
-            return False
+            # Si contiene un puerto conocido o una palabra que indica puerto
+            # ("Puerto ...", "Port ...", "Terminal ...")
+            return self.gazetteer.contains(name, ('puerto', 'indicador'))
         
-        lines = text.split('\n')
-        
-        for i, line in enumerate(lines):
-            line_lower = line.lower()
+        for i, (line, line_lower) in enumerate(zip(doc.lines, doc.lines_lower)):
             for keyword in vessel_keywords:
                 if keyword in line_lower:
                     # Extraer nombre de la nave
@@ -287,9 +792,9 @@ class OCRProcessor:
                         
                         for word in words:
                             # Detener si encontramos números que parecen fechas o códigos
-                            if re.match(r'^\d{1,2}[/-]\d', word):  # Fecha
+                            if patterns.WORD_DATE.match(word):  # Fecha
                                 break
-                            if re.match(r'^V\.?\d', word):  # Viaje V.123
+                            if patterns.WORD_VOYAGE.match(word):  # Viaje V.123
                                 break
                             if len(word) > 20:  # Palabra muy larga
                                 break
@@ -303,7 +808,8 @@ class OCRProcessor:
                         # Filtrar puertos y validar
                         if vessel_name_str and len(vessel_name_str.strip()) > 2:
                             if not is_likely_port(vessel_name_str):
-                                if vessel_name_str not in [n['nombre'] for n in naves]:
+                                if vessel_name_str not in seen:
+                                    seen.add(vessel_name_str)
                                     naves.append({
                                         'nombre': vessel_name_str,
                                         'linea': i,
@@ -312,441 +818,252 @@ class OCRProcessor:
         
         # También buscar patrones de nombres de naves comunes
         # Patrón: palabras en mayúsculas que podrían ser nombres de naves
-        vessel_patterns = [
-            r'\b([A-Z][A-Za-z\s]{2,30})\s+(?:V\.|VOYAGE|VIAJE|V\s*\d)',  # Nombre seguido de V. o VOYAGE
-            r'(?:NAVE|VESSEL|SHIP)[:\s]+([A-Z][A-Za-z\s]{2,30})',  # Después de NAVE/VESSEL
-        ]
-        
-        for pattern in vessel_patterns:
-            matches = re.finditer(pattern, text)
-            for match in matches:
-                vessel_name = match.group(1).strip()
-                # Limpiar el nombre (remover espacios extra, limitar longitud)
-                vessel_name = ' '.join(vessel_name.split()[:5])  # Máximo 5 palabras
-                
-                # Validar que no sea un puerto y que tenga letras
-                if (len(vessel_name) > 2 and 
-                    re.search(r'[A-Za-z]', vessel_name) and 
-                    not is_likely_port(vessel_name) and
-                    vessel_name not in [n['nombre'] for n in naves]):
-                    naves.append({
-                        'nombre': vessel_name,
-                        'linea': text[:match.start()].count('\n'),
-                        'contexto': match.group(0)
-                    })
+        vessel_rules = patterns.get('nave')
+        for match in vessel_rules.finditer(doc.text):
+            # Limpiar el nombre (remover espacios extra, máximo 5 palabras)
+            vessel_name = vessel_rules.process(match.group(1)) or ''
+            
+            # Validar que no sea un puerto y que tenga letras
+            if (len(vessel_name) > 2 and 
+                patterns.HAS_LETTER.search(vessel_name) and 
+                not is_likely_port(vessel_name) and
+                vessel_name not in seen):
+                seen.add(vessel_name)
+                naves.append({
+                    'nombre': vessel_name,
+                    'linea': doc.line_of(match.start()),
+                    'contexto': match.group(0)
+                })
         
         return naves
     
-    def _extract_data_for_vessel(self, text: str, vessel_info: dict) -> dict:
+    def _extract_data_for_vessel(self, doc: OCRDocument, vessel_info: dict) -> dict:
         """Extrae información específica para una nave."""
         nave_nombre = vessel_info['nombre']
         linea_nave = vessel_info['linea']
         
-        # Obtener contexto alrededor de la nave (10 líneas antes y después)
-        lines = text.split('\n')
-        inicio_contexto = max(0, linea_nave - 10)
-        fin_contexto = min(len(lines), linea_nave + 20)
-        contexto_texto = '\n'.join(lines[inicio_contexto:fin_contexto])
+        # Obtener contexto alrededor de la nave (10 líneas antes y 20 después)
+        contexto = doc.slice_lines(linea_nave - 10, linea_nave + 20)
         
         # Extraer datos del contexto de esta nave
         nave_data = {
             'nombre': nave_nombre,
-            'fecha': self._extract_date(contexto_texto),
-            'fecha_salida': self._extract_departure_date(contexto_texto),
-            'fecha_llegada': self._extract_arrival_date(contexto_texto),
-            'puerto_origen': self._extract_origin_port(contexto_texto),
-            'puerto_destino': self._extract_destination_port(contexto_texto),
-            'numero_viaje': self._extract_voyage_number(contexto_texto),
-            'numero_contenedor': self._extract_container_number(contexto_texto),
-            'numero_booking': self._extract_booking_number(contexto_texto),
+            'fecha': self._extract_date(contexto.text),
+            'fecha_salida': self._extract_departure_date(contexto),
+            'fecha_llegada': self._extract_arrival_date(contexto),
+            'puerto_origen': self._extract_origin_port(contexto),
+            'puerto_destino': self._extract_destination_port(contexto),
+            'numero_viaje': self._extract_voyage_number(contexto),
+            'numero_contenedor': self._extract_container_number(contexto),
+            'numero_booking': self._extract_booking_number(contexto),
         }
         
         return nave_data
     
-    def _extract_voyage_number(self, text: str) -> Optional[str]:
-        """Extrae número de viaje del texto con múltiples variantes."""
-        patterns = [
-            # Patrones en español
-            r'viaje[:\s]+([A-Z0-9-]+)',
-            r'n[úu]mero\s+de\s+viaje[:\s]+([A-Z0-9-]+)',
-            r'viaje\s+n[úu]mero[:\s]+([A-Z0-9-]+)',
-            # Patrones en inglés
-            r'voyage[:\s]+([A-Z0-9-]+)',
-            r'voyage\s+number[:\s]+([A-Z0-9-]+)',
-            r'voyage\s+no[.:\s]+([A-Z0-9-]+)',
-            r'voyage\s+#[:\s]*([A-Z0-9-]+)',
-            r'voy\s+number[:\s]+([A-Z0-9-]+)',
-            r'voy\s+no[.:\s]+([A-Z0-9-]+)',
-            # Patrones abreviados
-            r'V\.?\s*([A-Z0-9-]+)',
-            r'VOY[:\s]*([A-Z0-9-]+)',
-            r'VN[:\s]+([A-Z0-9-]+)',  # Voyage Number
-            r'V\.?\s*N[úu]?[.:\s]*([A-Z0-9-]+)',  # V.N. o V N
-            # Patrones con formato común
-            r'V[OY]?[:\s]*([A-Z]{1,3}\d{1,4})',  # V123, VOY123, V.123
-            r'([A-Z]{1,3}\d{1,4})\s*(?:VOYAGE|VIAJE)',  # 123 VOYAGE
-            # Patrones con guiones
-            r'V[OY]?[:\s]*([A-Z0-9-]{3,15})',  # V-123, VOY-ABC
-            # Buscar después de palabras clave
-            r'(?:voyage|viaje|voy)[:\s]+(?:number|n[úu]mero|no|#)?[:\s]*([A-Z0-9-]{2,15})',
-        ]
-        
-        for pattern in patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                voyage_num = match.group(1).strip()
-                # Validar que tenga al menos un carácter alfanumérico
-                if voyage_num and len(voyage_num) >= 2:
-                    # Limpiar caracteres no deseados al inicio/final
-                    voyage_num = voyage_num.strip('.,;:')
-                    return voyage_num
+    @_per_document
+    def _extract_table(self, doc: OCRDocument) -> Optional[TableLayout]:
+        """Reconstruye la tabla de naves a partir de las cajas (None si no hay tabla)."""
+        return TableLayout.from_document(doc)
+    
+    def _vessel_data_from_row(self, row: Dict[str, str]) -> dict:
+        """
+        Convierte una fila de la tabla de naves en los datos de la nave.
         
-        return None
+        Devuelve las mismas claves que ``_extract_data_for_vessel``.
+        """
+        fecha_salida = row.get('fecha_salida')
+        fecha_llegada = row.get('fecha_llegada')
+        return {
+            'nombre': row.get('nombre'),
+            'fecha': self._extract_date(fecha_salida) if fecha_salida else None,
+            'fecha_salida': (self._extract_date(fecha_salida) or fecha_salida) if fecha_salida else None,
+            'fecha_llegada': (self._extract_date(fecha_llegada) or fecha_llegada) if fecha_llegada else None,
+            'puerto_origen': row.get('puerto_origen'),
+            'puerto_destino': row.get('puerto_destino'),
+            'numero_viaje': row.get('numero_viaje'),
+            'numero_contenedor': None,
+            'numero_booking': None,
+        }
+    
+    @_per_document
+    def _extract_voyage_number(self, doc: OCRDocument) -> Optional[str]:
+        """Extrae número de viaje del texto con múltiples variantes."""
+        return patterns.get('numero_viaje').extract(doc)
     
-    def _extract_week(self, text: str) -> Optional[str]:
+    @_per_document
+    def _extract_week(self, doc: OCRDocument) -> Optional[str]:
         """Extrae información de semana del texto."""
-        # Buscar patrones de semana
-        week_patterns = [
-            r'semana\s+(\d+)',
-            r'week\s+(\d+)',
-            r'W(\d+)',
-            r'Sem\.?\s*(\d+)',
-        ]
-        
-        for pattern in week_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return match.group(1) if match.groups() else match.group(0)
-        
-        return None
+        return patterns.get('semana').extract(doc)
     
-    def _extract_departure_date(self, text: str) -> Optional[str]:
+    @_per_document
+    def _extract_departure_date(self, doc: OCRDocument) -> Optional[str]:
         """Extrae fecha de salida."""
-        patterns = [
-            r'salida[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            r'departure[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            r'ETD[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            r'despacho[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return match.group(1)
-        
-        return None
+        return patterns.get('fecha_salida').extract(doc)
     
-    def _extract_arrival_date(self, text: str) -> Optional[str]:
+    @_per_document
+    def _extract_arrival_date(self, doc: OCRDocument) -> Optional[str]:
         """Extrae fecha de llegada."""
-        patterns = [
-            r'llegada[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            r'arrival[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            r'ETA[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            r'arribo[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return match.group(1)
-        
-        return None
+        return patterns.get('fecha_llegada').extract(doc)
     
-    def _extract_origin_port(self, text: str) -> Optional[str]:
+    @_per_document
+    def _extract_origin_port(self, doc: OCRDocument) -> Optional[str]:
         """Extrae puerto de origen."""
-        patterns = [
-            r'origen[:\s]+([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s]+)',
-            r'origin[:\s]+([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s]+)',
-            r'desde[:\s]+([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s]+)',
-            r'from[:\s]+([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s]+)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                port = match.group(1).strip()
-                # Limitar a las primeras palabras razonables
-                port_words = port.split()[:3]
-                return ' '.join(port_words)
-        
-        return None
+        return patterns.get('puerto_origen').extract(doc)
     
-    def _extract_destination_port(self, text: str) -> Optional[str]:
+    @_per_document
+    def _extract_destination_port(self, doc: OCRDocument) -> Optional[str]:
         """Extrae puerto de destino."""
-        patterns = [
-            r'destino[:\s]+([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s]+)',
-            r'destination[:\s]+([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s]+)',
-            r'hacia[:\s]+([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s]+)',
-            r'to[:\s]+([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s]+)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                port = match.group(1).strip()
-                port_words = port.split()[:3]
-                return ' '.join(port_words)
-        
-        return None
+        return patterns.get('puerto_destino').extract(doc)
     
-    def _extract_container_number(self, text: str) -> Optional[str]:
+    @_per_document
+    def _extract_container_number(self, doc: OCRDocument) -> Optional[str]:
         """Extrae número de contenedor."""
         # Formato estándar: 4 letras + 7 dígitos (ej: ABCD1234567)
-        patterns = [
-            r'contenedor[:\s]*([A-Z]{4}\d{7})',
-            r'container[:\s]*([A-Z]{4}\d{7})',
-            r'([A-Z]{4}\d{7})',  # Formato estándar ISO
-            r'cont[:\s]*([A-Z]{4}\d{7})',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text)
-            if match:
-                return match.group(1)
-        
-        return None
+        return patterns.get('numero_contenedor').extract(doc)
     
-    def _extract_booking_number(self, text: str) -> Optional[str]:
+    @_per_document
+    def _extract_booking_number(self, doc: OCRDocument) -> Optional[str]:
         """Extrae número de booking."""
-        patterns = [
-            r'booking[:\s]+([A-Z0-9-]+)',
-            r'reserva[:\s]+([A-Z0-9-]+)',
-            r'B/L[:\s]+([A-Z0-9-]+)',
-            r'BL[:\s]+([A-Z0-9-]+)',
-            r'BKG[:\s]+([A-Z0-9-]+)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return match.group(1).strip()
-        
-        return None
+        return patterns.get('numero_booking').extract(doc)
     
-    def _extract_shipping_line(self, text: str) -> Optional[str]:
+    @_per_document
+    def _extract_imo(self, doc: OCRDocument) -> Optional[str]:
+        """Extrae el número IMO de la nave (solo si el dígito verificador es válido)."""
+        return patterns.get('imo').extract(doc)
+    
+    @_per_document
+    def _extract_shipping_line(self, doc: OCRDocument) -> Optional[str]:
         """Extrae nombre de la naviera."""
-        shipping_lines = [
-            'maersk', 'msc', 'cma cgm', 'cosco', 'evergreen', 'hapag-lloyd',
-            'yang ming', 'oocl', 'hyundai', 'pil', 'zim', 'hamburg sud',
-            'mol', 'nyk', 'k line', 'apl', 'cma', 'cma cgm'
-        ]
-        
-        text_lower = text.lower()
-        for line in shipping_lines:
-            if line in text_lower:
-                return line.upper()
-        
-        return None
+        carrier = self.gazetteer.first(doc, 'naviera')
+        return carrier.name if carrier else None
     
-    def _extract_pol(self, text: str) -> Optional[str]:
+    @_per_document
+    def _extract_pol(self, doc: OCRDocument) -> Optional[str]:
         """
         Extrae POL (Point of Loading) - solo San Antonio o Valparaíso.
         
         Args:
-            text: Texto completo extraído.
+            doc: Documento OCR.
             
         Returns:
             'San Antonio' o 'Valparaíso' si se encuentra, None en caso contrario.
         """
-        text_lower = text.lower()
-        
-        # Buscar San Antonio
-        if 'san antonio' in text_lower:
-            return 'San Antonio'
-        
-        # Buscar Valparaíso (con diferentes variantes)
-        if 'valparaíso' in text_lower or 'valparaiso' in text_lower:
-            return 'Valparaíso'
+        # Buscar San Antonio y Valparaíso (con sus variantes) en el diccionario
+        port = self.gazetteer.first(doc, 'puerto', lambda entry: entry.pol)
+        if port:
+            return port.name
         
         # Buscar patrones POL
-        pol_patterns = [
-            r'POL[:\s]+(?:San\s+Antonio|Valpara[ií]so)',
-            r'Point\s+of\s+Loading[:\s]+(?:San\s+Antonio|Valpara[ií]so)',
-            r'Puerto\s+de\s+Carga[:\s]+(?:San\s+Antonio|Valpara[ií]so)',
-        ]
-        
-        for pattern in pol_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                pol_text = match.group(0)
-                if 'san antonio' in pol_text.lower():
-                    return 'San Antonio'
-                elif 'valpara' in pol_text.lower():
-                    return 'Valparaíso'
+        match = patterns.get('pol').first(doc)
+        if match:
+            pol_text = match.text.lower()
+            if 'san antonio' in pol_text:
+                return 'San Antonio'
+            elif 'valpara' in pol_text:
+                return 'Valparaíso'
         
         return None
     
-    def _extract_pod(self, text: str) -> Optional[str]:
+    @_per_document
+    def _extract_pod(self, doc: OCRDocument) -> Optional[str]:
         """
         Extrae POD (Point of Discharge) - cualquier puerto de destino.
         
         Args:
-            text: Texto completo extraído.
+            doc: Documento OCR.
             
         Returns:
             Nombre del puerto de destino (excluyendo San Antonio y Valparaíso).
         """
-        # Buscar patrones POD
-        pod_patterns = [
-            r'POD[:\s]+([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s]+)',
-            r'Point\s+of\s+Discharge[:\s]+([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s]+)',
-            r'Puerto\s+de\s+Descarga[:\s]+([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s]+)',
-            r'destino[:\s]+([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s]+)',
-            r'destination[:\s]+([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s]+)',
-            r'to[:\s]+([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s]+)',
-        ]
-        
-        for pattern in pod_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                pod = match.group(1).strip()
-                pod_words = pod.split()[:3]
-                pod_clean = ' '.join(pod_words).title()
-                
-                # Excluir San Antonio y Valparaíso (esos son POL)
-                pod_lower = pod_clean.lower()
-                if 'san antonio' not in pod_lower and 'valpara' not in pod_lower:
-                    return pod_clean
+        # Buscar patrones POD (excluyendo San Antonio y Valparaíso, que son POL)
+        pod = patterns.get('pod').extract(doc)
+        if pod:
+            return pod
         
         # Si no se encuentra con patrones, buscar puertos comunes excluyendo POL
-        common_pods = [
-            'callao', 'guayaquil', 'buenos aires', 'montevideo', 'santos',
-            'iquique', 'antofagasta', 'arica', 'centra terminal', 'puerto centra',
-            'asia central'
-        ]
-        
-        text_lower = text.lower()
-        for pod in common_pods:
-            if pod in text_lower:
-                pod_clean = pod.title()
-                # Excluir San Antonio y Valparaíso
-                if 'san antonio' not in pod_clean.lower() and 'valpara' not in pod_clean.lower():
-                    return pod_clean
-        
-        return None
+        port = self.gazetteer.first(doc, 'puerto', lambda entry: not entry.pol)
+        return port.name if port else None
     
-    def _extract_etd(self, text: str) -> Optional[str]:
+    @_per_document
+    def _extract_etd(self, doc: OCRDocument) -> Optional[str]:
         """
         Extrae ETD (Estimated Time of Departure) - fecha de salida.
         Busca múltiples variantes y formatos.
         
         Args:
-            text: Texto completo extraído.
+            doc: Documento OCR.
             
         Returns:
             Fecha de salida en formato encontrado.
         """
         # Buscar ETD específicamente con múltiples variantes
-        etd_patterns = [
-            r'ETD[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            r'ETD[:\s]+(\d{1,2}\s+\w+\s+\d{4})',
-            r'ETD[:\s]+(\d{4}[/-]\d{1,2}[/-]\d{1,2})',
-            r'ETD\s*[:\s]*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            r'Estimated\s+Time\s+of\s+Departure[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            r'Fecha\s+de\s+Salida[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            r'Salida[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            r'Departure[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            r'Despacho[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            # Buscar fechas cerca de palabras clave ETD
-            r'(?:ETD|Salida|Departure|Despacho)[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-        ]
-        
-        for pattern in etd_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                fecha = match.group(1).strip()
-                if fecha:
-                    return fecha
+        fecha = patterns.get('etd').extract(doc)
+        if fecha:
+            return fecha
         
         # Si no se encuentra ETD explícito, usar fecha de salida genérica
-        fecha_salida = self._extract_departure_date(text)
+        fecha_salida = self._extract_departure_date(doc)
         if fecha_salida:
             return fecha_salida
         
         # Como último recurso, buscar cualquier fecha cerca de palabras clave de salida
-        salida_keywords = ['salida', 'departure', 'etd', 'despacho']
-        lines = text.split('\n')
-        for i, line in enumerate(lines):
-            line_lower = line.lower()
+        salida_keywords = patterns.keywords('salida')
+        lines_lower = doc.lines_lower
+        for i, line_lower in enumerate(lines_lower):
             for keyword in salida_keywords:
                 if keyword in line_lower:
                     # Buscar fecha en esta línea o la siguiente
-                    fecha = self._extract_date(line)
-                    if not fecha and i + 1 < len(lines):
-                        fecha = self._extract_date(lines[i + 1])
+                    fecha = self._date_in_line(doc, i)
+                    if not fecha and i + 1 < len(lines_lower):
+                        fecha = self._date_in_line(doc, i + 1)
                     if fecha:
                         return fecha
         
         return None
     
-    def _extract_eta(self, text: str) -> Optional[str]:
+    @_per_document
+    def _extract_eta(self, doc: OCRDocument) -> Optional[str]:
         """
         Extrae ETA (Estimated Time of Arrival) - fecha de llegada.
         Busca múltiples variantes y formatos.
         
         Args:
-            text: Texto completo extraído.
+            doc: Documento OCR.
             
         Returns:
             Fecha de llegada en formato encontrado.
         """
         # Buscar ETA específicamente con múltiples variantes
-        eta_patterns = [
-            r'ETA[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            r'ETA[:\s]+(\d{1,2}\s+\w+\s+\d{4})',
-            r'ETA[:\s]+(\d{4}[/-]\d{1,2}[/-]\d{1,2})',
-            r'ETA\s*[:\s]*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            r'Estimated\s+Time\s+of\s+Arrival[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            r'Fecha\s+de\s+Llegada[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            r'Llegada[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            r'Arrival[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            r'Arribo[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            # Buscar fechas cerca de palabras clave ETA
-            r'(?:ETA|Llegada|Arrival|Arribo)[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-        ]
-        
-        for pattern in eta_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                fecha = match.group(1).strip()
-                if fecha:
-                    return fecha
+        fecha = patterns.get('eta').extract(doc)
+        if fecha:
+            return fecha
         
         # Si no se encuentra ETA explícito, usar fecha de llegada genérica
-        fecha_llegada = self._extract_arrival_date(text)
+        fecha_llegada = self._extract_arrival_date(doc)
         if fecha_llegada:
             return fecha_llegada
         
         # Como último recurso, buscar cualquier fecha cerca de palabras clave de llegada
-        llegada_keywords = ['llegada', 'arrival', 'eta', 'arribo']
-        lines = text.split('\n')
-        for i, line in enumerate(lines):
-            line_lower = line.lower()
+        llegada_keywords = patterns.keywords('llegada')
+        lines_lower = doc.lines_lower
+        for i, line_lower in enumerate(lines_lower):
             for keyword in llegada_keywords:
                 if keyword in line_lower:
                     # Buscar fecha en esta línea o la siguiente
-                    fecha = self._extract_date(line)
-                    if not fecha and i + 1 < len(lines):
-                        fecha = self._extract_date(lines[i + 1])
+                    fecha = self._date_in_line(doc, i)
+                    if not fecha and i + 1 < len(lines_lower):
+                        fecha = self._date_in_line(doc, i + 1)
                     if fecha:
                         return fecha
         
         return None
     
-    def _extract_pol_from_context(self, text: str, vessel_info: dict) -> Optional[str]:
+    def _extract_pol_from_context(self, doc: OCRDocument, vessel_info: dict) -> Optional[str]:
         """Extrae POL del contexto de una nave específica."""
         linea_nave = vessel_info['linea']
-        lines = text.split('\n')
-        inicio_contexto = max(0, linea_nave - 5)
-        fin_contexto = min(len(lines), linea_nave + 10)
-        contexto_texto = '\n'.join(lines[inicio_contexto:fin_contexto])
-        return self._extract_pol(contexto_texto)
+        return self._extract_pol(doc.slice_lines(linea_nave - 5, linea_nave + 10))
     
-    def _extract_pod_from_context(self, text: str, vessel_info: dict) -> Optional[str]:
+    def _extract_pod_from_context(self, doc: OCRDocument, vessel_info: dict) -> Optional[str]:
         """Extrae POD del contexto de una nave específica."""
         linea_nave = vessel_info['linea']
-        lines = text.split('\n')
-        inicio_contexto = max(0, linea_nave - 5)
-        fin_contexto = min(len(lines), linea_nave + 10)
-        contexto_texto = '\n'.join(lines[inicio_contexto:fin_contexto])
-        return self._extract_pod(contexto_texto)
\ No newline at end of file
+        return self._extract_pod(doc.slice_lines(linea_nave - 5, linea_nave + 10))
\ No newline at end of file
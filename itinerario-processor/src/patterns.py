@@ -0,0 +1,368 @@
+"""
+Reglas de extracción de campos compiladas desde paquetes de reglas en JSON.
+
+Los patrones, palabras clave, prioridades y el postproceso de cada campo se
+definen en ``data/reglas/*.json``. Al cargarlos se validan y se compilan una
+sola vez. El valor de un campo se resuelve con la regla de prioridad (la
+primera regla que encuentre algo gana; dentro de ella, la primera coincidencia
+que el postproceso no descarte) y queda memoizado en el documento.
+
+Las reglas de un campo se prueban de a una, en orden: la primera que encuentra
+algo corta la búsqueda y el motor de ``re`` aprovecha las optimizaciones de
+prefijo de cada patrón. ``benchmark_reglas.py`` compara este recorrido con un
+escáner combinado de una sola pasada.
+
+Los paquetes se vuelven a cargar solos cuando cambia alguno de los archivos,
+sin reiniciar el servidor.
+"""
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+import logging
+
+from .ocr_document import OCRDocument
+from .vessel_registry import valid_imo
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIR = Path(__file__).resolve().parent.parent / 'data' / 'reglas'
+
+# Patrones auxiliares de palabras sueltas
+WORD_DATE = re.compile(r'^\d{1,2}[/-]\d')  # Inicio de fecha
+WORD_VOYAGE = re.compile(r'^V\.?\d')  # Viaje V.123
+HAS_LETTER = re.compile(r'[A-Za-z]')
+
+
+def _first_words(value: str, count: str) -> str:
+    return ' '.join(value.split()[:int(count)])
+
+
+def _min_length(value: str, length: str) -> Optional[str]:
+    return value if len(value) >= int(length) else None
+
+
+def _exclude(value: str, terms: str) -> Optional[str]:
+    lower = value.lower()
+    return None if any(term in lower for term in terms.split('|')) else value
+
+
+def _imo(value: str) -> Optional[str]:
+    digits = re.sub(r'\D', '', value)
+    return digits if valid_imo(digits) else None
+
+
+# Operaciones de postproceso: "nombre" o "nombre:argumento". Las que devuelven
+# None descartan la coincidencia y la búsqueda sigue con la siguiente.
+OPERATIONS: Dict[str, Callable[..., Optional[str]]] = {
+    'strip': lambda value: value.strip(),
+    'strip_puntuacion': lambda value: value.strip('.,;:'),
+    'titulo': lambda value: value.title(),
+    'mayusculas': lambda value: value.upper(),
+    'primeras_palabras': _first_words,
+    'min_longitud': _min_length,
+    'excluir': _exclude,
+    'imo': _imo,  # Número IMO con dígito verificador válido
+}
+_OPERATIONS_WITH_ARG = {'primeras_palabras', 'min_longitud', 'excluir'}
+
+_generation = itertools.count()
+
+
+class Candidate(NamedTuple):
+    """Coincidencia de una regla del campo."""
+
+    priority: int  # Posición de la regla en el orden de prioridad del campo
+    start: int
+    end: int
+    value: str  # Primer grupo de la regla (o la coincidencia completa si no tiene grupos)
+    text: str  # Coincidencia completa
+
+
+class PatternSet:
+    """Reglas priorizadas de un campo y su postproceso."""
+
+    def __init__(self, name: str, patterns: List[str], flags: int = 0, rule_ids: Optional[List[str]] = None,
+                 value: str = 'grupo', postprocess: Optional[List[str]] = None):
+        """
+        Args:
+            name: Nombre del campo.
+            patterns: Patrones en orden de prioridad.
+            flags: Flags de ``re`` comunes a todos los patrones.
+            rule_ids: Identificador de cada regla (para informes y errores).
+            value: 'grupo' (primer grupo de captura) o 'coincidencia' (texto completo).
+            postprocess: Operaciones de ``OPERATIONS`` a aplicar al valor.
+        """
+        self.name = name
+        self.patterns = [re.compile(pattern, flags) for pattern in patterns]
+        self.rule_ids = rule_ids or [f'{name}_{i + 1:02d}' for i in range(len(patterns))]
+        self.value_mode = value
+        self._steps = [self._parse_step(step) for step in (postprocess or [])]
+        # Clave del valor memoizado en cada documento
+        self._value_key = ('patrones', name, next(_generation), 'valor')
+
+    @staticmethod
+    def _parse_step(step: str) -> Tuple[Callable, tuple]:
+        """Convierte "nombre:argumento" en (función, argumentos)."""
+        name, _, arg = step.partition(':')
+        if name not in OPERATIONS:
+            raise ValueError(f"Operación de postproceso desconocida: {name}")
+        if (name in _OPERATIONS_WITH_ARG) != bool(arg):
+            raise ValueError(f"Argumento inválido en la operación de postproceso: {step}")
+        if name in ('primeras_palabras', 'min_longitud') and not arg.isdigit():
+            raise ValueError(f"La operación {name} necesita un número: {step}")
+        return OPERATIONS[name], ((arg,) if arg else ())
+
+    def first(self, source: Union[str, OCRDocument],
+              validate: Optional[Callable[[Candidate], bool]] = None) -> Optional[Candidate]:
+        """
+        Resuelve la regla de prioridad: la primera coincidencia de la primera regla que encuentre algo.
+
+        Args:
+            source: Texto o documento OCR.
+            validate: Condición opcional que debe cumplir el candidato. Si una
+                      coincidencia no la cumple se sigue con la siguiente de
+                      esa regla y luego con las siguientes reglas.
+
+        Returns:
+            Candidato ganador o None.
+        """
+        text = source.text if isinstance(source, OCRDocument) else source
+        for priority, compiled in enumerate(self.patterns):
+            for match in compiled.finditer(text):
+                value = match.group(1) if compiled.groups else match.group(0)
+                candidate = Candidate(priority, match.start(), match.end(), value or '', match.group(0))
+                if validate is None or validate(candidate):
+                    return candidate
+        return None
+
+    def process(self, candidate: Union[Candidate, str]) -> Optional[str]:
+        """
+        Aplica el postproceso del campo a un candidato o a un texto ya capturado.
+
+        Returns:
+            Valor final, o None si alguna operación lo descarta o queda vacío.
+        """
+        if isinstance(candidate, Candidate):
+            value = candidate.value if self.value_mode == 'grupo' else candidate.text
+        else:
+            value = candidate
+        for operation, args in self._steps:
+            value = operation(value, *args)
+            if value is None:
+                return None
+        return value or None
+
+    def extract(self, source: Union[str, OCRDocument]) -> Optional[str]:
+        """
+        Valor del campo: primera coincidencia por prioridad cuyo postproceso no la descarte.
+
+        Args:
+            source: Texto o documento OCR.
+
+        Returns:
+            Valor postprocesado o None.
+        """
+        if isinstance(source, OCRDocument):
+            return source.cached(self._value_key, lambda: self.extract(source.text))
+        best = self.first(source, lambda candidate: self.process(candidate) is not None)
+        return self.process(best) if best else None
+
+    def finditer(self, text: str):
+        """Todas las coincidencias (sin solaparse) de cada regla, regla por regla."""
+        for compiled in self.patterns:
+            yield from compiled.finditer(text)
+
+
+def _compile_field(name: str, spec: dict, source: str) -> PatternSet:
+    """Valida y compila la definición de un campo de un paquete de reglas."""
+    where = f"{source}, campo '{name}'"
+    if not isinstance(spec, dict) or not isinstance(spec.get('reglas'), list) or not spec['reglas']:
+        raise ValueError(f"{where}: se esperaba un objeto con una lista 'reglas' no vacía")
+
+    flags = 0
+    for flag in spec.get('flags', []):
+        if flag not in ('IGNORECASE', 'MULTILINE', 'DOTALL'):
+            raise ValueError(f"{where}: flag desconocido {flag}")
+        flags |= getattr(re, flag)
+
+    value = spec.get('valor', 'grupo')
+    if value not in ('grupo', 'coincidencia'):
+        raise ValueError(f"{where}: 'valor' debe ser 'grupo' o 'coincidencia'")
+
+    rules = []
+    seen = set()
+    for order, rule in enumerate(spec['reglas']):
+        rule_id = rule.get('id') if isinstance(rule, dict) else None
+        if not rule_id or not isinstance(rule.get('patron'), str):
+            raise ValueError(f"{where}: la regla #{order + 1} necesita 'id' y 'patron'")
+        if rule_id in seen:
+            raise ValueError(f"{where}: id de regla repetido {rule_id}")
+        seen.add(rule_id)
+        priority = rule.get('prioridad', 0)
+        if not isinstance(priority, (int, float)):
+            raise ValueError(f"{where}: prioridad inválida en la regla {rule_id}")
+        try:
+            re.compile(rule['patron'], flags)
+        except re.error as e:
+            raise ValueError(f"{where}: patrón inválido en la regla {rule_id}: {str(e)}")
+        rules.append((priority, order, rule_id, rule['patron']))
+
+    # Menor prioridad primero; a igual prioridad, el orden del archivo
+    rules.sort()
+    try:
+        return PatternSet(name, [rule[3] for rule in rules], flags, [rule[2] for rule in rules],
+                          value, spec.get('postproceso'))
+    except ValueError as e:
+        raise ValueError(f"{where}: {str(e)}")
+
+
+def load_rules(directory: Union[str, Path]) -> Tuple[Dict[str, PatternSet], Dict[str, List[str]]]:
+    """
+    Carga, valida y compila los paquetes de reglas de un directorio.
+
+    Los archivos se leen en orden alfabético; si dos paquetes definen el mismo
+    campo o la misma lista de palabras clave, manda el último.
+
+    Args:
+        directory: Directorio con los archivos ``*.json``.
+
+    Returns:
+        Tupla (campos compilados, palabras clave).
+
+    Raises:
+        FileNotFoundError: Si el directorio no existe o no tiene paquetes.
+        ValueError: Si algún paquete es inválido.
+    """
+    directory = Path(directory)
+    files = sorted(directory.glob('*.json')) if directory.is_dir() else []
+    if not files:
+        raise FileNotFoundError(f"No hay paquetes de reglas en {directory}")
+
+    fields: Dict[str, PatternSet] = {}
+    keywords: Dict[str, List[str]] = {}
+    for path in files:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                pack = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{path.name}: JSON inválido: {str(e)}")
+        if not isinstance(pack, dict) or not isinstance(pack.get('campos', {}), dict):
+            raise ValueError(f"{path.name}: se esperaba un objeto con 'campos'")
+
+        for name, spec in pack.get('campos', {}).items():
+            fields[name] = _compile_field(name, spec, path.name)
+        for name, words in pack.get('palabras_clave', {}).items():
+            if not isinstance(words, list) or not all(isinstance(word, str) for word in words):
+                raise ValueError(f"{path.name}: 'palabras_clave.{name}' debe ser una lista de textos")
+            keywords[name] = [word.lower() for word in words]
+
+    return fields, keywords
+
+
+class RuleRegistry:
+    """Reglas compiladas de un directorio, recargadas cuando cambian los archivos."""
+
+    def __init__(self, directory: Union[str, Path] = DEFAULT_DIR, check_interval: Optional[float] = 2.0):
+        """
+        Args:
+            directory: Directorio de paquetes de reglas.
+            check_interval: Segundos entre comprobaciones de cambios (None = sin recarga).
+
+        Raises:
+            FileNotFoundError, ValueError: Si los paquetes no se pueden cargar.
+        """
+        self.directory = Path(directory)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._fields: Dict[str, PatternSet] = {}
+        self._keywords: Dict[str, List[str]] = {}
+        self._stamp = None
+        self._checked = 0.0
+        self.reload()
+
+    def _current_stamp(self) -> tuple:
+        """Nombres, tamaños y fechas de modificación de los paquetes."""
+        stamp = []
+        for path in sorted(self.directory.glob('*.json')):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            stamp.append((path.name, stat.st_size, stat.st_mtime_ns))
+        return tuple(stamp)
+
+    def reload(self):
+        """
+        Vuelve a cargar todos los paquetes.
+
+        Raises:
+            FileNotFoundError, ValueError: Si los paquetes no se pueden cargar
+            (las reglas anteriores se conservan).
+        """
+        with self._lock:
+            stamp = self._current_stamp()
+            fields, keywords = load_rules(self.directory)
+            self._fields, self._keywords, self._stamp = fields, keywords, stamp
+            self._checked = time.monotonic()
+        logger.info(f"Reglas de extracción cargadas: {len(fields)} campos desde {self.directory}")
+
+    def _maybe_reload(self):
+        """Recarga los paquetes si cambiaron desde la última comprobación."""
+        if self.check_interval is None:
+            return
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return
+        self._checked = now
+        if self._current_stamp() == self._stamp:
+            return
+        try:
+            self.reload()
+        except (OSError, ValueError) as e:
+            # Un paquete con errores no debe tumbar el servidor: se siguen usando las reglas anteriores
+            self._stamp = self._current_stamp()
+            logger.error(f"No se pudieron recargar las reglas de extracción: {str(e)}")
+
+    def get(self, name: str) -> PatternSet:
+        """
+        Reglas compiladas de un campo.
+
+        Raises:
+            KeyError: Si el campo no está definido en ningún paquete.
+        """
+        self._maybe_reload()
+        return self._fields[name]
+
+    def keywords(self, name: str) -> List[str]:
+        """
+        Lista de palabras clave (en minúsculas).
+
+        Raises:
+            KeyError: Si la lista no está definida en ningún paquete.
+        """
+        self._maybe_reload()
+        return self._keywords[name]
+
+    def fields(self) -> Dict[str, PatternSet]:
+        """Todos los campos compilados."""
+        self._maybe_reload()
+        return dict(self._fields)
+
+
+# Reglas por defecto: se validan y compilan al importar el módulo
+default_rules = RuleRegistry(DEFAULT_DIR)
+
+
+def get(name: str) -> PatternSet:
+    """Reglas compiladas de un campo en el registro por defecto."""
+    return default_rules.get(name)
+
+
+def keywords(name: str) -> List[str]:
+    """Palabras clave del registro por defecto."""
+    return default_rules.keywords(name)
@@ -1,5 +1,12 @@
 """
 Módulo para exportar datos normalizados a PDF.
+
+Los estilos de párrafo y de tabla se crean una vez por exportador. Las
+tablas largas se dividen en bloques de ``LongTable``: reportlab vuelve a
+medir todas las filas restantes de una tabla en cada salto de página, así que
+con bloques acotados el tiempo crece en forma lineal con la cantidad de filas.
+Solo el primer bloque lleva encabezado; los demás continúan la tabla de
+arriba y lo agregan únicamente si saltan de página.
 """
 import sys
 
@@ -35,18 +42,60 @@ if sys.version_info < (3, 9):
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, LongTable, FrameBreak
 from reportlab.lib import colors
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Filas (sin el encabezado) por bloque de tabla en los listados largos
+TABLE_CHUNK_ROWS = 500
+
+# Color de títulos y encabezados
+HEADER_COLOR = colors.HexColor('#366092')
+
+# Sombreado alternado de las filas de los listados
+ROW_BACKGROUNDS = [colors.white, colors.lightgrey]
+
+
+class _ContinuedTable(LongTable):
+    """
+    Bloque de un listado que continúa la tabla de arriba.
+    
+    Se dibuja sin encabezado; si no entra en la página, la parte que pasa a
+    la siguiente es una ``LongTable`` con el encabezado repetido.
+    """
+    
+    def __init__(self, data, *args, header: Optional[List[str]] = None, header_style: TableStyle = None,
+                 **kwargs):
+        super().__init__(data, *args, **kwargs)
+        # Las partes que crea reportlab al dividir no llevan encabezado propio
+        self._header = header
+        self._header_style = header_style
+        self._col_widths = kwargs.get('colWidths')
+    
+    def split(self, availWidth, availHeight):
+        if self._header is None:
+            return super().split(availWidth, availHeight)
+        parts = super().split(availWidth, availHeight)
+        drawn = len(parts[0]._cellvalues) if parts else 0
+        rest = LongTable([self._header] + self._cellvalues[drawn:], colWidths=self._col_widths, repeatRows=1,
+                         style=self._header_style)
+        # Sigue el sombreado alternado donde quedó la primera parte
+        backgrounds = ROW_BACKGROUNDS[drawn % 2:] + ROW_BACKGROUNDS[:drawn % 2]
+        rest.setStyle([('ROWBACKGROUNDS', (0, 1), (-1, -1), backgrounds)])
+        # Si no entra ni una fila, el bloque empieza en la página siguiente (con encabezado)
+        return [parts[0], rest] if parts else [FrameBreak, rest]
+
 
 class PDFExporter:
     """Exportador de datos a formato PDF."""
     
+    extension = '.pdf'
+    
     def __init__(self, page_size: str = 'A4'):
         """
         Inicializa el exportador PDF.
@@ -55,6 +104,55 @@ class PDFExporter:
             page_size: Tamaño de página ('A4' o 'letter').
         """
         self.page_size = A4 if page_size.upper() == 'A4' else letter
+        
+        # Estilos compartidos por todos los documentos del exportador
+        self.styles = getSampleStyleSheet()
+        self.title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=self.styles['Heading1'],
+            fontSize=18,
+            textColor=HEADER_COLOR,
+            spaceAfter=30,
+            alignment=1  # Centrado
+        )
+        self.heading_style = ParagraphStyle(
+            'CustomHeading',
+            parent=self.styles['Heading2'],
+            fontSize=12,
+            textColor=HEADER_COLOR,
+            spaceAfter=10,
+        )
+        self.single_table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), HEADER_COLOR),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
+        ])
+        self.multiple_table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), HEADER_COLOR),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('FONTSIZE', (0, 1), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), ROW_BACKGROUNDS),
+        ])
+        # Bloques sin encabezado (``_ContinuedTable``)
+        self.multiple_body_style = TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('BACKGROUND', (0, 0), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+            ('ROWBACKGROUNDS', (0, 0), (-1, -1), ROW_BACKGROUNDS),
+        ])
     
     def export_single(self, data: Dict[str, any], output_path: str) -> str:
         """
@@ -73,27 +171,8 @@ class PDFExporter:
         doc = SimpleDocTemplate(str(output_path), pagesize=self.page_size)
         story = []
         
-        # Estilos
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=18,
-            textColor=colors.HexColor('#366092'),
-            spaceAfter=30,
-            alignment=1  # Centrado
-        )
-        
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=12,
-            textColor=colors.HexColor('#366092'),
-            spaceAfter=10,
-        )
-        
         # Título
-        story.append(Paragraph("Itinerario de Naviera", title_style))
+        story.append(Paragraph("Itinerario de Naviera", self.title_style))
         story.append(Spacer(1, 0.3*inch))
         
         # Datos principales
@@ -120,30 +199,19 @@ class PDFExporter:
             if value is not None:
                 table_data.append([field, str(value)])
         
-        table = Table(table_data, colWidths=[2*inch, 4*inch])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
-        ]))
+        table = Table(table_data, colWidths=[2*inch, 4*inch], style=self.single_table_style)
         
         story.append(table)
         story.append(Spacer(1, 0.5*inch))
         
         # Texto completo (opcional, si es muy largo puede omitirse)
         if data.get('texto_completo'):
-            story.append(Paragraph("Texto Extraído Completo", heading_style))
+            story.append(Paragraph("Texto Extraído Completo", self.heading_style))
             # Limitar texto si es muy largo
             texto = data['texto_completo']
             if len(texto) > 1000:
                 texto = texto[:1000] + "... (texto truncado)"
-            story.append(Paragraph(texto.replace('\n', '<br/>'), styles['Normal']))
+            story.append(Paragraph(texto.replace('\n', '<br/>'), self.styles['Normal']))
         
         # Construir PDF
         doc.build(story)
@@ -151,13 +219,15 @@ class PDFExporter:
         logger.info(f"Archivo PDF generado exitosamente: {output_path}")
         return output_path
     
-    def export_multiple(self, data_list: List[Dict[str, any]], output_path: str) -> str:
+    def export_multiple(self, data_list: List[Dict[str, any]], output_path: str, datos_generales: Dict = None) -> str:
         """
         Exporta múltiples registros a PDF.
         
         Args:
             data_list: Lista de diccionarios con datos normalizados.
             output_path: Ruta donde guardar el archivo PDF.
+            datos_generales: Datos generales del itinerario, para completar los
+                             campos que un registro no trae (opcional).
             
         Returns:
             Ruta del archivo generado.
@@ -171,52 +241,61 @@ class PDFExporter:
         doc = SimpleDocTemplate(str(output_path), pagesize=self.page_size)
         story = []
         
-        # Estilos
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=18,
-            textColor=colors.HexColor('#366092'),
-            spaceAfter=30,
-            alignment=1
-        )
-        
         # Título
-        story.append(Paragraph(f"Itinerarios de Naviera ({len(data_list)} registros)", title_style))
+        story.append(Paragraph(f"Itinerarios de Naviera ({len(data_list)} registros)", self.title_style))
         story.append(Spacer(1, 0.3*inch))
         
-        # Crear tabla con todos los registros
-        table_data = [['Fecha', 'Nave', 'Semana', 'Puertos', 'Viaje']]
-        
-        for data in data_list:
-            row = [
-                data.get('fecha_normalizada') or data.get('fecha_original') or '',
-                data.get('nave_normalizada') or data.get('nave_original') or '',
-                str(data.get('semana_normalizada') or data.get('semana_original') or ''),
-                ', '.join(data.get('puertos', [])) if isinstance(data.get('puertos'), list) else str(data.get('puertos', '')),
-                data.get('numero_viaje', ''),
-            ]
-            table_data.append(row)
-        
-        table = Table(table_data, colWidths=[1.2*inch, 1.5*inch, 0.8*inch, 1.5*inch, 1*inch])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('FONTSIZE', (0, 1), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
-        ]))
-        
-        story.append(table)
+        # Tabla con todos los registros, en bloques
+        header = ['Fecha', 'Nave', 'Semana', 'Puertos', 'Viaje']
+        story.extend(self.table_chunks(header, (self._multiple_row(data, datos_generales) for data in data_list),
+                                       col_widths=[1.2*inch, 1.5*inch, 0.8*inch, 1.5*inch, 1*inch]))
         
         # Construir PDF
         doc.build(story)
         
         logger.info(f"Archivo PDF con {len(data_list)} registros generado: {output_path}")
         return output_path
+    
+    def table_chunks(self, header: List[str], rows: Iterable[List], col_widths: List[float],
+                     chunk_rows: int = TABLE_CHUNK_ROWS) -> Iterator[LongTable]:
+        """
+        Divide un listado en tablas de ``chunk_rows`` filas.
+        
+        Así reportlab nunca mide más de ``chunk_rows`` filas por salto de
+        página. El primer bloque lleva el encabezado (repetido en cada
+        página); los siguientes continúan la tabla sin repetirlo donde
+        empiezan, y lo repiten en las páginas a las que pasan.
+        
+        Args:
+            header: Encabezados de las columnas.
+            rows: Filas de la tabla.
+            col_widths: Ancho de cada columna.
+            chunk_rows: Filas por bloque (par, para que el sombreado alternado continúe).
+            
+        Yields:
+            Tablas con el estilo de ``multiple_table_style``.
+        """
+        rows = iter(rows)
+        chunk = list(islice(rows, chunk_rows))
+        if not chunk:
+            return
+        yield LongTable([header] + chunk, colWidths=col_widths, repeatRows=1, style=self.multiple_table_style)
+        while True:
+            chunk = list(islice(rows, chunk_rows))
+            if not chunk:
+                return
+            yield _ContinuedTable(chunk, colWidths=col_widths, style=self.multiple_body_style,
+                                  header=header, header_style=self.multiple_table_style)
+    
+    @staticmethod
+    def _multiple_row(data: Dict[str, any], datos_generales: Optional[Dict] = None) -> List[str]:
+        """Fila del listado de ``export_multiple``."""
+        general = datos_generales or {}
+        return [
+            data.get('fecha_normalizada') or data.get('fecha_original') or general.get('fecha_normalizada') or '',
+            data.get('nave_normalizada') or data.get('nombre') or data.get('nave_original') or '',
+            str(data.get('semana_normalizada') or data.get('semana_original')
+                or general.get('semana_normalizada') or ''),
+            ', '.join(data.get('puertos', [])) if isinstance(data.get('puertos'), list) else str(data.get('puertos', '')),
+            data.get('numero_viaje', ''),
+        ]
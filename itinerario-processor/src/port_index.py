@@ -0,0 +1,239 @@
+"""
+Índice de puertos con corrección de errores de OCR.
+
+Resuelve un nombre de puerto tal como sale del OCR ("Guayaqull", "Ca11ao",
+"Callao Etd") a su entrada canónica con código UN/LOCODE:
+
+1. La clave se normaliza: minúsculas, sin tildes ni puntuación, y dentro de
+   las palabras con letras se deshacen las confusiones típicas del OCR
+   (1 → l, 0 → o, 5 → s).
+2. Búsqueda exacta en un diccionario de alias, probando también las
+   subsecuencias de palabras (para descartar palabras pegadas como "Etd").
+3. Si no hay coincidencia exacta, búsqueda aproximada en un índice de
+   trigramas con una distancia de edición máxima según el largo.
+
+Las entradas salen de los puertos del gazetteer (``data/gazetteer.json``) y,
+si existen, de los archivos CSV oficiales de UN/LOCODE en ``data/unlocode/``
+(solo las ubicaciones con función de puerto). Los puertos del gazetteer tienen
+prioridad sobre los de UN/LOCODE.
+"""
+import csv
+import functools
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Union
+import logging
+
+from .fuzzy import TrigramIndex, normalize_key
+from .gazetteer import DEFAULT_PATH as GAZETTEER_PATH
+
+logger = logging.getLogger(__name__)
+
+UNLOCODE_DIR = Path(__file__).resolve().parent.parent / 'data' / 'unlocode'
+
+# Palabras consideradas al buscar subsecuencias dentro de un texto
+MAX_WINDOW_WORDS = 4
+
+# Claves más cortas no se buscan de forma aproximada (demasiados falsos positivos)
+MIN_FUZZY_LENGTH = 4
+
+# Origen de la entrada: los puertos curados ganan a los de UN/LOCODE
+TIER_GAZETTEER = 0
+TIER_UNLOCODE = 1
+
+
+def max_distance_for(key: str) -> int:
+    """Distancia de edición aceptada según el largo de la clave."""
+    if len(key) < MIN_FUZZY_LENGTH:
+        return 0
+    return 1 if len(key) <= 6 else 2
+
+
+class PortEntry(NamedTuple):
+    """Puerto canónico."""
+
+    name: str
+    locode: Optional[str]
+    pol: bool  # Puerto de carga (San Antonio, Valparaíso)
+    tier: int  # TIER_GAZETTEER o TIER_UNLOCODE
+
+
+class PortMatch(NamedTuple):
+    """Resultado de resolver un nombre de puerto."""
+
+    entry: PortEntry
+    alias: str  # Clave del índice que coincidió
+    distance: int  # 0 = coincidencia exacta
+
+
+class PortIndex:
+    """Índice de puertos con búsqueda exacta y aproximada."""
+
+    def __init__(self, cache_size: int = 4096):
+        """
+        Args:
+            cache_size: Resultados de ``lookup`` memoizados (los mismos nombres se repiten mucho).
+        """
+        self._aliases: TrigramIndex[PortEntry] = TrigramIndex()
+        self._by_name: Dict[str, PortEntry] = {}
+        self._cached_lookup = functools.lru_cache(maxsize=cache_size)(self._lookup)
+
+    def add(self, name: str, locode: Optional[str] = None, aliases: Iterable[str] = (),
+            pol: bool = False, tier: int = TIER_GAZETTEER) -> PortEntry:
+        """
+        Agrega un puerto con sus alias. Un alias ya registrado conserva su
+        primera entrada (el orden de alta es la prioridad).
+
+        Args:
+            name: Nombre canónico.
+            locode: Código UN/LOCODE (por ejemplo "PECLL").
+            aliases: Otros nombres del puerto.
+            pol: Si es puerto de carga.
+            tier: Origen de la entrada.
+
+        Returns:
+            Entrada creada.
+        """
+        entry = PortEntry(name, locode, pol, tier)
+        self._by_name.setdefault(name, entry)
+        for alias in [name, *aliases, *([locode] if locode else [])]:
+            key = normalize_key(alias)
+            if key and key not in self._aliases:
+                self._aliases.add(key, entry)
+        self._cached_lookup.cache_clear()
+        return entry
+
+    def add_gazetteer(self, path: Union[str, Path] = GAZETTEER_PATH) -> int:
+        """
+        Agrega los puertos del gazetteer.
+
+        Returns:
+            Cantidad de puertos agregados.
+
+        Raises:
+            FileNotFoundError: Si el archivo no existe.
+        """
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"Diccionario no encontrado: {path}")
+        with open(path, 'r', encoding='utf-8') as f:
+            ports = json.load(f).get('puertos', [])
+        for port in ports:
+            self.add(port['nombre'], port.get('locode'), port.get('alias') or [], bool(port.get('pol')))
+        return len(ports)
+
+    def add_unlocode(self, path: Union[str, Path]) -> int:
+        """
+        Agrega las ubicaciones con función de puerto de un CSV oficial de UN/LOCODE.
+
+        Formato: las columnas del CSV publicado por UNECE (cambio, país,
+        ubicación, nombre, nombre sin diacríticos, subdivisión, función, ...),
+        en latin-1 y sin encabezado.
+
+        Returns:
+            Cantidad de puertos agregados.
+        """
+        added = 0
+        with open(path, 'r', encoding='latin-1', newline='') as f:
+            for row in csv.reader(f):
+                if len(row) < 7 or not row[1] or not row[2] or not row[6].startswith('1'):
+                    continue
+                # Las filas que empiezan con "=" son nombres alternativos de otra ubicación
+                name = row[3].lstrip('=').strip()
+                if not name:
+                    continue
+                self.add(name, row[1] + row[2], [row[4]], tier=TIER_UNLOCODE)
+                added += 1
+        return added
+
+    def _lookup(self, text: str) -> Optional[PortMatch]:
+        """Implementación de ``lookup`` (sin memoizar)."""
+        words = normalize_key(text).split()
+        if not words:
+            return None
+
+        # Subsecuencias de palabras, de la más larga a la más corta
+        windows = [
+            ' '.join(words[start:start + size])
+            for size in range(min(len(words), MAX_WINDOW_WORDS), 0, -1)
+            for start in range(len(words) - size + 1)
+        ]
+        if len(words) > MAX_WINDOW_WORDS:
+            windows.insert(0, ' '.join(words))
+
+        # Primero coincidencias exactas: más palabras, luego entrada curada
+        exact = []
+        for order, window in enumerate(windows):
+            entry = self._aliases.get(window)
+            if entry is not None:
+                exact.append((-len(window.split()), entry.tier, order, window, entry))
+        if exact:
+            *_, window, entry = min(exact)
+            return PortMatch(entry, window, 0)
+
+        fuzzy = []
+        for order, window in enumerate(windows):
+            max_distance = max_distance_for(window)
+            if not max_distance:
+                continue
+            for match in self._aliases.search(window, max_distance, limit=1):
+                fuzzy.append((-len(window.split()), match.distance, match.value.tier, order,
+                              match.key, match.value))
+        if fuzzy:
+            _, distance, _, _, alias, entry = min(fuzzy)
+            return PortMatch(entry, alias, distance)
+        return None
+
+    def lookup(self, text: str) -> Optional[PortMatch]:
+        """
+        Resuelve un nombre de puerto.
+
+        Args:
+            text: Nombre tal como aparece en el documento (puede traer palabras de más).
+
+        Returns:
+            Puerto encontrado, o None si no se reconoce.
+        """
+        return self._cached_lookup(text)
+
+    def resolve(self, text: Optional[str]) -> Optional[PortEntry]:
+        """Entrada canónica de un nombre de puerto, o None."""
+        if not text:
+            return None
+        match = self.lookup(text)
+        return match.entry if match else None
+
+    def locode(self, name: Optional[str]) -> Optional[str]:
+        """Código UN/LOCODE de un nombre canónico (como lo devuelve ``resolve``)."""
+        entry = self._by_name.get(name) if name else None
+        return entry.locode if entry else None
+
+    def __len__(self) -> int:
+        return len(self._aliases)
+
+
+def build_default(gazetteer_path: Union[str, Path] = GAZETTEER_PATH,
+                  unlocode_dir: Union[str, Path] = UNLOCODE_DIR) -> PortIndex:
+    """
+    Construye el índice con los puertos del gazetteer y los CSV de UN/LOCODE disponibles.
+
+    Args:
+        gazetteer_path: Ruta al gazetteer.
+        unlocode_dir: Directorio con los CSV de UN/LOCODE (opcional).
+
+    Returns:
+        Índice de puertos.
+    """
+    index = PortIndex()
+    index.add_gazetteer(gazetteer_path)
+    files: List[Path] = sorted(Path(unlocode_dir).glob('*.csv')) if Path(unlocode_dir).is_dir() else []
+    for path in files:
+        added = index.add_unlocode(path)
+        logger.info(f"{added} puertos UN/LOCODE cargados desde {path.name}")
+    return index
+
+
+@functools.lru_cache(maxsize=None)
+def load_default() -> PortIndex:
+    """Índice de puertos por defecto, construido una vez por proceso."""
+    return build_default()
@@ -0,0 +1,171 @@
+"""
+Registro de lectores EasyOCR compartidos por todo el proceso.
+
+Construir un ``easyocr.Reader`` carga los pesos del detector y del
+reconocedor, lo que cuesta varios segundos y cientos de MB. Este módulo
+mantiene un único lector ya inicializado por combinación (idiomas,
+dispositivo) y lo reparte entre todos los ``OCRProcessor`` del proceso.
+
+``easyocr`` (y con él torch) se importa recién al crear el primer lector, de
+modo que los procesos que solo extraen datos de detecciones ya guardadas no
+pagan esa importación.
+
+Un ``easyocr.Reader`` no es seguro para usarlo desde varios hilos a la vez
+(guarda estado entre el detector y el reconocedor, y en GPU las inferencias
+simultáneas compiten por la misma memoria). El registro entrega cada lector
+envuelto en ``SharedReader``, que serializa las inferencias con un candado
+por lector: los hilos del servidor web (o las franjas de una imagen alta)
+pueden preparar sus imágenes en paralelo, pero el OCR corre de a uno.
+
+Si crear el lector de GPU falla, el error se recuerda y las siguientes
+llamadas van directo al de CPU, sin volver a intentar la inicialización de
+CUDA.
+"""
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Idiomas usados cuando no se especifican
+DEFAULT_LANGUAGES = ('es', 'en')
+
+
+class SharedReader:
+    """Lector EasyOCR compartido con las inferencias serializadas por un candado."""
+
+    def __init__(self, reader: 'easyocr.Reader'):
+        self._reader = reader
+        self.lock = threading.Lock()
+
+    def readtext(self, image, **kwargs):
+        with self.lock:
+            return self._reader.readtext(image, **kwargs)
+
+    def readtext_batched(self, images, **kwargs):
+        with self.lock:
+            return self._reader.readtext_batched(images, **kwargs)
+
+    def __getattr__(self, name):
+        # Otros atributos del lector (idiomas, dispositivo, ...)
+        return getattr(self._reader, name)
+
+
+class ReaderRegistry:
+    """Registro thread-safe de lectores EasyOCR indexados por (idiomas, dispositivo)."""
+
+    def __init__(self):
+        """Inicializa el registro vacío."""
+        self._readers: Dict[Tuple[Tuple[str, ...], str], SharedReader] = {}
+        # Claves cuyo lector no se pudo crear (no se reintenta)
+        self._failures: Dict[Tuple[Tuple[str, ...], str], Exception] = {}
+        # Un candado por clave para no bloquear la carga de otros lectores
+        self._key_locks: Dict[Tuple[Tuple[str, ...], str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(languages: Optional[Iterable[str]], device: str) -> Tuple[Tuple[str, ...], str]:
+        """
+        Construye la clave del registro.
+
+        Args:
+            languages: Idiomas del lector (el orden no importa).
+            device: 'gpu' o 'cpu'.
+
+        Returns:
+            Tupla (idiomas ordenados, dispositivo).
+        """
+        langs = tuple(sorted(languages or DEFAULT_LANGUAGES))
+        return langs, device
+
+    def get_reader(self, languages: Optional[Iterable[str]] = None, gpu: bool = True,
+                   warmup: bool = True) -> Tuple[SharedReader, str]:
+        """
+        Devuelve el lector compartido para los idiomas y dispositivo pedidos.
+        Lo crea la primera vez; las llamadas siguientes lo reutilizan.
+
+        Args:
+            languages: Lista de idiomas (por defecto ['es', 'en']).
+            gpu: Si se prefiere GPU. Si falla, se usa (y registra) el lector de CPU;
+                 el fallo se recuerda y no se vuelve a intentar.
+            warmup: Si ejecutar una inferencia de prueba al crear el lector.
+
+        Returns:
+            Tupla (lector, dispositivo efectivo: 'gpu' o 'cpu').
+        """
+        devices = ['gpu', 'cpu'] if gpu else ['cpu']
+        last_error = None
+
+        for device in devices:
+            key = self.make_key(languages, device)
+            reader = self._readers.get(key)
+            if reader is not None:
+                return reader, device
+            if key in self._failures:
+                last_error = self._failures[key]
+                continue
+
+            with self._lock:
+                key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+            with key_lock:
+                # Otro hilo pudo haberlo creado mientras esperábamos
+                reader = self._readers.get(key)
+                if reader is not None:
+                    return reader, device
+                if key in self._failures:
+                    last_error = self._failures[key]
+                    continue
+                try:
+                    reader = SharedReader(self._build_reader(list(key[0]), device == 'gpu', warmup))
+                except Exception as e:
+                    last_error = e
+                    self._failures[key] = e
+                    if device == 'gpu':
+                        logger.warning(f"Error al inicializar EasyOCR con GPU, intentando con CPU: {str(e)}")
+                    continue
+                self._readers[key] = reader
+                return reader, device
+
+        logger.error(f"Error al inicializar EasyOCR: {str(last_error)}")
+        raise last_error
+
+    def _build_reader(self, languages: list, gpu: bool, warmup: bool) -> 'easyocr.Reader':
+        """Crea un lector nuevo y, opcionalmente, lo calienta con una imagen en blanco."""
+        import easyocr
+        reader = easyocr.Reader(languages, gpu=gpu)
+        device = 'GPU' if gpu else 'CPU'
+        logger.info(f"EasyOCR inicializado con {device} e idiomas: {languages}")
+
+        if warmup:
+            # La primera inferencia inicializa kernels y buffers; mejor pagarlo aquí
+            import numpy as np
+            reader.readtext(np.full((32, 128, 3), 255, dtype=np.uint8))
+
+        return reader
+
+    def preload(self, languages: Optional[Iterable[str]] = None, gpu: bool = True) -> str:
+        """
+        Carga por adelantado un lector (por ejemplo al iniciar el servidor web).
+
+        Returns:
+            Dispositivo efectivo del lector cargado.
+        """
+        _, device = self.get_reader(languages, gpu)
+        return device
+
+    def clear(self):
+        """Libera todos los lectores registrados y olvida los fallos de inicialización."""
+        with self._lock:
+            self._readers.clear()
+            self._failures.clear()
+            self._key_locks.clear()
+
+
+# Registro por defecto del proceso
+default_registry = ReaderRegistry()
+
+
+def get_reader(languages: Optional[Iterable[str]] = None, gpu: bool = True) -> Tuple[SharedReader, str]:
+    """Atajo para obtener un lector del registro por defecto."""
+    return default_registry.get_reader(languages, gpu)
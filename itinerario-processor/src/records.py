@@ -0,0 +1,372 @@
+"""
+Registros compactos de itinerarios normalizados.
+
+``DataNormalizer.normalize`` devuelve diccionarios de unas veinte claves por
+documento (y una docena por nave). Para lotes grandes eso es caro: cada
+diccionario ocupa varias veces lo que sus valores. ``Itinerary`` y
+``VesselLeg`` guardan los mismos campos en ``__slots__``:
+
+- los textos cortos que se repiten entre registros (navieras, puertos,
+  fechas) se internan, así todas las filas comparten el mismo objeto;
+- el texto completo del OCR se guarda una sola vez, por referencia, en el
+  itinerario; las naves no lo repiten;
+- los campos que no son fijos (por ejemplo los de
+  ``extract_additional_fields``) van a un diccionario aparte que solo se
+  crea si hace falta;
+- cada dato se guarda una sola vez y con su tipo: ETD, ETA y la fecha del
+  documento son ``datetime.date`` (más el texto original, que se conserva
+  si no es una fecha reconocible) y la semana un entero. Las claves que en
+  ``normalize`` repiten un dato (``fecha_salida_normalizada`` es la fecha de
+  ``fecha_salida_original``) son vistas de solo lectura de ese campo.
+  ``puerto_origen`` y ``puerto_destino`` repiten ``pol`` y ``pod`` salvo
+  cuando el puerto solo venía en esa clave; solo entonces se guardan aparte.
+
+Ambos se comportan como un diccionario (``MutableMapping``) con las mismas
+claves y en el mismo orden que el resultado de ``normalize``, de modo que el
+código que lee ``registro['pol']`` o ``registro.get('etd')`` sigue
+funcionando. ``to_dict`` devuelve el diccionario equivalente (por ejemplo
+para serializar a JSON).
+"""
+import functools
+import re
+import sys
+from collections.abc import MutableMapping
+from datetime import date
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from . import date_parser
+
+# Textos más largos no se internan (el texto completo, por ejemplo)
+MAX_INTERNED_LENGTH = 64
+
+# Valores de relleno de ``normalize`` para fechas y puertos no encontrados
+MISSING_DATE = 'No encontrada'
+MISSING_PORT = 'No encontrado'
+
+_ISO_DATE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+def _intern(value):
+    """Interna los textos cortos: los valores repetidos comparten un solo objeto."""
+    if type(value) is str and len(value) <= MAX_INTERNED_LENGTH:
+        return sys.intern(value)
+    return value
+
+
+@functools.lru_cache(maxsize=4096)
+def _iso_date(value: str) -> Optional[date]:
+    """Fecha de un texto ISO (memoizada: las mismas fechas se repiten en todo el lote)."""
+    if not _ISO_DATE.match(value):
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _split_date(value) -> Tuple[Optional[date], Optional[str]]:
+    """(fecha, texto no reconocido) de un valor de fecha de ``normalize``."""
+    if value is None or value == '' or value == MISSING_DATE:
+        return None, None
+    if isinstance(value, date):
+        return value, None
+    parsed = _iso_date(value) if isinstance(value, str) else None
+    return (parsed, None) if parsed else (None, _intern(value))
+
+
+def _normalized_text(value: Optional[str]) -> Optional[str]:
+    """Igual que ``DataNormalizer.normalize_date``: ISO, el texto original o None."""
+    if not value:
+        return None
+    return date_parser.parse_date(value) or value
+
+
+class _Record(MutableMapping):
+    """Registro con campos fijos en ``__slots__`` y vista de diccionario."""
+
+    __slots__ = ('extra',)
+
+    # Pares (clave del diccionario, atributo), en el orden de ``normalize``
+    FIELDS: Tuple[Tuple[str, str], ...] = ()
+    _ATTRIBUTES: Dict[str, str] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._ATTRIBUTES = dict(cls.FIELDS)
+
+    def _fields(self) -> Tuple[Tuple[str, str], ...]:
+        return self.FIELDS
+
+    def _attribute(self, key: str) -> Optional[str]:
+        return self._ATTRIBUTES.get(key)
+
+    @classmethod
+    def _empty(cls):
+        record = cls.__new__(cls)
+        for klass in cls.__mro__:
+            for attribute in getattr(klass, '__slots__', ()):
+                object.__setattr__(record, attribute, None)
+        return record
+
+    def __getitem__(self, key: str):
+        attribute = self._attribute(key)
+        if attribute is not None:
+            return getattr(self, attribute)
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value):
+        attribute = self._attribute(key)
+        if attribute is not None:
+            view = getattr(type(self), attribute, None)
+            if isinstance(view, property) and view.fset is None:
+                raise TypeError(f"El campo '{key}' se deriva de otro y no se puede asignar")
+            setattr(self, attribute, _intern(value))
+            return
+        if self.extra is None:
+            self.extra = {}
+        self.extra[key] = value
+
+    def __delitem__(self, key: str):
+        if self._attribute(key) is not None:
+            raise TypeError(f"El campo '{key}' es fijo y no se puede eliminar")
+        if self.extra is None or key not in self.extra:
+            raise KeyError(key)
+        del self.extra[key]
+
+    def __iter__(self) -> Iterator[str]:
+        for field, _ in self._fields():
+            yield field
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return len(self._fields()) + (len(self.extra) if self.extra else 0)
+
+    def to_dict(self) -> Dict[str, object]:
+        """Diccionario equivalente, con las naves también como diccionarios."""
+        return {
+            key: [item.to_dict() if isinstance(item, _Record) else item for item in value]
+            if isinstance(value, list) else value
+            for key, value in self.items()
+        }
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.to_dict()!r})'
+
+
+class _DatedRecord(_Record):
+    """Registro con ETD, ETA y fecha tipadas (``datetime.date`` más el texto original)."""
+
+    # ``departure_text``/``arrival_text``: ETD/ETA que no son una fecha reconocible
+    __slots__ = ('departure', 'departure_text', 'arrival', 'arrival_text', 'date', 'date_original')
+
+    @property
+    def etd(self) -> str:
+        """ETD en ISO, el texto original si no es una fecha, o el valor de relleno."""
+        return self.departure.isoformat() if self.departure else self.departure_text or MISSING_DATE
+
+    @etd.setter
+    def etd(self, value):
+        self.departure, self.departure_text = _split_date(value)
+
+    @property
+    def eta(self) -> str:
+        """ETA en ISO, el texto original si no es una fecha, o el valor de relleno."""
+        return self.arrival.isoformat() if self.arrival else self.arrival_text or MISSING_DATE
+
+    @eta.setter
+    def eta(self, value):
+        self.arrival, self.arrival_text = _split_date(value)
+
+    @property
+    def date_normalized(self) -> Optional[str]:
+        """Fecha del documento en ISO, o el texto original si no es una fecha."""
+        return self.date.isoformat() if self.date else self.date_original
+
+    @date_normalized.setter
+    def date_normalized(self, value):
+        self.date, text = _split_date(value)
+        if text is not None:
+            self.date_original = text
+
+
+class VesselLeg(_DatedRecord):
+    """Una nave de un itinerario con varias naves."""
+
+    __slots__ = ('name', 'name_original', 'carrier', 'pol', 'pod', 'voyage', 'container', 'booking',
+                 'pol_locode', 'pod_locode')
+
+    FIELDS = (
+        ('nombre', 'name'),
+        ('nombre_original', 'name_original'),
+        ('naviera', 'carrier'),
+        ('pol', 'pol'),
+        ('pod', 'pod'),
+        ('etd', 'etd'),
+        ('eta', 'eta'),
+        ('fecha_normalizada', 'date_normalized'),
+        ('fecha_original', 'date_original'),
+        ('numero_viaje', 'voyage'),
+        ('numero_contenedor', 'container'),
+        ('numero_booking', 'booking'),
+        ('pol_locode', 'pol_locode'),
+        ('pod_locode', 'pod_locode'),
+    )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object]) -> 'VesselLeg':
+        """
+        Crea el registro a partir de un diccionario de nave de ``normalize``.
+
+        Args:
+            data: Diccionario de ``naves_normalizadas``.
+
+        Returns:
+            Registro con los mismos campos.
+        """
+        leg = cls._empty()
+        for key, value in data.items():
+            leg[key] = value
+        return leg
+
+
+class Itinerary(_DatedRecord):
+    """Itinerario normalizado de un documento (con una o varias naves)."""
+
+    __slots__ = ('multiple', 'total', 'legs', 'carrier', 'vessel', 'vessel_original', 'imo', 'pol', 'pod',
+                 'week', 'container', 'booking', 'departure_original', 'arrival_original', 'week_original',
+                 'raw_text', 'pol_locode', 'pod_locode', 'origin_port_text', 'destination_port_text')
+
+    # Documento con varias naves
+    FIELDS_MULTIPLE = (
+        ('multiple_naves', 'multiple'),
+        ('total_naves', 'total'),
+        ('naves_normalizadas', 'legs'),
+        ('naviera', 'carrier'),
+        ('pol', 'pol'),
+        ('pod', 'pod'),
+        ('etd', 'etd'),
+        ('eta', 'eta'),
+        ('fecha_normalizada', 'date_normalized'),
+        ('semana_normalizada', 'week'),
+        ('texto_completo', 'raw_text'),
+        ('pol_locode', 'pol_locode'),
+        ('pod_locode', 'pod_locode'),
+    )
+
+    # Documento con una sola nave
+    FIELDS = (
+        ('multiple_naves', 'multiple'),
+        ('naviera', 'carrier'),
+        ('nave_normalizada', 'vessel'),
+        ('nave_original', 'vessel_original'),
+        ('imo', 'imo'),
+        ('pol', 'pol'),
+        ('pod', 'pod'),
+        ('etd', 'etd'),
+        ('eta', 'eta'),
+        ('fecha_normalizada', 'date_normalized'),
+        ('fecha_salida_normalizada', 'departure_normalized'),
+        ('fecha_llegada_normalizada', 'arrival_normalized'),
+        ('semana_normalizada', 'week'),
+        ('puerto_origen', 'origin_port'),
+        ('puerto_destino', 'destination_port'),
+        ('numero_contenedor', 'container'),
+        ('numero_booking', 'booking'),
+        ('fecha_original', 'date_original'),
+        ('fecha_salida_original', 'departure_original'),
+        ('fecha_llegada_original', 'arrival_original'),
+        ('semana_original', 'week_original'),
+        ('texto_completo', 'raw_text'),
+        ('pol_locode', 'pol_locode'),
+        ('pod_locode', 'pod_locode'),
+    )
+
+    _ATTRIBUTES_MULTIPLE = dict(FIELDS_MULTIPLE)
+
+    @property
+    def departure_normalized(self) -> Optional[str]:
+        """Vista de ``fecha_salida_original`` normalizada (``fecha_salida_normalizada``)."""
+        return _normalized_text(self.departure_original)
+
+    @property
+    def arrival_normalized(self) -> Optional[str]:
+        """Vista de ``fecha_llegada_original`` normalizada (``fecha_llegada_normalizada``)."""
+        return _normalized_text(self.arrival_original)
+
+    # ``puerto_origen``/``puerto_destino``: ``normalize`` los toma de ``pol``/``pod`` o, si
+    # faltan, de las claves ``puerto_origen``/``puerto_destino`` del OCR. Solo en ese caso
+    # difieren y se guardan en ``origin_port_text``/``destination_port_text``.
+
+    @property
+    def origin_port(self) -> Optional[str]:
+        """``pol`` sin valor de relleno, o el puerto de origen si difiere (``puerto_origen``)."""
+        if self.origin_port_text is not None:
+            return self.origin_port_text
+        return None if self.pol == MISSING_PORT else self.pol
+
+    @origin_port.setter
+    def origin_port(self, value):
+        self.origin_port_text = None
+        if value != self.origin_port:
+            self.origin_port_text = value
+
+    @property
+    def destination_port(self) -> Optional[str]:
+        """``pod`` sin valor de relleno, o el puerto de destino si difiere (``puerto_destino``)."""
+        if self.destination_port_text is not None:
+            return self.destination_port_text
+        return None if self.pod == MISSING_PORT else self.pod
+
+    @destination_port.setter
+    def destination_port(self, value):
+        self.destination_port_text = None
+        if value != self.destination_port:
+            self.destination_port_text = value
+
+    def _fields(self) -> Tuple[Tuple[str, str], ...]:
+        return self.FIELDS_MULTIPLE if self.multiple else self.FIELDS
+
+    def _attribute(self, key: str) -> Optional[str]:
+        return (self._ATTRIBUTES_MULTIPLE if self.multiple else self._ATTRIBUTES).get(key)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object]) -> 'Itinerary':
+        """
+        Crea el registro a partir del resultado de ``DataNormalizer.normalize``.
+
+        El texto completo se guarda por referencia (no se copia), las naves
+        se convierten en ``VesselLeg`` y las claves que repiten otro campo
+        (``fecha_salida_normalizada``, ``puerto_origen``, ...) no se guardan:
+        se derivan de él.
+
+        Args:
+            data: Datos normalizados (más los campos adicionales, si los hay).
+
+        Returns:
+            Registro con los mismos campos.
+        """
+        itinerary = cls._empty()
+        itinerary.multiple = bool(data.get('multiple_naves'))
+        for key, value in data.items():
+            if key == 'naves_normalizadas':
+                value = [VesselLeg.from_dict(leg) for leg in value]
+            elif itinerary._is_view(key):
+                continue
+            itinerary[key] = value
+        return itinerary
+
+    def _is_view(self, key: str) -> bool:
+        """Si la clave es una vista de solo lectura de otro campo."""
+        attribute = self._attribute(key)
+        view = getattr(type(self), attribute, None) if attribute else None
+        return isinstance(view, property) and view.fset is None
+
+    @property
+    def vessels(self) -> List[str]:
+        """Nombres normalizados de las naves del itinerario."""
+        if self.multiple:
+            return [leg.name for leg in self.legs or []]
+        return [self.vessel] if self.vessel else []
@@ -0,0 +1,128 @@
+"""
+Reconstrucción de tablas a partir de las cajas del OCR.
+
+Los itinerarios con varias naves suelen ser tablas: una fila de encabezado
+(Vessel, Voyage, ETD, ETA, POL, POD) y una fila por nave. En lugar de adivinar
+los datos de cada nave con ventanas de líneas alrededor de su nombre, se
+agrupan las detecciones en filas y columnas con geometría vectorizada y se
+emite una fila por nave en una sola pasada.
+"""
+import re
+from typing import Dict, List, Optional
+import numpy as np
+import logging
+
+from .ocr_document import OCRDocument
+
+logger = logging.getLogger(__name__)
+
+# Alias de encabezado por campo (en minúsculas, sin puntuación)
+HEADER_ALIASES = {
+    'nombre': ['vessel', 'vessel name', 'nave', 'buque', 'ship', 'motonave', 'barco'],
+    'numero_viaje': ['voyage', 'voy', 'voyage no', 'viaje', 'voy no'],
+    'fecha_salida': ['etd', 'departure', 'salida', 'zarpe'],
+    'fecha_llegada': ['eta', 'arrival', 'llegada', 'arribo'],
+    'puerto_origen': ['pol', 'port of loading', 'origen', 'puerto de carga'],
+    'puerto_destino': ['pod', 'port of discharge', 'destino', 'puerto de descarga'],
+}
+
+_ALIAS_TO_FIELD = {alias: field for field, aliases in HEADER_ALIASES.items() for alias in aliases}
+
+
+def _normalize_header(text: str) -> str:
+    """Normaliza el texto de una celda de encabezado para compararlo con los alias."""
+    return ' '.join(re.sub(r'[^\w\s]', ' ', text.lower()).split())
+
+
+class TableLayout:
+    """Tabla reconstruida: columnas detectadas por encabezado y una fila por nave."""
+
+    def __init__(self, columns: List[str], header_row: int, rows: List[Dict[str, str]]):
+        """
+        Args:
+            columns: Campos de las columnas detectadas, de izquierda a derecha.
+            header_row: Fila visual del encabezado.
+            rows: Una fila por nave con el texto de cada celda.
+        """
+        self.columns = columns
+        self.header_row = header_row
+        self.rows = rows
+
+    @classmethod
+    def from_document(cls, doc: OCRDocument, min_columns: int = 3) -> Optional['TableLayout']:
+        """
+        Detecta y reconstruye la tabla de naves de un documento.
+
+        Args:
+            doc: Documento OCR con geometría.
+            min_columns: Columnas de encabezado reconocidas necesarias (incluida la nave).
+
+        Returns:
+            TableLayout o None si el documento no tiene una tabla de naves.
+        """
+        if not doc.has_geometry:
+            return None
+
+        tokens = doc.tokens
+        rows = np.array([token.row for token in tokens])
+        boxes = np.array([np.asarray(token.bbox, dtype=float) for token in tokens])
+        x0 = boxes[:, :, 0].min(axis=1)
+        x1 = boxes[:, :, 0].max(axis=1)
+        cx = (x0 + x1) / 2
+
+        fields = [_ALIAS_TO_FIELD.get(_normalize_header(token.text)) for token in tokens]
+        header = cls._find_header(rows, fields, min_columns)
+        if header is None:
+            return None
+
+        # Columnas: una por encabezado reconocido, ordenadas por x
+        header_idx = [i for i in np.flatnonzero(rows == header) if fields[i]]
+        header_idx.sort(key=lambda i: cx[i])
+        columns = [fields[i] for i in header_idx]
+        centers = cx[header_idx]
+        # Límites entre columnas: punto medio entre centros de encabezados vecinos
+        boundaries = (centers[:-1] + centers[1:]) / 2
+
+        body = np.flatnonzero(rows > header)
+        if len(body) == 0:
+            return None
+        col_of = np.searchsorted(boundaries, cx[body])
+
+        # Una sola pasada en orden (fila, x) acumulando el texto de cada celda
+        order = body[np.lexsort((x0[body], rows[body]))]
+        col_lookup = dict(zip(body.tolist(), col_of.tolist()))
+        table_rows: List[Dict[str, str]] = []
+        current_row = None
+        cells: Dict[str, List[str]] = {}
+        for i in order:
+            if rows[i] != current_row:
+                if cells:
+                    table_rows.append({field: ' '.join(parts) for field, parts in cells.items()})
+                current_row = rows[i]
+                cells = {}
+            column = col_lookup[i]
+            tokens[i].column = column
+            cells.setdefault(columns[column], []).append(tokens[i].text)
+        if cells:
+            table_rows.append({field: ' '.join(parts) for field, parts in cells.items()})
+
+        # Una fila de nave tiene nombre y al menos otra celda (descarta pies de tabla)
+        vessels = [row for row in table_rows if row.get('nombre') and len(row) > 1]
+        if not vessels:
+            return None
+
+        logger.info(f"Tabla detectada: {len(vessels)} naves, columnas {columns}")
+        return cls(columns, int(header), vessels)
+
+    @staticmethod
+    def _find_header(rows: np.ndarray, fields: List[Optional[str]], min_columns: int) -> Optional[int]:
+        """Primera fila con columna de nave y al menos ``min_columns`` encabezados distintos."""
+        by_row: Dict[int, set] = {}
+        for row, field in zip(rows.tolist(), fields):
+            if field:
+                by_row.setdefault(row, set()).add(field)
+        for row in sorted(by_row):
+            found = by_row[row]
+            if 'nombre' in found and len(found) >= min_columns:
+                return row
+        return None
@@ -0,0 +1,196 @@
+"""
+Utilidades para OCR por franjas de imágenes muy altas.
+
+Las tablas de itinerarios exportadas como PNG pueden medir decenas de miles de
+píxeles de alto. En lugar de pasar la imagen completa al detector (memoria) o
+reducirla hasta que sea ilegible, se divide en franjas horizontales solapadas
+que se procesan por separado y luego se unen.
+
+Lo acotado es la memoria del detector: solo se procesan unas pocas franjas a
+la vez. La imagen completa sí se decodifica una vez (en escala de grises, un
+byte por píxel), porque los decodificadores de PIL no leen un rango de filas
+de un PNG sin cargarlo entero.
+"""
+from typing import List, Tuple
+import numpy as np
+
+
+def iter_bands(height: int, tile_height: int, overlap: int) -> List[Tuple[int, int, int, int]]:
+    """
+    Calcula las franjas horizontales solapadas que cubren una imagen.
+
+    Cada franja tiene además una zona "propia" que no se superpone con las
+    vecinas (el solapamiento se reparte a la mitad); una detección pertenece
+    a la franja cuya zona propia contiene su centro.
+
+    Args:
+        height: Alto de la imagen.
+        tile_height: Alto de cada franja.
+        overlap: Píxeles compartidos entre franjas consecutivas. Debe superar
+                 la altura de una línea de texto.
+
+    Returns:
+        Lista de tuplas (inicio, fin, inicio_propio, fin_propio).
+    """
+    if overlap >= tile_height:
+        raise ValueError("El solapamiento debe ser menor que el alto de la franja")
+
+    step = tile_height - overlap
+    bands = []
+    top = 0
+    while True:
+        bottom = min(top + tile_height, height)
+        bands.append([top, bottom])
+        if bottom >= height:
+            break
+        top += step
+
+    result = []
+    for i, (top, bottom) in enumerate(bands):
+        own_top = 0 if i == 0 else (top + bands[i - 1][1]) // 2
+        own_bottom = height if i == len(bands) - 1 else (bands[i + 1][0] + bottom) // 2
+        result.append((top, bottom, own_top, own_bottom))
+    return result
+
+
+def _boxes(detections: list) -> np.ndarray:
+    """Cajas alineadas a los ejes (x0, y0, x1, y1) de una lista de detecciones."""
+    if not detections:
+        return np.zeros((0, 4))
+    points = np.array([np.asarray(bbox, dtype=float) for bbox, _, _ in detections])
+    return np.column_stack([
+        points[:, :, 0].min(axis=1), points[:, :, 1].min(axis=1),
+        points[:, :, 0].max(axis=1), points[:, :, 1].max(axis=1),
+    ])
+
+
+def offset_detections(detections: list, dx: float, dy: float) -> list:
+    """Desplaza las cajas de una franja a coordenadas de la imagen completa."""
+    return [
+        ([[x + dx, y + dy] for x, y in bbox], text, confidence)
+        for bbox, text, confidence in detections
+    ]
+
+
+def keep_own_detections(detections: list, own_top: int, own_bottom: int) -> list:
+    """Conserva las detecciones cuyo centro vertical cae en la zona propia de la franja."""
+    if not detections:
+        return []
+    boxes = _boxes(detections)
+    centers = (boxes[:, 1] + boxes[:, 3]) / 2
+    mask = (centers >= own_top) & (centers < own_bottom)
+    return [det for det, keep in zip(detections, mask) if keep]
+
+
+def suppress_duplicates(detections: list, iou_threshold: float = 0.5) -> list:
+    """
+    Elimina detecciones repetidas (misma caja en dos franjas) dejando la de mayor confianza.
+
+    Se considera duplicado si el IoU supera el umbral o si una caja queda casi
+    completamente contenida en la otra (texto cortado en el borde de una franja).
+    Compara cada caja conservada con todas las demás: para una imagen entera
+    conviene ``suppress_overlap_duplicates``.
+
+    Args:
+        detections: Detecciones en coordenadas de la imagen completa.
+        iou_threshold: Umbral de solapamiento.
+
+    Returns:
+        Detecciones sin duplicados.
+    """
+    if len(detections) < 2:
+        return list(detections)
+    kept = _unique_indices(_boxes(detections), np.array([float(conf) for _, _, conf in detections]),
+                           iou_threshold)
+    return [detections[i] for i in sorted(kept)]
+
+
+def suppress_overlap_duplicates(detections: list, bands: List[Tuple[int, int, int, int]],
+                                iou_threshold: float = 0.5) -> list:
+    """
+    Elimina duplicados solo entre las detecciones de las zonas compartidas por dos franjas.
+
+    ``keep_own_detections`` ya asigna cada detección a una sola franja; solo
+    puede quedar repetido un texto que cruza el límite entre dos zonas propias,
+    y ese texto toca la zona de solapamiento. El resto de las detecciones no
+    se compara, así que el costo depende de lo que hay en los solapamientos y
+    no del alto de la imagen.
+
+    Args:
+        detections: Detecciones en coordenadas de la imagen completa.
+        bands: Franjas de ``iter_bands``.
+        iou_threshold: Umbral de solapamiento.
+
+    Returns:
+        Detecciones sin duplicados, en el orden de entrada.
+    """
+    if len(detections) < 2 or len(bands) < 2:
+        return list(detections)
+
+    boxes = _boxes(detections)
+    confidences = np.array([float(conf) for _, _, conf in detections])
+    keep = np.ones(len(detections), dtype=bool)
+    for (_, bottom, _, _), (top, _, _, _) in zip(bands, bands[1:]):
+        # Detecciones que tocan la zona [top, bottom) que comparten las dos franjas
+        candidates = np.flatnonzero(keep & (boxes[:, 3] >= top) & (boxes[:, 1] <= bottom))
+        if len(candidates) < 2:
+            continue
+        kept = _unique_indices(boxes[candidates], confidences[candidates], iou_threshold)
+        keep[candidates] = False
+        keep[candidates[kept]] = True
+    return [det for det, kept in zip(detections, keep) if kept]
+
+
+def _unique_indices(boxes: np.ndarray, confidences: np.ndarray, iou_threshold: float) -> List[int]:
+    """Índices de las cajas que sobreviven a la supresión de duplicados (por confianza)."""
+    areas = np.maximum(boxes[:, 2] - boxes[:, 0], 0) * np.maximum(boxes[:, 3] - boxes[:, 1], 0)
+
+    order = np.argsort(-confidences)
+    kept = []
+    suppressed = np.zeros(len(boxes), dtype=bool)
+    for i in order:
+        if suppressed[i]:
+            continue
+        kept.append(i)
+        # Intersección vectorizada con todas las demás cajas
+        ix0 = np.maximum(boxes[i, 0], boxes[:, 0])
+        iy0 = np.maximum(boxes[i, 1], boxes[:, 1])
+        ix1 = np.minimum(boxes[i, 2], boxes[:, 2])
+        iy1 = np.minimum(boxes[i, 3], boxes[:, 3])
+        inter = np.maximum(ix1 - ix0, 0) * np.maximum(iy1 - iy0, 0)
+        union = areas[i] + areas - inter
+        iou = inter / np.maximum(union, 1e-6)
+        contained = inter / np.maximum(np.minimum(areas[i], areas), 1e-6)
+        duplicates = (iou > iou_threshold) | (contained > 0.85)
+        duplicates[i] = False
+        suppressed |= duplicates
+    return kept
+
+
+def reading_order(detections: list) -> list:
+    """
+    Ordena las detecciones en orden de lectura: por líneas de arriba abajo y,
+    dentro de cada línea, de izquierda a derecha.
+
+    Args:
+        detections: Detecciones en coordenadas de la imagen completa.
+
+    Returns:
+        Detecciones ordenadas.
+    """
+    if len(detections) < 2:
+        return list(detections)
+
+    boxes = _boxes(detections)
+    centers = (boxes[:, 1] + boxes[:, 3]) / 2
+    heights = boxes[:, 3] - boxes[:, 1]
+    tolerance = max(float(np.median(heights)) / 2, 1.0)
+
+    # Agrupar en líneas: un salto vertical mayor que la tolerancia inicia una nueva
+    by_y = np.argsort(centers, kind='stable')
+    gaps = np.diff(centers[by_y]) > tolerance
+    line_ids = np.empty(len(detections), dtype=int)
+    line_ids[by_y] = np.concatenate(([0], np.cumsum(gaps)))
+
+    order = np.lexsort((boxes[:, 0], line_ids))
+    return [detections[i] for i in order]
@@ -3,7 +3,19 @@ Utilidades generales para el procesamiento de itinerarios.
 """
 import logging
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Columnas de la tabla de itinerarios (una fila por nave) de los exportadores
+ITINERARY_COLUMNS = [
+    'Naviera', 'Nave', 'POL', 'POD', 'ETD', 'ETA', 'Fecha', 'Semana',
+    'Número de Viaje', 'Número de Contenedor', 'Número de Booking',
+]
+
+# Nombres de las mismas columnas para los formatos de intercambio (CSV, JSONL, Parquet)
+ITINERARY_FIELDS = [
+    'naviera', 'nave', 'pol', 'pod', 'etd', 'eta', 'fecha', 'semana',
+    'numero_viaje', 'numero_contenedor', 'numero_booking',
+]
 
 
 def setup_logging(log_level: str = 'INFO', log_file: Optional[str] = None):
@@ -43,3 +55,55 @@ def ensure_output_dir(output_path: str) -> Path:
     output_dir = Path(output_path).parent
     output_dir.mkdir(parents=True, exist_ok=True)
     return output_dir
+
+
+def itinerary_row(data: Dict[str, any], datos_generales: Optional[Dict] = None) -> List[object]:
+    """
+    Fila de la tabla de itinerarios (en el orden de ``ITINERARY_COLUMNS``).
+    
+    Args:
+        data: Datos normalizados de una nave (``naves_normalizadas``) o de un
+              documento de una sola nave.
+        datos_generales: Datos generales del itinerario, para completar los
+                         campos que la nave no trae (opcional).
+        
+    Returns:
+        Valores de la fila.
+    """
+    def general(field: str):
+        return datos_generales.get(field) if datos_generales else ''
+    
+    return [
+        data.get('naviera') or general('naviera'),
+        data.get('nombre') or data.get('nave_normalizada') or data.get('nombre_original'),
+        data.get('pol') or general('pol'),
+        data.get('pod') or general('pod'),
+        data.get('etd') or data.get('fecha_salida_normalizada') or general('etd'),
+        data.get('eta') or data.get('fecha_llegada_normalizada') or general('eta'),
+        data.get('fecha_normalizada') or data.get('fecha_original'),
+        data.get('semana_normalizada') or general('semana_normalizada'),
+        data.get('numero_viaje', ''),
+        data.get('numero_contenedor', ''),
+        data.get('numero_booking', ''),
+    ]
+
+
+def itinerary_rows(documents: Iterable[Dict[str, any]]) -> Iterator[List[object]]:
+    """
+    Filas de la tabla de itinerarios de varios documentos normalizados.
+    
+    Un documento con varias naves aporta una fila por nave; uno de una sola
+    nave, una fila. Es un generador: los documentos se recorren de a uno.
+    
+    Args:
+        documents: Resultados de ``DataNormalizer.normalize``.
+        
+    Yields:
+        Valores de cada fila (ver ``itinerary_row``).
+    """
+    for document in documents:
+        if document.get('multiple_naves') and document.get('naves_normalizadas'):
+            for nave in document['naves_normalizadas']:
+                yield itinerary_row(nave, document)
+        else:
+            yield itinerary_row(document)
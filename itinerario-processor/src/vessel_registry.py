@@ -0,0 +1,365 @@
+"""
+Registro persistente de naves para unificar los nombres entre documentos.
+
+El OCR escribe la misma nave de varias formas ("MSC ANNA", "M5C Anna",
+"MSC ANNA."), lo que impide cruzar itinerarios por nave. El registro guarda
+cada nave una sola vez, con su nombre canónico y, si se conoce, su número
+IMO, y resuelve cada nombre leído a su nave:
+
+1. Por IMO, si el documento lo trae.
+2. Por coincidencia exacta de la clave normalizada (nombre, alias o una
+   variante ya vista).
+3. Por coincidencia aproximada en un índice de trigramas, con una distancia
+   de edición máxima según el largo, pero solo contra naves curadas.
+
+Dos naves distintas pueden estar a una letra de distancia ("Kota Laju" y
+"Kota Lagu"), así que una coincidencia aproximada con una nave que nadie
+revisó no se unifica: el nombre se registra como nave propia y queda como
+variante pendiente de la otra, para que alguien la confirme en el archivo.
+Las variantes confirmadas se resuelven como coincidencia exacta y no entran al
+índice aproximado, así una cadena de errores de OCR no va desplazando la nave
+hacia otro nombre.
+
+El nombre canónico de una nave curada es el de su entrada; el de una nave
+registrada al vuelo es la grafía más frecuente entre los documentos (no la
+primera que llegó).
+
+Formato del archivo (JSON)::
+
+    {"version": 1, "naves": [{"nombre": "Msc Anna", "imo": "9234567", "curada": true,
+                              "alias": ["msc anna"], "variantes": ["m5c anna"],
+                              "pendientes": ["msc anma"], "nombres": {"Msc Anna": 12}}]}
+
+Para confirmar una variante pendiente se la mueve a ``variantes`` y se borra
+la entrada propia que se le creó.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Union
+import logging
+
+from .fuzzy import TrigramIndex, normalize_key
+
+logger = logging.getLogger(__name__)
+
+# Versión del formato del archivo
+FORMAT_VERSION = 1
+
+# Prefijos que no forman parte del nombre ("M/V MSC ANNA")
+VESSEL_PREFIXES = ('mv ', 'm v ')
+
+
+def vessel_key(name: str) -> str:
+    """Clave de búsqueda de un nombre de nave."""
+    key = normalize_key(name)
+    for prefix in VESSEL_PREFIXES:
+        if key.startswith(prefix):
+            return key[len(prefix):]
+    return key
+
+
+def max_distance_for(key: str) -> int:
+    """Distancia de edición aceptada según el largo de la clave."""
+    if len(key) < 5:
+        return 0
+    return 1 if len(key) <= 10 else 2
+
+
+def valid_imo(imo: Optional[str]) -> bool:
+    """Si ``imo`` es un número IMO de 7 dígitos con dígito verificador correcto."""
+    if not imo or len(imo) != 7 or not imo.isdigit():
+        return False
+    check = sum(int(digit) * weight for digit, weight in zip(imo[:6], range(7, 1, -1)))
+    return check % 10 == int(imo[6])
+
+
+class Vessel(NamedTuple):
+    """Nave registrada."""
+
+    id: int
+    name: str  # Nombre canónico
+    imo: Optional[str]
+    curated: bool = False  # Entrada revisada: acepta coincidencias aproximadas
+
+
+class VesselMatch(NamedTuple):
+    """Resultado de buscar un nombre en el registro."""
+
+    vessel: Vessel
+    distance: int  # 0 = coincidencia exacta
+
+
+class VesselRegistry:
+    """Registro de naves con búsqueda exacta, por IMO y aproximada."""
+
+    def __init__(self, path: Optional[Union[str, Path]] = None, read_only: bool = False):
+        """
+        Inicializa el registro.
+
+        Args:
+            path: Archivo JSON del registro. Si existe se carga; ``save`` escribe
+                  en él. None = registro solo en memoria.
+            read_only: Si no agregar naves ni variantes al resolver (por ejemplo
+                       al reprocesar en paralelo, para que el resultado no
+                       dependa del orden).
+        """
+        self.path = Path(path) if path else None
+        self.read_only = read_only
+        self._vessels: List[Vessel] = []
+        self._aliases: List[List[str]] = []  # Claves curadas de cada nave (índice aproximado)
+        self._index: TrigramIndex[int] = TrigramIndex()
+        self._variants: Dict[str, int] = {}  # Variantes confirmadas -> id de la nave (solo exactas)
+        self._pending: Dict[str, int] = {}  # Variantes sin confirmar -> id de la nave parecida
+        self._spellings: List[Dict[str, int]] = []  # Grafías vistas de cada nave y sus apariciones
+        self._by_imo: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self._dirty = False
+        if self.path and self.path.exists():
+            self.load(self.path)
+
+    def load(self, path: Union[str, Path]) -> int:
+        """
+        Agrega las naves de un archivo de registro.
+
+        Returns:
+            Cantidad de naves leídas.
+
+        Raises:
+            ValueError: Si el archivo está dañado o tiene un formato desconocido.
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ValueError(f"Registro de naves dañado {path}: {str(e)}")
+        if stored.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Formato de registro de naves no soportado en {path}: {stored.get('version')}")
+
+        with self._lock:
+            for item in stored.get('naves', []):
+                vessel = self._add(item['nombre'], item.get('imo'), item.get('alias') or [],
+                                   bool(item.get('curada')))
+                for variant in item.get('variantes') or []:
+                    self._variants.setdefault(variant, vessel.id)
+                for variant in item.get('pendientes') or []:
+                    self._pending.setdefault(variant, vessel.id)
+                spellings = self._spellings[vessel.id]
+                # Sin conteos guardados, el nombre del archivo cuenta como una aparición
+                for spelling, count in (item.get('nombres') or {item['nombre']: 1}).items():
+                    spellings[spelling] = spellings.get(spelling, 0) + int(count)
+        return len(stored.get('naves', []))
+
+    def _add(self, name: str, imo: Optional[str], aliases: Iterable[str], curated: bool = False) -> Vessel:
+        """Agrega una nave (o devuelve la que ya tiene ese IMO o ese nombre)."""
+        imo = imo if valid_imo(imo) else None
+        existing = self._by_imo.get(imo) if imo else None
+        if existing is None:
+            candidate = self._index.get(vessel_key(name))
+            # Un nombre ya registrado con otro IMO es otra nave
+            if candidate is not None and not (imo and self._vessels[candidate].imo):
+                existing = candidate
+        if existing is not None:
+            vessel = self._vessels[existing]
+            if imo and not vessel.imo:
+                vessel = self._set_imo(vessel, imo)
+            if curated and not vessel.curated:
+                # La entrada curada fija el nombre canónico
+                vessel = vessel._replace(name=name, curated=True)
+                self._vessels[vessel.id] = vessel
+        else:
+            vessel = Vessel(len(self._vessels), name, imo, curated)
+            self._vessels.append(vessel)
+            self._aliases.append([])
+            self._spellings.append({})
+            if imo:
+                self._by_imo[imo] = vessel.id
+        for alias in [name, *aliases]:
+            alias_key = vessel_key(alias)
+            if alias_key and alias_key not in self._index:
+                self._index.add(alias_key, vessel.id)
+                self._aliases[vessel.id].append(alias_key)
+        return vessel
+
+    def _set_imo(self, vessel: Vessel, imo: str) -> Vessel:
+        vessel = vessel._replace(imo=imo)
+        self._vessels[vessel.id] = vessel
+        self._by_imo[imo] = vessel.id
+        return vessel
+
+    def _count_spelling(self, vessel: Vessel, name: str) -> Vessel:
+        """Cuenta una aparición de la grafía y elige el nombre canónico por frecuencia."""
+        spellings = self._spellings[vessel.id]
+        spellings[name] = spellings.get(name, 0) + 1
+        if not vessel.curated and spellings[name] > spellings.get(vessel.name, 0):
+            vessel = vessel._replace(name=name)
+            self._vessels[vessel.id] = vessel
+        return vessel
+
+    def add(self, name: str, imo: Optional[str] = None, aliases: Iterable[str] = ()) -> Vessel:
+        """
+        Agrega una nave curada con sus alias.
+
+        Args:
+            name: Nombre canónico.
+            imo: Número IMO (se descarta si el dígito verificador no es válido).
+            aliases: Otros nombres de la nave.
+
+        Returns:
+            Nave registrada (la existente si ya había una con ese IMO o nombre).
+        """
+        with self._lock:
+            self._dirty = True
+            return self._add(name, imo, aliases, curated=True)
+
+    def by_imo(self, imo: Optional[str]) -> Optional[Vessel]:
+        """Nave con ese número IMO, o None."""
+        vessel_id = self._by_imo.get(imo) if imo else None
+        return None if vessel_id is None else self._vessels[vessel_id]
+
+    def match(self, name: str) -> Optional[VesselMatch]:
+        """
+        Busca un nombre de nave en el registro (sin modificarlo).
+
+        Args:
+            name: Nombre tal como aparece en el documento.
+
+        Returns:
+            Nave encontrada, o None si no hay ninguna o si hay dos igual de cercanas.
+        """
+        key = vessel_key(name)
+        if not key:
+            return None
+        with self._lock:
+            vessel_id = self._index.get(key)
+            if vessel_id is None:
+                vessel_id = self._variants.get(key)
+            if vessel_id is not None:
+                return VesselMatch(self._vessels[vessel_id], 0)
+
+            max_distance = max_distance_for(key)
+            if not max_distance:
+                return None
+            matches = self._index.search(key, max_distance, limit=2)
+            if not matches:
+                return None
+            best = matches[0]
+            if len(matches) > 1 and matches[1].distance == best.distance and matches[1].value != best.value:
+                return None  # Ambiguo: mejor no unificar
+            return VesselMatch(self._vessels[best.value], best.distance)
+
+    def resolve(self, name: Optional[str], imo: Optional[str] = None) -> Optional[Vessel]:
+        """
+        Resuelve un nombre (y opcionalmente un IMO) a su nave, registrándola si es nueva.
+
+        Una coincidencia aproximada solo se unifica si la nave encontrada es
+        curada; si no, el nombre se registra como nave propia y queda como
+        variante pendiente de la nave parecida.
+
+        Args:
+            name: Nombre ya limpio. Cuenta como una aparición de esa grafía.
+            imo: Número IMO leído del documento.
+
+        Returns:
+            Nave del registro, o None si no se encontró y el registro es de solo lectura.
+        """
+        imo = imo if valid_imo(imo) else None
+        if not name and not imo:
+            return None
+        with self._lock:
+            vessel = self.by_imo(imo)
+            similar = None
+            if vessel is None and name:
+                match = self.match(name)
+                # Dos IMO distintos son dos naves aunque los nombres se parezcan
+                if match and not (imo and match.vessel.imo and match.vessel.imo != imo):
+                    if match.distance == 0 or match.vessel.curated:
+                        vessel = match.vessel
+                    else:
+                        similar = match.vessel
+                if vessel is not None and imo and not vessel.imo and not self.read_only:
+                    vessel = self._set_imo(vessel, imo)
+                    self._dirty = True
+
+            if self.read_only:
+                return vessel
+            key = vessel_key(name) if name else ''
+            if vessel is None:
+                if not name:
+                    return None
+                self._dirty = True
+                vessel = self._add(name, imo, ())
+                if similar is not None:
+                    self._pending.setdefault(key, similar.id)
+                    logger.info(f"Nave '{name}' registrada como posible variante de '{similar.name}' "
+                                f"(pendiente de confirmar)")
+                return self._count_spelling(vessel, name)
+
+            # Recordar la variante para resolverla la próxima vez sin búsqueda aproximada
+            if key and key not in self._index and key not in self._variants:
+                self._variants[key] = vessel.id
+            self._dirty = True
+            return self._count_spelling(vessel, name) if name else vessel
+
+    def pending_variants(self) -> Dict[str, Vessel]:
+        """Variantes sin confirmar (clave del nombre leído -> nave parecida)."""
+        with self._lock:
+            return {key: self._vessels[vessel_id] for key, vessel_id in self._pending.items()}
+
+    def save(self, path: Optional[Union[str, Path]] = None) -> bool:
+        """
+        Guarda el registro (escritura atómica). No hace nada si no hubo cambios.
+
+        Args:
+            path: Archivo de destino (default: el del constructor).
+
+        Returns:
+            True si el archivo quedó al día.
+        """
+        path = Path(path) if path else self.path
+        if path is None:
+            return False
+        with self._lock:
+            if not self._dirty and path == self.path and path.exists():
+                return True
+            variants: Dict[int, List[str]] = {}
+            for key, vessel_id in self._variants.items():
+                variants.setdefault(vessel_id, []).append(key)
+            pending: Dict[int, List[str]] = {}
+            for key, vessel_id in self._pending.items():
+                pending.setdefault(vessel_id, []).append(key)
+            stored = {
+                'version': FORMAT_VERSION,
+                'naves': [
+                    {
+                        'nombre': vessel.name,
+                        'imo': vessel.imo,
+                        'curada': vessel.curated,
+                        'alias': self._aliases[vessel.id],
+                        'variantes': sorted(variants.get(vessel.id, [])),
+                        'pendientes': sorted(pending.get(vessel.id, [])),
+                        'nombres': self._spellings[vessel.id],
+                    }
+                    for vessel in self._vessels
+                ],
+            }
+            payload = json.dumps(stored, ensure_ascii=False, indent=1).encode('utf-8')
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+                with open(tmp_path, 'wb') as f:
+                    f.write(payload)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"No se pudo guardar el registro de naves {path}: {str(e)}")
+                return False
+            if path == self.path:
+                self._dirty = False
+        return True
+
+    def __iter__(self) -> Iterator[Vessel]:
+        return iter(list(self._vessels))
+
+    def __len__(self) -> int:
+        return len(self._vessels)
@@ -0,0 +1,360 @@
+"""
+Libro Excel consolidado con los itinerarios de muchos documentos.
+
+En vez de un ``<nombre>_datos.xlsx`` por imagen, ``WorkbookExporter`` junta
+todos los documentos de un lote en un solo libro:
+
+- una hoja por naviera (o por semana) con una fila por nave, con las mismas
+  columnas que ``ExcelExporter.export_multiple`` más el documento de origen;
+- una hoja "Resumen" al principio, con documentos, filas y rango de ETD de
+  cada hoja.
+
+Los documentos se agregan de a uno con ``add``. El libro está en modo solo
+escritura: cada fila va a un archivo temporal de su hoja y el archivo final
+se arma una sola vez, en ``close``; nunca se relee ni se reescribe lo ya
+agregado. Cada hoja retiene solo sus primeras filas (para calcular el ancho
+de las columnas) hasta que se completa la muestra.
+
+``DailyWorkbook`` arma un libro por día para un servidor que recibe
+documentos de a uno: cada documento se agrega enseguida a un archivo JSONL
+del día (uno por proceso), y el libro se regenera desde esos archivos cuando
+se pide (por ejemplo cada pocos minutos). Si el proceso se cae, lo recibido
+sigue en disco y el libro se completa en la próxima regeneración.
+"""
+import glob
+import json
+import os
+import re
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
+import logging
+
+from openpyxl import Workbook
+
+from .excel_exporter import WIDTH_SAMPLE_ROWS, ExcelExporter
+from .itinerary_store import PLACEHOLDERS
+from .records import Itinerary
+from .utils import ITINERARY_COLUMNS, itinerary_rows
+
+logger = logging.getLogger(__name__)
+
+# Columnas de las hojas por naviera o semana
+COLUMNS = ITINERARY_COLUMNS + ['Documento']
+
+# Criterio de agrupación -> (posición en la fila, encabezado del resumen)
+GROUPINGS = {
+    'naviera': (ITINERARY_COLUMNS.index('Naviera'), 'Naviera'),
+    'semana': (ITINERARY_COLUMNS.index('Semana'), 'Semana'),
+}
+
+SUMMARY_SHEET = 'Resumen'
+SUMMARY_COLUMNS = ['Hoja', 'Documentos', 'Filas', 'ETD desde', 'ETD hasta']
+
+# Campos que no se guardan en los archivos del día (el texto completo del OCR)
+SPOOL_EXCLUDED_FIELDS = ('texto_completo', 'raw_text')
+
+# Límite de Excel para el nombre de una hoja, y caracteres no permitidos
+MAX_SHEET_NAME = 31
+_INVALID_SHEET_CHARS = re.compile(r'[\[\]:*?/\\]')
+
+_ETD = ITINERARY_COLUMNS.index('ETD')
+
+
+def _iso_date(value) -> Optional[str]:
+    """``value`` si es una fecha YYYY-MM-DD, o None."""
+    if not isinstance(value, str):
+        return None
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return None
+    return value
+
+
+class _SheetGroup:
+    """Hoja de una naviera o semana mientras se escribe el libro."""
+
+    def __init__(self, label: str, sheet_name: str):
+        self.label = label
+        self.sheet_name = sheet_name
+        self.worksheet = None  # Se crea al completar la muestra
+        self.sample: List[list] = []
+        self.documents = 0
+        self.rows = 0
+        self.etd_min: Optional[str] = None
+        self.etd_max: Optional[str] = None
+
+    def count(self, row: list):
+        self.rows += 1
+        etd = _iso_date(row[_ETD])
+        if etd:
+            self.etd_min = min(self.etd_min or etd, etd)
+            self.etd_max = max(self.etd_max or etd, etd)
+
+
+class WorkbookExporter:
+    """Libro consolidado con una hoja por naviera o semana y una de resumen."""
+
+    def __init__(self, output_path: Union[str, Path], group_by: str = 'naviera',
+                 sample_size: int = WIDTH_SAMPLE_ROWS):
+        """
+        Inicializa el libro. No escribe nada hasta ``close``.
+
+        Args:
+            output_path: Ruta del archivo Excel a generar.
+            group_by: 'naviera' o 'semana'.
+            sample_size: Filas de cada hoja usadas para calcular el ancho de las columnas.
+
+        Raises:
+            ValueError: Si el criterio de agrupación no existe.
+        """
+        if group_by not in GROUPINGS:
+            raise ValueError(f"Agrupación no soportada: {group_by} (opciones: {', '.join(GROUPINGS)})")
+        self.output_path = Path(output_path)
+        self.group_by = group_by
+        self.sample_size = sample_size
+        self._column, self._label_header = GROUPINGS[group_by]
+        self._exporter = ExcelExporter()
+        self._workbook = Workbook(write_only=True)
+        self._groups: Dict[object, _SheetGroup] = {}
+        self._sheet_names: Set[str] = {SUMMARY_SHEET.lower()}
+        self.documents = 0
+        self.closed = False
+
+    def _label(self, key) -> str:
+        if key is None:
+            return f'Sin {self.group_by}'
+        return f'Semana {key}' if self.group_by == 'semana' else str(key)
+
+    def _sheet_name(self, label: str) -> str:
+        """Nombre de hoja válido y único (Excel no distingue mayúsculas)."""
+        base = _INVALID_SHEET_CHARS.sub(' ', label).strip().strip("'")[:MAX_SHEET_NAME] or 'Hoja'
+        name, suffix = base, 2
+        while name.lower() in self._sheet_names:
+            tail = f' ({suffix})'
+            name = base[:MAX_SHEET_NAME - len(tail)] + tail
+            suffix += 1
+        self._sheet_names.add(name.lower())
+        return name
+
+    def _group(self, row: list) -> _SheetGroup:
+        key = row[self._column]
+        if key in PLACEHOLDERS or key == '':
+            key = None
+        group = self._groups.get(key)
+        if group is None:
+            label = self._label(key)
+            group = self._groups[key] = _SheetGroup(label, self._sheet_name(label))
+        return group
+
+    def _append(self, group: _SheetGroup, row: list):
+        group.count(row)
+        if group.worksheet is not None:
+            group.worksheet.append(row)
+            return
+        group.sample.append(row)
+        if len(group.sample) >= self.sample_size:
+            self._start(group)
+
+    def _start(self, group: _SheetGroup):
+        group.worksheet = self._exporter.start_sheet(self._workbook, group.sheet_name, COLUMNS, group.sample)
+        group.sample = []
+
+    def add(self, data: Dict[str, any], document: Optional[str] = None) -> int:
+        """
+        Agrega un documento normalizado al libro.
+
+        Args:
+            data: Resultado de ``DataNormalizer.normalize``.
+            document: Nombre del documento de origen (columna "Documento").
+
+        Returns:
+            Filas agregadas (una por nave).
+
+        Raises:
+            ValueError: Si el libro ya se cerró.
+        """
+        if self.closed:
+            raise ValueError(f"El libro ya fue guardado: {self.output_path}")
+        added = 0
+        touched = set()
+        for row in itinerary_rows([data]):
+            row.append(document or '')
+            group = self._group(row)
+            self._append(group, row)
+            if id(group) not in touched:
+                touched.add(id(group))
+                group.documents += 1
+            added += 1
+        self.documents += 1
+        return added
+
+    def _summary_rows(self) -> List[list]:
+        def order(item):
+            key, _ = item
+            return (key is None, str(key) if self.group_by == 'naviera' else key or 0)
+
+        rows = [
+            [group.label, group.sheet_name, group.documents, group.rows, group.etd_min, group.etd_max]
+            for _, group in sorted(self._groups.items(), key=order)
+        ]
+        etd_min = [group.etd_min for group in self._groups.values() if group.etd_min]
+        etd_max = [group.etd_max for group in self._groups.values() if group.etd_max]
+        rows.append(['Total', None, self.documents, sum(group.rows for group in self._groups.values()),
+                     min(etd_min) if etd_min else None, max(etd_max) if etd_max else None])
+        return rows
+
+    def close(self) -> str:
+        """
+        Escribe las hojas pendientes y el resumen, y guarda el libro.
+
+        Returns:
+            Ruta del archivo generado.
+        """
+        if self.closed:
+            return str(self.output_path)
+        for group in self._groups.values():
+            if group.worksheet is None:
+                self._start(group)
+        self._exporter.start_sheet(self._workbook, SUMMARY_SHEET, [self._label_header] + SUMMARY_COLUMNS,
+                                   self._summary_rows(), index=0)
+
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        self._workbook.save(str(self.output_path))
+        self.closed = True
+        logger.info(f"Libro consolidado con {self.documents} documentos y {len(self._groups)} hojas "
+                    f"generado: {self.output_path}")
+        return str(self.output_path)
+
+    def __enter__(self) -> 'WorkbookExporter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Si el lote falló no se guarda un libro a medias
+        if exc_type is None:
+            self.close()
+        else:
+            self.closed = True
+            logger.warning(f"Libro consolidado descartado por un error: {self.output_path}")
+
+
+class DailyWorkbook:
+    """Libro consolidado por día, regenerado desde los documentos guardados en disco."""
+
+    def __init__(self, directory: Union[str, Path], group_by: str = 'naviera'):
+        """
+        Args:
+            directory: Directorio de los libros (``itinerarios_<día>.xlsx``) y de
+                       los documentos de cada día (``itinerarios_<día>.<pid>.jsonl``).
+            group_by: 'naviera' o 'semana'.
+
+        Raises:
+            ValueError: Si el criterio de agrupación no existe.
+        """
+        if group_by not in GROUPINGS:
+            raise ValueError(f"Agrupación no soportada: {group_by} (opciones: {', '.join(GROUPINGS)})")
+        self.directory = Path(directory)
+        self.group_by = group_by
+        self._lock = threading.Lock()
+
+    def workbook_path(self, day: str) -> Path:
+        """Ruta del libro de un día (fecha ISO)."""
+        return self.directory / f'itinerarios_{day}.xlsx'
+
+    def _spool_paths(self, day: str) -> List[str]:
+        return sorted(glob.glob(str(self.directory / f'itinerarios_{glob.escape(day)}.*.jsonl')))
+
+    def add(self, data, document: Optional[str] = None, day: Optional[str] = None) -> Path:
+        """
+        Guarda un documento normalizado en el archivo del día de este proceso.
+
+        Cada proceso escribe en su propio archivo (con su pid), así varios
+        procesos del servidor nunca escriben en el mismo.
+
+        Args:
+            data: Resultado de ``DataNormalizer.normalize`` (o un ``Itinerary``).
+            document: Nombre del documento de origen (columna "Documento").
+            day: Día (fecha ISO); por defecto hoy.
+
+        Returns:
+            Ruta del archivo del día.
+        """
+        day = day or date.today().isoformat()
+        data = data.to_dict() if isinstance(data, Itinerary) else data
+        line = json.dumps({
+            'hora': datetime.now().isoformat(),
+            'documento': document,
+            'datos': {key: value for key, value in data.items() if key not in SPOOL_EXCLUDED_FIELDS},
+        }, ensure_ascii=False, default=str)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f'itinerarios_{day}.{os.getpid()}.jsonl'
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+        return path
+
+    def _documents(self, paths: List[str]) -> Iterator[Tuple[str, Optional[str], Dict]]:
+        """(hora, documento, datos) de los archivos de un día, con las líneas incompletas descartadas."""
+        for path in paths:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Última línea a medio escribir si el proceso se cayó
+                        logger.warning(f"Línea inválida descartada en {path}")
+                        continue
+                    yield entry['hora'], entry.get('documento'), entry['datos']
+
+    def pending_days(self) -> List[str]:
+        """Días con documentos que todavía no están en su libro."""
+        days = set()
+        for path in glob.glob(str(self.directory / 'itinerarios_*.*.jsonl')):
+            day = Path(path).name[len('itinerarios_'):].split('.', 1)[0]
+            workbook = self.workbook_path(day)
+            if not workbook.exists() or os.stat(path).st_mtime_ns > workbook.stat().st_mtime_ns:
+                days.add(day)
+        return sorted(days)
+
+    def build(self, day: str) -> Optional[str]:
+        """
+        Regenera el libro de un día con los documentos de todos los procesos.
+
+        El libro se escribe en un temporal y reemplaza al anterior de forma
+        atómica. Su fecha de modificación queda igual a la del documento más
+        reciente leído, así ``pending_days`` detecta lo agregado mientras se
+        armaba.
+
+        Args:
+            day: Día (fecha ISO).
+
+        Returns:
+            Ruta del libro, o None si el día no tiene documentos.
+        """
+        with self._lock:
+            paths = self._spool_paths(day)
+            if not paths:
+                return None
+            newest = max(os.stat(path).st_mtime_ns for path in paths)
+            target = self.workbook_path(day)
+            tmp_path = target.with_name(f'{target.stem}.{os.getpid()}.tmp.xlsx')
+            with WorkbookExporter(tmp_path, group_by=self.group_by) as workbook:
+                for _, document, data in sorted(self._documents(paths), key=lambda entry: entry[0]):
+                    workbook.add(data, document)
+            os.replace(tmp_path, target)
+            os.utime(target, ns=(newest, newest))
+            return str(target)
+
+    def build_pending(self) -> List[str]:
+        """Regenera los libros de ``pending_days``. Devuelve sus rutas."""
+        built = []
+        for day in self.pending_days():
+            try:
+                path = self.build(day)
+            except Exception as e:
+                logger.error(f"No se pudo generar el libro del {day}: {str(e)}")
+                continue
+            if path:
+                built.append(path)
+        return built
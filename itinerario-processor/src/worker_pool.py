@@ -0,0 +1,156 @@
+"""
+Granja de procesos OCR para servidores sin GPU.
+
+Cada proceso del pool tiene su propio ``easyocr.Reader`` con un número fijo
+de hilos de torch, de modo que varios ``readtext`` y la extracción en Python
+(limitada por el GIL) corren en paralelo usando todos los núcleos.
+"""
+import os
+import functools
+import multiprocessing
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Procesador OCR propio de cada proceso trabajador
+_worker_ocr = None
+
+
+def _init_worker(languages: Optional[list], torch_threads: int, cache_dir: Optional[str],
+                 cache_max_bytes: Optional[int], preprocess: bool, store_dir: Optional[str],
+                 templates: bool = False):
+    """Inicializa un proceso trabajador: fija los hilos de torch y carga el lector."""
+    global _worker_ocr
+
+    # torch ya puede estar importado (vía el paquete src), así que variables como
+    # OMP_NUM_THREADS llegarían tarde; set_num_threads fija el pool de OpenMP/MKL
+    import torch
+    torch.set_num_threads(torch_threads)
+
+    from .ocr_processor import OCRProcessor
+    from .ocr_cache import OCRCache
+    from .image_preprocessor import ImagePreprocessor
+    from .detection_store import DetectionStore
+    from .carrier_templates import DEFAULT_TEMPLATES
+    cache = None
+    if cache_dir:
+        cache = OCRCache(cache_dir, max_bytes=cache_max_bytes) if cache_max_bytes else OCRCache(cache_dir)
+    preprocessor = ImagePreprocessor() if preprocess else None
+    store = DetectionStore(store_dir) if store_dir else None
+    _worker_ocr = OCRProcessor(languages=languages, gpu=False, cache=cache, preprocessor=preprocessor,
+                               templates=DEFAULT_TEMPLATES if templates else None, store=store)
+    # Cargar el lector ahora y no con la primera imagen
+    _worker_ocr.registry.preload(languages, gpu=False)
+    logger.info(f"Trabajador OCR {os.getpid()} listo ({torch_threads} hilos de torch)")
+
+
+def _process_image(image_path: str, fields: Optional[List[str]] = None) -> Tuple[str, Optional[Dict[str, str]], Optional[str]]:
+    """Procesa una imagen dentro del trabajador. Nunca lanza: devuelve el error como texto."""
+    try:
+        return image_path, _worker_ocr.extract_structured_data(image_path, fields), None
+    except Exception as e:
+        logger.error(f"Error en trabajador OCR con {image_path}: {str(e)}")
+        return image_path, None, str(e)
+
+
+class OCRWorkerPool:
+    """Pool de procesos OCR, cada uno con su propio lector EasyOCR en CPU."""
+
+    def __init__(self, workers: Optional[int] = None, torch_threads: Optional[int] = None,
+                 max_jobs_per_worker: Optional[int] = 50, languages: Optional[list] = None,
+                 cache_dir: Optional[str] = None, cache_max_bytes: Optional[int] = None,
+                 preprocess: bool = False, store_dir: Optional[str] = None, templates: bool = False):
+        """
+        Inicializa el pool de trabajadores.
+
+        Args:
+            workers: Número de procesos (por defecto núcleos / hilos de torch).
+            torch_threads: Hilos de torch por proceso (por defecto 2).
+            max_jobs_per_worker: Imágenes que procesa un trabajador antes de
+                                 reiniciarse para liberar memoria (None = nunca).
+            languages: Idiomas del lector (por defecto ['es', 'en']).
+            cache_dir: Directorio de la caché OCR compartida por los trabajadores (opcional).
+            cache_max_bytes: Tamaño máximo de la caché (para todos los trabajadores juntos;
+                             None = el de ``OCRCache``).
+            preprocess: Si reducir y normalizar las imágenes antes del OCR.
+            store_dir: Directorio del archivo de detecciones (opcional).
+            templates: Si extraer con las plantillas por naviera (experimental).
+        """
+        cpu_count = os.cpu_count() or 1
+        self.torch_threads = torch_threads or min(2, cpu_count)
+        self.workers = workers or max(1, cpu_count // self.torch_threads)
+        self.max_jobs_per_worker = max_jobs_per_worker
+
+        # 'spawn' evita heredar estado de torch del proceso padre
+        context = multiprocessing.get_context('spawn')
+        self._pool = context.Pool(
+            processes=self.workers,
+            initializer=_init_worker,
+            initargs=(languages, self.torch_threads, cache_dir, cache_max_bytes, preprocess, store_dir,
+                      templates),
+            maxtasksperchild=max_jobs_per_worker,
+        )
+        logger.info(
+            f"Pool OCR iniciado: {self.workers} procesos x {self.torch_threads} hilos, "
+            f"reinicio cada {max_jobs_per_worker} imágenes"
+        )
+
+    def extract_structured_data(self, image_path: str, fields: Optional[List[str]] = None) -> Dict[str, str]:
+        """
+        Procesa una imagen en un trabajador libre (bloquea hasta el resultado).
+
+        Args:
+            image_path: Ruta a la imagen del itinerario.
+            fields: Campos a extraer (None = todos).
+
+        Returns:
+            Diccionario con la misma forma que ``OCRProcessor.extract_structured_data``.
+
+        Raises:
+            FileNotFoundError: Si la imagen no existe.
+            ValueError: Si el trabajador no pudo procesar la imagen.
+        """
+        if not os.path.exists(image_path):
+            raise FileNotFoundError(f"La imagen no existe: {image_path}")
+
+        _, data, error = self._pool.apply(_process_image, (str(image_path), fields))
+        if error:
+            raise ValueError(f"Error al procesar la imagen: {error}")
+        return data
+
+    def imap_structured_data(self, image_paths: Iterable[str],
+                             fields: Optional[List[str]] = None) -> Iterator[Tuple[str, Optional[Dict[str, str]], Optional[str]]]:
+        """
+        Reparte las imágenes entre los trabajadores libres y devuelve los
+        resultados a medida que llegan, en el mismo orden de entrada.
+
+        Args:
+            image_paths: Rutas de las imágenes.
+            fields: Campos a extraer (None = todos).
+
+        Yields:
+            Tuplas (ruta, datos o None, mensaje de error o None).
+        """
+        # chunksize=1: cada trabajador toma la siguiente imagen apenas queda libre
+        task = functools.partial(_process_image, fields=fields)
+        return self._pool.imap(task, (str(p) for p in image_paths), chunksize=1)
+
+    def close(self):
+        """Espera a que terminen los trabajos pendientes y cierra el pool."""
+        self._pool.close()
+        self._pool.join()
+
+    def terminate(self):
+        """Detiene el pool inmediatamente."""
+        self._pool.terminate()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
@@ -0,0 +1,65 @@
+"""Pruebas de las plantillas por naviera."""
+import pytest
+
+from src.carrier_templates import DEFAULT_TEMPLATES, fingerprint
+from src.gazetteer import load_default
+from src.ocr_document import OCRDocument
+from src.ocr_processor import OCRProcessor
+from src.port_index import load_default as load_port_index
+
+MAERSK_TEXT = """MAERSK
+Vessel Schedule Asia - South America
+To be confirmed by the carrier
+Vessel: MAERSK LIMA
+Voyage: 412W
+From: San Antonio
+To: Callao
+Departing: 12/03/2024
+Arriving: 28/03/2024"""
+
+
+@pytest.fixture
+def maersk():
+    return next(template for template in DEFAULT_TEMPLATES if template.name == 'maersk')
+
+
+def extract(template, text, field):
+    return template.extract(OCRDocument.from_text(text), field, load_default(), load_port_index())
+
+
+def test_fingerprint_recognizes_maersk(maersk):
+    assert fingerprint(OCRDocument.from_text(MAERSK_TEXT), load_default()) is maersk
+
+
+def test_title_and_prose_lines_are_not_fields(maersk):
+    assert extract(maersk, MAERSK_TEXT, 'nave') == 'MAERSK LIMA'
+    assert extract(maersk, MAERSK_TEXT, 'pod') == 'Callao'
+    assert extract(maersk, MAERSK_TEXT, 'pol') == 'San Antonio'
+    assert extract(maersk, MAERSK_TEXT, 'numero_viaje') == '412W'
+    assert extract(maersk, MAERSK_TEXT, 'etd') == '12/03/2024'
+
+
+def test_short_labels_need_separator(maersk):
+    text = "MAERSK Schedule\nVessel Schedule Asia - South America\nTo be confirmed by the carrier"
+    assert extract(maersk, text, 'nave') is None
+    assert extract(maersk, text, 'pod') is None
+
+
+def test_unknown_port_is_rejected(maersk):
+    text = MAERSK_TEXT.replace('To: Callao', 'To: be confirmed')
+    assert extract(maersk, text, 'pod') is None
+
+
+def test_port_is_not_a_vessel(maersk):
+    text = MAERSK_TEXT.replace('Vessel: MAERSK LIMA', 'Vessel: Puerto Callao')
+    assert extract(maersk, text, 'nave') is None
+
+
+def test_templates_are_off_by_default():
+    doc = OCRDocument.from_text(MAERSK_TEXT)
+    assert OCRProcessor().extract_structured_data_from_document(doc)['plantilla'] is None
+
+    doc = OCRDocument.from_text(MAERSK_TEXT)
+    data = OCRProcessor(templates=DEFAULT_TEMPLATES).extract_structured_data_from_document(doc)
+    assert data['plantilla'] == 'maersk'
+    assert data['nave'] == 'MAERSK LIMA'
@@ -0,0 +1,86 @@
+"""Pruebas de la gramática de fechas frente a la cascada de ``strptime`` que reemplazó."""
+import itertools
+import re
+from datetime import datetime
+
+import pytest
+
+from src.date_parser import normalize_dates, parse_date
+
+LEGACY_FORMATS = [
+    '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d', '%Y-%m-%d',
+    '%d/%m/%y', '%d-%m-%y', '%y/%m/%d', '%y-%m-%d',
+]
+
+LEGACY_MONTHS = {
+    'enero': '01', 'febrero': '02', 'marzo': '03', 'abril': '04',
+    'mayo': '05', 'junio': '06', 'julio': '07', 'agosto': '08',
+    'septiembre': '09', 'octubre': '10', 'noviembre': '11', 'diciembre': '12'
+}
+
+
+def legacy_normalize_date(date_str):
+    """``DataNormalizer.normalize_date`` antes de ``date_parser`` (None = no la reconocía)."""
+    for fmt in LEGACY_FORMATS:
+        try:
+            return datetime.strptime(date_str.strip(), fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    for month_name, month_num in LEGACY_MONTHS.items():
+        if month_name in date_str.lower():
+            match = re.search(rf'(\d{{1,2}})\s+{month_name}\s+(\d{{4}})', date_str, re.IGNORECASE)
+            if match:
+                return f"{match.group(2)}-{month_num}-{match.group(1).zfill(2)}"
+    return None
+
+
+def numeric_samples():
+    days = ['1', '01', '9', '12', '13', '28', '29', '30', '31', '32']
+    months = ['1', '02', '2', '12', '13', '00']
+    years = ['2024', '2023', '1999', '24', '99', '68', '69', '00']
+    for day, month, year, sep in itertools.product(days, months, years, '/-'):
+        yield f'{day}{sep}{month}{sep}{year}'
+        yield f'{year}{sep}{month}{sep}{day}'
+
+
+def test_numeric_dates_match_legacy_cascade():
+    compared = 0
+    mismatches = []
+    for text in numeric_samples():
+        expected = legacy_normalize_date(text)
+        if expected is None:
+            continue
+        compared += 1
+        if parse_date(text) != expected:
+            mismatches.append((text, expected, parse_date(text)))
+    assert compared > 500
+    assert mismatches == []
+
+
+@pytest.mark.parametrize('text', [
+    '15 enero 2024', '1 febrero 2023', '29 febrero 2024', '5 Septiembre 2022', 'Salida: 7 marzo 2024 08:00',
+])
+def test_spanish_month_dates_match_legacy_cascade(text):
+    assert parse_date(text) == legacy_normalize_date(text)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('15 de enero de 2024', '2024-01-15'),
+    ('15 Jan 2024', '2024-01-15'),
+    ('January 15, 2024', '2024-01-15'),
+    ('15.01.2024', '2024-01-15'),
+    ('15 01 2024', '2024-01-15'),
+])
+def test_forms_added_by_the_grammar(text, expected):
+    assert parse_date(text) == expected
+
+
+@pytest.mark.parametrize('text', ['31/02/2024', '32 julio 2022', '15/01', 'sin fecha', '2024/13/01'])
+def test_invalid_dates_are_rejected(text):
+    assert parse_date(text) is None
+
+
+def test_normalize_dates_keeps_index_blanks_and_originals():
+    result = normalize_dates(['15/01/2024', None, '', 'pendiente', '15/01/2024'])
+    assert list(result) == ['2024-01-15', None, None, 'pendiente', '2024-01-15']
+    assert list(normalize_dates(['pendiente'], keep_original=False)) == [None]
@@ -0,0 +1,49 @@
+"""Pruebas del archivo de detecciones."""
+import os
+
+import pytest
+
+from src.detection_store import DetectionStore
+
+DETECTIONS = [([[0, 0], [10, 0], [10, 5], [0, 5]], 'MSC ANNA', 0.91)]
+
+
+def write(path, content):
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_key_depends_on_content_not_path(tmp_path):
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'b').mkdir()
+    first = write(tmp_path / 'a' / 'itinerario.png', b'uno')
+    copy = write(tmp_path / 'b' / 'itinerario.png', b'uno')
+    assert DetectionStore.make_key(first) == DetectionStore.make_key(copy)
+    assert DetectionStore.make_key(first).startswith('itinerario-')
+
+    # Misma ruta con otra imagen (por ejemplo una nueva subida con el mismo nombre)
+    stat = os.stat(first)
+    write(tmp_path / 'a' / 'itinerario.png', b'otra imagen')
+    os.utime(first, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert DetectionStore.make_key(first) != DetectionStore.make_key(copy)
+
+
+def test_missing_image(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        DetectionStore.make_key(str(tmp_path / 'no_existe.png'))
+
+
+def test_put_get_and_result(tmp_path):
+    image = write(tmp_path / 'itinerario.png', b'contenido')
+    store = DetectionStore(str(tmp_path / 'detecciones'))
+    key = store.put(image, DETECTIONS)
+    assert key == store.make_key(image)
+    assert store.keys() == [key]
+
+    stored = store.get(key)
+    assert stored.image == image
+    assert stored.detections == [([[0, 0], [10, 0], [10, 5], [0, 5]], 'MSC ANNA', 0.91)]
+
+    assert store.get_result(key) is None
+    store.put_result(key, {'nave': 'MSC ANNA', 'raw_text': 'no se guarda'})
+    assert store.get_result(key) == {'nave': 'MSC ANNA'}
@@ -0,0 +1,94 @@
+"""Pruebas de los exportadores CSV, JSONL y Parquet."""
+import csv
+import inspect
+import json
+from datetime import date
+
+import pytest
+
+from src.fast_exporters import EXPORTERS, CSVExporter, JSONLExporter, _RowExporter
+from src.utils import ITINERARY_FIELDS
+
+SINGLE = {
+    'multiple_naves': False, 'naviera': 'MSC', 'nave_normalizada': 'MSC ANNA', 'pol': 'San Antonio',
+    'pod': 'No encontrado', 'etd': '2024-01-15', 'eta': 'No encontrada', 'fecha_normalizada': None,
+    'semana_normalizada': 3, 'numero_viaje': 'FA401E',
+}
+MULTIPLE = {
+    'multiple_naves': True, 'naviera': 'Maersk', 'pol': 'San Antonio', 'pod': 'Callao', 'semana_normalizada': 5,
+    'naves_normalizadas': [
+        {'nombre': 'MAERSK KOTKA', 'naviera': 'Maersk', 'pol': 'San Antonio', 'pod': 'Callao', 'etd': '2024-02-01'},
+        {'nombre': 'KOTA LAGU', 'naviera': 'Maersk', 'pol': 'San Antonio', 'pod': 'Callao', 'etd': 'pendiente'},
+    ],
+}
+
+
+def test_csv_rows_and_placeholders(tmp_path):
+    path = tmp_path / 'itinerarios.csv'
+    CSVExporter().export_documents([SINGLE, MULTIPLE], str(path))
+    with open(path, encoding='utf-8', newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ITINERARY_FIELDS
+    assert len(rows) == 4
+    first = dict(zip(ITINERARY_FIELDS, rows[1]))
+    assert first['pod'] == '' and first['eta'] == ''
+    assert first['semana'] == '3'
+    assert [row[ITINERARY_FIELDS.index('nave')] for row in rows[2:]] == ['MAERSK KOTKA', 'KOTA LAGU']
+
+
+def test_jsonl_writes_nulls(tmp_path):
+    path = tmp_path / 'itinerarios.jsonl'
+    JSONLExporter().export_single(SINGLE, str(path))
+    with open(path, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert len(records) == 1
+    assert records[0]['pod'] is None and records[0]['eta'] is None
+    assert records[0]['semana'] == 3
+
+
+def test_export_multiple_completes_from_general_data(tmp_path):
+    path = tmp_path / 'naves.jsonl'
+    JSONLExporter().export_multiple(MULTIPLE['naves_normalizadas'], str(path), MULTIPLE)
+    with open(path, encoding='utf-8') as f:
+        assert [json.loads(line)['semana'] for line in f] == [5, 5]
+    with pytest.raises(ValueError):
+        JSONLExporter().export_multiple([], str(path))
+
+
+def test_export_multiple_signatures_match():
+    for exporter_class in EXPORTERS.values():
+        parameters = list(inspect.signature(exporter_class.export_multiple).parameters)
+        assert parameters == ['self', 'data_list', 'output_path', 'datos_generales'], exporter_class
+
+
+def test_row_exporter_requires_write():
+    with pytest.raises(TypeError):
+        _RowExporter()
+
+
+def test_parquet_types(tmp_path):
+    pytest.importorskip('pyarrow')
+    import pyarrow.parquet as pq
+    from src.fast_exporters import ParquetExporter
+
+    path = tmp_path / 'itinerarios.parquet'
+    ParquetExporter().export_documents([SINGLE, MULTIPLE], str(path))
+    table = pq.read_table(path)
+    assert table.column_names == ITINERARY_FIELDS
+    assert table.num_rows == 3
+    assert table.column('etd').to_pylist() == [date(2024, 1, 15), date(2024, 2, 1), None]
+    assert table.column('semana').to_pylist() == [3, 5, 5]
+    assert table.column('pod').to_pylist()[0] is None
+
+    empty = tmp_path / 'vacio.parquet'
+    ParquetExporter().export_documents([], str(empty))
+    assert pq.read_table(empty).num_rows == 0
+
+
+def test_get_exporter_reuses_one_instance_per_format():
+    from src.fast_exporters import get_exporter
+
+    assert get_exporter('csv') is get_exporter('csv')
+    assert get_exporter('pdf') is not get_exporter('excel')
+    with pytest.raises(ValueError, match='Formato no soportado'):
+        get_exporter('docx')
@@ -0,0 +1,86 @@
+"""Pruebas del almacén columnar de itinerarios."""
+import numpy as np
+import pytest
+
+from src.itinerary_store import ItineraryStore
+
+
+def itinerary(vessel, pod='Callao', etd='2024-01-15', week=3):
+    return {
+        'multiple_naves': False, 'naviera': 'MSC', 'nave_normalizada': vessel, 'pol': 'San Antonio',
+        'pod': pod, 'etd': etd, 'eta': 'No encontrada', 'semana_normalizada': week,
+    }
+
+
+def segment_files(path):
+    return sorted(child.name for child in path.iterdir() if child.name.startswith('lote.'))
+
+
+def test_queries_and_latest_batch():
+    store = ItineraryStore()
+    store.append(itinerary('MSC ANNA'), 'doc-1')
+    store.append(itinerary('KOTA LAGU', pod='Guayaquil', etd='2024-02-01', week=5), 'doc-2')
+    store.append(itinerary('MSC ANNA', etd='2024-01-20'), 'doc-1')
+    assert len(store) == 3
+    rows = store.select(pod='Callao')
+    assert list(rows['nave']) == ['MSC ANNA']
+    assert rows['etd'][0] == np.datetime64('2024-01-20')
+    assert len(store.select(latest=False, pod='Callao')) == 2
+    assert list(store.select(etd=('2024-01-16', None))['nave']) == ['KOTA LAGU', 'MSC ANNA']
+    with pytest.raises(ValueError):
+        store.select(origen='x')
+
+
+def test_save_appends_segments_and_keeps_them_few(tmp_path):
+    store = ItineraryStore()
+    for number in range(100):
+        store.append(itinerary(f'NAVE {number}'), f'doc-{number}')
+        store.save(tmp_path)
+    # Contador binario: 100 = 64 + 32 + 4
+    assert [rows for _, rows in store._segments] == [64, 32, 4]
+    assert len(segment_files(tmp_path)) == 3
+
+    large = store._segments[:2]
+    store.append(itinerary('NAVE 100'), 'doc-100')
+    store.save(tmp_path)
+    # Los segmentos grandes no se reescriben
+    assert store._segments[:2] == large
+    assert [rows for _, rows in store._segments] == [64, 32, 4, 1]
+
+    loaded = ItineraryStore.load(tmp_path)
+    assert len(loaded) == 101
+    assert loaded.select().equals(store.select())
+    assert loaded.values('documento') == store.values('documento')
+
+
+def test_appends_after_load_do_not_copy_mapped_columns(tmp_path):
+    store = ItineraryStore()
+    store.append(itinerary('MSC ANNA'), 'doc-1')
+    store.save(tmp_path)
+
+    loaded = ItineraryStore.load(tmp_path)
+    loaded.append(itinerary('KOTA LAGU'), 'doc-2')
+    assert list(loaded.select()['nave']) == ['MSC ANNA', 'KOTA LAGU']
+    assert isinstance(loaded._chunks[0]['lote'], np.memmap)
+
+    loaded.save(tmp_path)
+    assert all(isinstance(chunk['lote'], np.memmap) for chunk in loaded._chunks)
+    assert list(ItineraryStore.load(tmp_path).select()['nave']) == ['MSC ANNA', 'KOTA LAGU']
+
+
+def test_save_to_another_directory_writes_everything(tmp_path):
+    store = ItineraryStore()
+    store.append(itinerary('MSC ANNA'), 'doc-1')
+    store.save(tmp_path / 'a')
+    store.append(itinerary('KOTA LAGU'), 'doc-2')
+    store.save(tmp_path / 'b')
+    assert len(ItineraryStore.load(tmp_path / 'a')) == 1
+    assert list(ItineraryStore.load(tmp_path / 'b').select()['nave']) == ['MSC ANNA', 'KOTA LAGU']
+
+
+def test_load_errors(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        ItineraryStore.load(tmp_path)
+    (tmp_path / 'meta.json').write_text('{"version": 99}', encoding='utf-8')
+    with pytest.raises(ValueError, match='no soportado'):
+        ItineraryStore.load(tmp_path)
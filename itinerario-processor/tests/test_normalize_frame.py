@@ -0,0 +1,45 @@
+"""Pruebas de ``DataNormalizer.normalize_frame`` frente a ``normalize`` fila por fila."""
+import pandas as pd
+import pytest
+
+from src.data_normalizer import DataNormalizer
+
+ROWS = [
+    {},
+    {'naviera': 'MSC', 'nave': 'MSC ANNA', 'pol': 'San Antonio', 'pod': 'Callao', 'etd': '15/01/2024',
+     'eta': '20/01/2024', 'fecha': '10 enero 2024', 'semana': '3', 'raw_text': 'texto'},
+    # Sin texto ni puertos: columnas ausentes en esta fila
+    {'naviera': 'Maersk', 'nave': 'MAERSK KOTKA', 'imo': '9074729'},
+    # ETD/ETA desde fecha_salida/fecha_llegada
+    {'fecha_salida': '01/02/2024', 'fecha_llegada': 'pendiente', 'pol': 'Valparaiso'},
+    {'etd': 'TBA', 'fecha_salida': '01/02/2024'},
+    # Puertos solo en las claves alternativas
+    {'puerto_origen': 'San Antonio', 'puerto_destino': 'Callao'},
+    {'pol': 'Lima', 'puerto_destino': 'Guayaquil', 'semana': 'semana 14'},
+    # Valores vacíos explícitos (un DataFrame no distingue None de una clave ausente)
+    {'naviera': '', 'nave': None, 'etd': '', 'imo': None},
+]
+
+
+@pytest.fixture(scope='module')
+def normalizer():
+    return DataNormalizer()
+
+
+def test_frame_matches_normalize_row_by_row(normalizer):
+    frame = normalizer.normalize_frame(pd.DataFrame(ROWS))
+    for position, raw in enumerate(ROWS):
+        assert frame.iloc[position].to_dict() == normalizer.normalize(raw), raw
+
+
+@pytest.mark.parametrize('rows', [[{}], [{'raw_text': 'texto'}, {}], [{'pol': 'San Antonio'}, {'pol': None}]])
+def test_missing_values_are_none_not_nan(normalizer, rows):
+    frame = normalizer.normalize_frame(pd.DataFrame(rows))
+    for position, raw in enumerate(rows):
+        assert frame.iloc[position].to_dict() == normalizer.normalize(raw)
+
+
+def test_index_and_column_order(normalizer):
+    frame = normalizer.normalize_frame(pd.DataFrame(ROWS[1:3], index=[10, 20]))
+    assert list(frame.index) == [10, 20]
+    assert list(frame.columns) == list(normalizer.normalize(ROWS[1]))
@@ -0,0 +1,103 @@
+"""Pruebas de los paquetes de reglas: validación, prioridad y recarga en caliente."""
+import json
+import os
+
+import pytest
+
+from src.patterns import RuleRegistry, _compile_field, load_rules
+
+
+def rule(rule_id, pattern, priority=0):
+    return {'id': rule_id, 'patron': pattern, 'prioridad': priority}
+
+
+@pytest.mark.parametrize('spec, message', [
+    ({}, "lista 'reglas' no vacía"),
+    ({'reglas': []}, "lista 'reglas' no vacía"),
+    ({'reglas': [rule('a', 'x')], 'flags': ['VERBOSE']}, 'flag desconocido'),
+    ({'reglas': [rule('a', 'x')], 'valor': 'todo'}, "'valor' debe ser"),
+    ({'reglas': [{'patron': 'x'}]}, "necesita 'id' y 'patron'"),
+    ({'reglas': [rule('a', 'x'), rule('a', 'y')]}, 'id de regla repetido'),
+    ({'reglas': [rule('a', 'x', 'alta')]}, 'prioridad inválida'),
+    ({'reglas': [rule('a', '(x')]}, 'patrón inválido en la regla a'),
+    ({'reglas': [rule('a', 'x')], 'postproceso': ['desconocida']}, 'Operación de postproceso desconocida'),
+    ({'reglas': [rule('a', 'x')], 'postproceso': ['primeras_palabras']}, 'Argumento inválido'),
+    ({'reglas': [rule('a', 'x')], 'postproceso': ['min_longitud:n']}, 'necesita un número'),
+])
+def test_compile_field_rejects_invalid_specs(spec, message):
+    with pytest.raises(ValueError, match=message) as error:
+        _compile_field('campo', spec, 'pack.json')
+    assert "pack.json, campo 'campo'" in str(error.value)
+
+
+def test_priority_then_file_order():
+    field = _compile_field('campo', {
+        'reglas': [rule('tarde', r'B(\d)', 20), rule('primera', r'A(\d)', 10), rule('segunda', r'C(\d)', 10)],
+        'postproceso': ['strip'],
+    }, 'pack.json')
+    assert field.rule_ids == ['primera', 'segunda', 'tarde']
+    assert field.extract('B1 C2 A3') == '3'
+    assert field.first('B1 C2 A3').value == '3'
+    assert field.first('B1 C2 A3', lambda candidate: candidate.value != '3').value == '2'
+
+
+def test_postprocess_discards_and_falls_through():
+    field = _compile_field('campo', {
+        'reglas': [rule('corta', r'N:(\w+)', 10), rule('larga', r'L:(\w+)', 20)],
+        'postproceso': ['min_longitud:4', 'mayusculas'],
+    }, 'pack.json')
+    assert field.extract('N:ab N:abcd L:xyz') == 'ABCD'
+    assert field.extract('N:ab L:larga') == 'LARGA'
+    assert field.extract('N:ab') is None
+
+
+def write_pack(directory, pattern, keywords=('uno',)):
+    path = directory / 'campos.json'
+    path.write_text(json.dumps({
+        'campos': {'codigo': {'reglas': [rule('codigo_01', pattern)]}},
+        'palabras_clave': {'codigo': list(keywords)},
+    }), encoding='utf-8')
+    # Fecha de modificación distinta aunque la escritura caiga en el mismo instante
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    return path
+
+
+def test_load_rules_errors(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_rules(tmp_path)
+    (tmp_path / 'roto.json').write_text('{', encoding='utf-8')
+    with pytest.raises(ValueError, match='roto.json: JSON inválido'):
+        load_rules(tmp_path)
+
+
+def test_registry_hot_reload(tmp_path):
+    write_pack(tmp_path, r'A(\d+)')
+    registry = RuleRegistry(tmp_path, check_interval=0)
+    assert registry.get('codigo').extract('A12 B34') == '12'
+
+    write_pack(tmp_path, r'B(\d+)', keywords=('uno', 'dos'))
+    assert registry.get('codigo').extract('A12 B34') == '34'
+    assert registry.keywords('codigo') == ['uno', 'dos']
+
+
+def test_registry_keeps_previous_rules_when_a_pack_is_invalid(tmp_path):
+    write_pack(tmp_path, r'A(\d+)')
+    registry = RuleRegistry(tmp_path, check_interval=0)
+
+    write_pack(tmp_path, r'A(\d+')
+    assert registry.get('codigo').extract('A12') == '12'
+    # El paquete roto no se vuelve a intentar en cada consulta, solo cuando cambia
+    assert registry.get('codigo').extract('A12') == '12'
+
+    write_pack(tmp_path, r'A(\d)')
+    assert registry.get('codigo').extract('A12') == '1'
+
+
+def test_registry_without_reload_ignores_changes(tmp_path):
+    write_pack(tmp_path, r'A(\d+)')
+    registry = RuleRegistry(tmp_path, check_interval=None)
+    write_pack(tmp_path, r'B(\d+)')
+    assert registry.get('codigo').extract('A12 B34') == '12'
+    registry.reload()
+    assert registry.get('codigo').extract('A12 B34') == '34'
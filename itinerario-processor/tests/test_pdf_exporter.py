@@ -0,0 +1,28 @@
+"""Pruebas de los listados largos del PDF."""
+import collections
+
+import pytest
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.platypus import SimpleDocTemplate
+
+from src.pdf_exporter import PDFExporter
+
+HEADER = ['Fecha', 'Nave', 'Semana', 'Puertos', 'Viaje']
+
+
+@pytest.mark.parametrize('rows, chunk_rows', [(1200, 500), (300, 7), (3, 500)])
+def test_header_once_per_page_across_blocks(tmp_path, rows, chunk_rows):
+    pages = collections.defaultdict(list)
+
+    class RecordingCanvas(Canvas):
+        def drawString(self, x, y, text, *args, **kwargs):
+            pages[self.getPageNumber()].append(text)
+            return super().drawString(x, y, text, *args, **kwargs)
+
+    data = [['2024-01-15', f'NAVE {number}', '3', 'Callao', f'V{number}'] for number in range(rows)]
+    story = list(PDFExporter().table_chunks(HEADER, data, [80, 100, 50, 100, 60], chunk_rows=chunk_rows))
+    SimpleDocTemplate(str(tmp_path / 'listado.pdf')).build(story, canvasmaker=RecordingCanvas)
+
+    assert [texts.count('Fecha') for _, texts in sorted(pages.items())] == [1] * len(pages)
+    vessels = [text for _, texts in sorted(pages.items()) for text in texts if text.startswith('NAVE')]
+    assert vessels == [f'NAVE {number}' for number in range(rows)]
@@ -0,0 +1,53 @@
+"""Pruebas del índice de puertos."""
+import pytest
+
+from src.port_index import PortIndex, TIER_UNLOCODE, load_default, max_distance_for
+
+
+@pytest.fixture(scope='module')
+def index():
+    return load_default()
+
+
+@pytest.mark.parametrize('text, name, distance', [
+    ('Callao', 'Callao', 0),
+    ('Ca11ao', 'Callao', 0),  # Confusiones típicas del OCR dentro de las palabras
+    ('Callao Etd', 'Callao', 0),  # Palabras pegadas de la columna vecina
+    ('PECLL', 'Callao', 0),  # Código UN/LOCODE
+    ('Guayaqull', 'Guayaquil', 1),
+    ('Valparaiso', 'Valparaíso', 0),
+])
+def test_lookup(index, text, name, distance):
+    match = index.lookup(text)
+    assert match is not None
+    assert (match.entry.name, match.distance) == (name, distance)
+
+
+@pytest.mark.parametrize('text', ['', 'Lim', 'xyz', 'Be Confirmed By'])
+def test_unknown_ports(index, text):
+    assert index.resolve(text) is None
+
+
+def test_pol_flag_and_locode(index):
+    assert index.resolve('San Antonio').pol
+    assert not index.resolve('Callao').pol
+    assert index.locode('Callao') == 'PECLL'
+    assert index.locode('No existe') is None
+
+
+def test_short_keys_are_not_fuzzy():
+    assert max_distance_for('lim') == 0
+    assert max_distance_for('lima') == 1
+    assert max_distance_for('guayaquil') == 2
+
+
+def test_first_alias_and_curated_entries_win():
+    index = PortIndex()
+    index.add('Puerto Uno', 'XXAAA', ['Uno'])
+    index.add('Otro Puerto', 'XXBBB', ['Uno'], tier=TIER_UNLOCODE)
+    assert index.resolve('Uno').name == 'Puerto Uno'
+
+    index.add('Dos', 'XXDDD', tier=TIER_UNLOCODE)
+    index.add('Dos Bahias', 'XXEEE')
+    # Más palabras coincidentes gana a la entrada más corta
+    assert index.resolve('Dos Bahias').name == 'Dos Bahias'
@@ -0,0 +1,92 @@
+"""Pruebas de los registros compactos frente a los diccionarios de ``normalize``."""
+import pickle
+from datetime import date
+
+import pytest
+
+from src.data_normalizer import DataNormalizer
+from src.detection_store import DetectionStore
+from src.itinerary_store import ItineraryStore
+from src.records import Itinerary, VesselLeg
+
+RAW_SINGLE = {
+    'naviera': 'MSC', 'nave': 'MSC ANNA', 'pol': 'San Antonio', 'pod': 'Callao',
+    'etd': 'TBA', 'fecha_salida': '15/01/2024', 'eta': '20/01/2024', 'semana': '3', 'raw_text': 'texto',
+}
+RAW_MULTIPLE = {
+    'multiple_naves': True, 'total_naves': 2, 'naviera': 'MSC', 'pol': 'San Antonio', 'etd': '01/01/2024',
+    'naves': [
+        {'nombre': 'MSC ANNA', 'etd': 'pendiente', 'fecha': '1/2/2024', 'numero_viaje': 'FA401E'},
+        {'nombre': 'KOTA LAGU', 'fecha_salida': '3/3/2024', 'pod': 'Callao'},
+    ],
+    'raw_text': 'texto',
+}
+
+
+@pytest.fixture(scope='module')
+def normalizer():
+    return DataNormalizer()
+
+
+@pytest.mark.parametrize('raw', [
+    RAW_SINGLE, RAW_MULTIPLE, {'etd': '15/01/2024'}, {},
+    {'puerto_origen': 'San Antonio', 'puerto_destino': 'Callao'},
+    {'pol': 'Lima', 'puerto_destino': 'Guayaquil'},
+])
+def test_record_matches_normalize(normalizer, raw):
+    expected = normalizer.normalize(raw)
+    record = normalizer.normalize_record(raw)
+    assert record.to_dict() == expected
+    assert list(record) == list(expected)
+    assert pickle.loads(pickle.dumps(record)).to_dict() == expected
+
+
+def test_fields_are_typed_and_stored_once(normalizer):
+    record = normalizer.normalize_record(RAW_SINGLE)
+    assert record.departure is None and record.departure_text == 'TBA'
+    assert record.departure_original == '15/01/2024'
+    assert record['fecha_salida_normalizada'] == '2024-01-15'
+    assert record.arrival == date(2024, 1, 20)
+    assert record['puerto_origen'] == record.pol
+
+    leg = normalizer.normalize_record(RAW_MULTIPLE).legs[0]
+    assert isinstance(leg, VesselLeg)
+    assert leg.date == date(2024, 2, 1) and leg.voyage == 'FA401E'
+
+
+@pytest.mark.parametrize('key', ['fecha_salida_normalizada', 'fecha_llegada_normalizada'])
+def test_views_are_read_only(normalizer, key):
+    record = normalizer.normalize_record(RAW_SINGLE)
+    with pytest.raises(TypeError, match=key):
+        record[key] = 'otro'
+
+
+def test_setters_keep_views_in_sync(normalizer):
+    record = normalizer.normalize_record(RAW_SINGLE)
+    record['etd'] = '2024-02-01'
+    record['pod'] = 'Guayaquil'
+    assert record.departure == date(2024, 2, 1)
+    assert record['puerto_destino'] == 'Guayaquil'
+
+
+def test_ports_only_in_fallback_keys_are_kept(normalizer):
+    record = normalizer.normalize_record({'pol': 'Lima', 'puerto_destino': 'Guayaquil'})
+    assert record['pod'] == 'No encontrado'
+    assert record.destination_port_text == 'Guayaquil'
+    # Si coincide con ``pod`` no se guarda dos veces
+    assert normalizer.normalize_record(RAW_SINGLE).destination_port_text is None
+
+
+def test_store_and_results_accept_records(normalizer, tmp_path):
+    from_dicts, from_records = ItineraryStore(), ItineraryStore()
+    for raw in (RAW_SINGLE, RAW_MULTIPLE):
+        from_dicts.append(normalizer.normalize(raw), 'doc')
+        from_records.append(normalizer.normalize_record(raw), 'doc')
+    assert len(from_records) == 3
+    assert from_records.select().equals(from_dicts.select())
+
+    store = DetectionStore(str(tmp_path))
+    store.put_result('clave', normalizer.normalize_record(RAW_MULTIPLE))
+    expected = normalizer.normalize(RAW_MULTIPLE)
+    del expected['texto_completo']
+    assert store.get_result('clave') == expected
@@ -0,0 +1,84 @@
+"""Pruebas del registro de naves."""
+from src.vessel_registry import VesselRegistry, valid_imo, vessel_key
+
+
+def test_vessel_key_and_imo():
+    assert vessel_key('M/V MSC ANNA.') == 'msc anna'
+    assert vessel_key('M5C Anna') == 'msc anna'
+    assert valid_imo('9074729')
+    assert not valid_imo('9074728')
+    assert not valid_imo('123')
+
+
+def test_exact_key_merges_spellings():
+    registry = VesselRegistry()
+    first = registry.resolve('Msc Anna')
+    assert registry.resolve('M5C Anna') == first
+    assert len(registry) == 1
+
+
+def test_fuzzy_match_is_not_merged_without_curation():
+    registry = VesselRegistry()
+    lagu = registry.resolve('Kota Lagu')
+    laju = registry.resolve('Kota Laju')
+    assert laju.id != lagu.id
+    assert laju.name == 'Kota Laju'
+    assert registry.pending_variants() == {'kota laju': lagu}
+
+
+def test_fuzzy_match_merges_into_curated_vessel():
+    registry = VesselRegistry()
+    curated = registry.add('Msc Anna', aliases=['msc anna'])
+    assert registry.resolve('Msc Anma') == curated
+    assert registry.pending_variants() == {}
+    # La variante queda recordada como coincidencia exacta
+    assert registry.match('Msc Anma').distance == 0
+
+
+def test_fuzzy_match_with_different_imo_is_another_vessel():
+    registry = VesselRegistry()
+    registry.add('Msc Anna', imo='9074729')
+    other = registry.resolve('Msc Anma', imo='9321483')
+    assert other.name == 'Msc Anma'
+    assert len(registry) == 2
+
+
+def test_imo_resolves_regardless_of_name():
+    registry = VesselRegistry()
+    vessel = registry.resolve('Msc Anna', imo='9074729')
+    assert registry.resolve('Completely Different', imo='9074729') == registry.by_imo('9074729')
+    assert registry.by_imo('9074729').id == vessel.id
+
+
+def test_canonical_name_is_most_frequent_spelling():
+    registry = VesselRegistry()
+    registry.resolve('M5C Anna')
+    registry.resolve('Msc Anna')
+    assert registry.resolve('Msc Anna').name == 'Msc Anna'
+    # Una nave curada conserva su nombre
+    registry.add('Kota Lagu')
+    for _ in range(3):
+        registry.resolve('K0ta Lagu')
+    assert registry.resolve('Kota Lagu').name == 'Kota Lagu'
+
+
+def test_read_only_does_not_register(tmp_path):
+    registry = VesselRegistry(read_only=True)
+    assert registry.resolve('Msc Anna') is None
+    assert len(registry) == 0
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = tmp_path / 'naves.json'
+    registry = VesselRegistry(path)
+    registry.add('Msc Anna', imo='9074729')
+    registry.resolve('Kota Lagu')
+    registry.resolve('Kota Laju')
+    registry.resolve('Msc Anma')
+    assert registry.save()
+
+    loaded = VesselRegistry(path)
+    assert [vessel.name for vessel in loaded] == ['Msc Anna', 'Kota Lagu', 'Kota Laju']
+    assert loaded.by_imo('9074729').curated
+    assert loaded.match('Msc Anma').distance == 0
+    assert set(loaded.pending_variants()) == {'kota laju'}
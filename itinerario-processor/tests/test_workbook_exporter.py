@@ -0,0 +1,58 @@
+"""Pruebas del libro consolidado."""
+import json
+
+import pytest
+from openpyxl import load_workbook
+
+from src.workbook_exporter import DailyWorkbook, WorkbookExporter
+
+
+def itinerary(carrier, vessel, etd):
+    return {'multiple_naves': False, 'naviera': carrier, 'nave_normalizada': vessel, 'pol': 'San Antonio',
+            'pod': 'Callao', 'etd': etd, 'eta': 'No encontrada', 'semana_normalizada': 3}
+
+
+def test_one_sheet_per_carrier_and_summary(tmp_path):
+    path = tmp_path / 'libro.xlsx'
+    with WorkbookExporter(path) as workbook:
+        workbook.add(itinerary('MSC', 'MSC ANNA', '2024-01-15'), 'uno.png')
+        workbook.add(itinerary('Maersk', 'MAERSK KOTKA', '2024-01-20'), 'dos.png')
+        workbook.add(itinerary('MSC', 'MSC LENA', '2024-01-10'), 'tres.png')
+    book = load_workbook(path)
+    assert book.sheetnames == ['Resumen', 'MSC', 'Maersk']
+    summary = [[cell.value for cell in row] for row in book['Resumen'].iter_rows(min_row=2)]
+    assert summary[-1][2:] == [3, 3, '2024-01-10', '2024-01-20']
+    assert book['MSC'].max_row == 3
+    with pytest.raises(ValueError, match='ya fue guardado'):
+        workbook.add(itinerary('MSC', 'MSC ANNA', '2024-01-15'))
+
+
+def test_failed_batch_does_not_save(tmp_path):
+    path = tmp_path / 'libro.xlsx'
+    with pytest.raises(RuntimeError):
+        with WorkbookExporter(path) as workbook:
+            workbook.add(itinerary('MSC', 'MSC ANNA', '2024-01-15'), 'uno.png')
+            raise RuntimeError('falla el lote')
+    assert workbook.closed
+    assert not path.exists()
+
+
+def test_daily_workbook_is_rebuilt_from_the_day_files(tmp_path):
+    daily = DailyWorkbook(tmp_path)
+    daily.add(itinerary('MSC', 'MSC ANNA', '2024-01-15'), 'uno.png', day='2024-01-15')
+    assert daily.pending_days() == ['2024-01-15']
+    assert daily.build_pending() == [str(tmp_path / 'itinerarios_2024-01-15.xlsx')]
+    assert daily.pending_days() == []
+
+    # Otro proceso del servidor escribe en su propio archivo; el libro junta los dos
+    other = tmp_path / 'itinerarios_2024-01-15.99999999.jsonl'
+    other.write_text(json.dumps({'hora': '2024-01-15T09:00:00', 'documento': 'dos.png',
+                                 'datos': itinerary('Maersk', 'MAERSK KOTKA', '2024-01-20')}) + '\n'
+                     + '{"hora": "2024-01-15T10:00', encoding='utf-8')  # Línea cortada por una caída
+    assert daily.pending_days() == ['2024-01-15']
+    daily.build('2024-01-15')
+    book = load_workbook(tmp_path / 'itinerarios_2024-01-15.xlsx')
+    # Los documentos van en orden de llegada (el de Maersk llegó antes)
+    assert book.sheetnames == ['Resumen', 'Maersk', 'MSC']
+    assert book['Maersk']['L2'].value == 'dos.png'
+    assert daily.build('2024-01-16') is None